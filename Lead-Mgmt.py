@@ -1,276 +1,84 @@
-import requests
 import streamlit as st
-import os
-import json
 import pandas as pd
 from dotenv import load_dotenv
-import re
-import random
+import math
+import time
 import pyperclip  # Optional: for local copy functionality if desired
 
+import services
+from azure_openai import OpenAIError
+import dossiers
+from business_register import PROSPECT_PAGE_SIZE, get_business_register, register_prospects
+from carbon import CarbonIntensityError, get_carbon_intensity, get_carbon_store, leads_carbon_intensity
+from llm_cache import get_completion_cache, set_fresh_answers
+from http_client import get_http_client
+from jobs import fingerprint, get_job_queue
+from lead_store import get_lead_store
+from metrics import get_metrics
+from ranking import calibrate_against_llm
+
 # Load environment variables
 load_dotenv()
 
-# Azure OpenAI configuration
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION")
-AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
-
-# Path to the leads CSV
-leads_csv_path = "leads.csv"
-customers_csv_path = "customers.csv"
-
-# Load data from CSV (Restaurants data)
+# Load data from the lead store (Restaurants data)
 def load_data():
-    restaurants_csv_path = "restaurants_italy.csv"
-    if os.path.exists(restaurants_csv_path):
-        restaurants_df = pd.read_csv(restaurants_csv_path)
-    else:
-        restaurants_df = pd.DataFrame(columns=["Name", "Address", "Type", "Popularity", "Profit"])
-    return restaurants_df
+    return get_lead_store().load_businesses("restaurants")
 
-# Load leads data (if it exists)
+# Load leads data
 def load_leads_data():
-    if os.path.exists(leads_csv_path):
-        return pd.read_csv(leads_csv_path)
-    else:
-        return pd.DataFrame(columns=["Rank", "Name", "Address", "Profit", "Popularity", "Market Share", "Credit Score", "Location Rating", "Select"])
-
-# Load salesperson data (from synthetic_sales_data.csv)
-def load_salesperson_data():
-    if os.path.exists("synthetic_sales_data.csv"):
-        return pd.read_csv("synthetic_sales_data.csv")
-    else:
-        st.error("Salesperson data (synthetic_sales_data.csv) is missing!")
-        return pd.DataFrame(columns=["Sales Person ID", "Name", "Experience (Years)", "Expertise in Off-Grid Energy", "Location (City in Italy)"])
-
-
-# Function to get the best salesperson from OpenAI based on the business and expertise
-# Function to get the best salesperson from OpenAI based on the business and expertise
-def get_salesperson_recommendation(business_name, expertise_needed, leads_df, sales_df):
-    # Construct the prompt for OpenAI
-    prompt = f"""
-    We have a business lead named '{business_name}' that requires expertise in {expertise_needed}. Please recommend the most suitable salesperson from the following list based on their expertise, experience, and location. 
-    The response should be in valid JSON format with keys:
-    - "Sales Person ID"
-    - "Name"
-    - "Experience"
-    - "Expertise"
-    - "Location"
-    
-    LEAD:
-    Business Name: {business_name}
-    Expertise Needed: {expertise_needed}
-    
-    SALESPEOPLE:
-    """
-
-    # Add the salespeople data to the prompt
-    for _, row in sales_df.iterrows():
-        prompt += f"\nSales Person ID: {row['Sales Person ID']}, Name: {row['Name']}, Experience: {row['Experience (Years)']} years, Expertise: {row['Expertise in Off-Grid Energy']}, Location: {row['Location (City in Italy)']}"
-
-    prompt += """
-    PLEASE RESPOND IN THE EXACT JSON FORMAT BELOW:
-    {
-        "Sales Person ID": "[ID]",
-        "Name": "[Name]",
-        "Experience": "[Experience (Years)]",
-        "Expertise": "[Expertise]",
-        "Location": "[Location]"
-    }
-    ONLY provide the data in the JSON format above. Do not include any extra explanation, text, or additional information.
-    """
-
-    # Send the prompt to OpenAI for recommendation
-    headers = {
-        "Authorization": f"Bearer {AZURE_OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    body = {
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": 500,
-        "temperature": 0.5,
-    }
-
-    try:
-        # Call OpenAI API to get the recommendation
-        response = requests.post(
-            f"{AZURE_OPENAI_ENDPOINT}/openai/deployments/{AZURE_OPENAI_DEPLOYMENT_NAME}/chat/completions?api-version={AZURE_OPENAI_API_VERSION}",
-            headers=headers,
-            json=body,
-            timeout=30,
-        )
-
-        if response.status_code == 200:
-            # Get the response from OpenAI (the content is inside this structure)
-            response_data = response.json()  # This is a dictionary
-            recommended_salesperson = response_data["choices"][0]["message"]["content"].strip()
+    return get_lead_store().load_businesses("leads")
 
-            try:
-                # Try to parse the response as JSON
-                salesperson_data = json.loads(recommended_salesperson)
-
-                # Ensure the JSON response contains the expected fields
-                if all(field in salesperson_data for field in ["Sales Person ID", "Name", "Experience", "Expertise", "Location"]):
-                    return salesperson_data
-                else:
-                    st.warning(f"Missing expected fields in the response for business '{business_name}'.")
-                    return None
-            except json.JSONDecodeError:
-                st.warning(f"Error decoding OpenAI response for business '{business_name}'. Response is not valid JSON.")
-                return None
-        else:
-            st.error(f"Error with OpenAI API: {response.status_code}")
-            return None
-    except Exception as e:
-        st.error(f"Error with OpenAI request: {e}")
-        return None
-# Function to generate synthetic data batch using OpenAI
-def generate_synthetic_data_batch(business_names, country="IT"):
-    prompt = """
-    Please provide the following data for each restaurant in valid JSON format:
-    - Use proper commas between items.
-    - Ensure no trailing commas at the end of the array or objects.
-    - All keys and string values should be properly quoted (double quotes).
-    - Every JSON object must be properly structured and have the necessary commas to separate each entry in the array.
-    - The response should be a JSON array with each object representing a restaurant and having the following fields: "business_name", "estimated_revenue", "market_share", "credit_score", "location_rating".
-    
-    For the "estimated_revenue" and "market_share", please ensure the following:
-    - **"estimated_revenue"** should be a number without any symbols like "€". Just provide the number, e.g., "1200000" (without the currency symbol).
-    - **"market_share"** should be a plain numeric value without the "%" symbol. For example, "2.5" instead of "2.5%".
-    - **"credit_score"** should be a plain number between 0 and 100, e.g., "87" instead of "780".
-    - **"location_rating"** should be a number between 0 and 5.
-    - Ensure the JSON array is properly closed with `]` at the end and there are no extra characters like `}`.
-
-    The format should look like this:
-    [
-        {
-            "business_name": "Business Name",
-            "estimated_revenue": 1200000,
-            "market_share": 2.5,
-            "credit_score": 86,
-            "location_rating": 4.5
-        },
-        {
-            "business_name": "Another Business",
-            "estimated_revenue": 1500000,
-            "market_share": 3.0,
-            "credit_score": 90,
-            "location_rating": 4.8
-        }
-    ]
-    
-    Do not include any additional text or formatting other than proper JSON. Ensure the JSON array is correctly closed with `]`.
-    """
+# Load customers data
+def load_customers_data():
+    return get_lead_store().load_businesses("customers")
 
-    for name in business_names:
-        prompt += f"Business Name: {name}\n"
+# Load assignments (written by the Assignment tab)
+def load_assignments_data():
+    return get_lead_store().load_assignments()
 
-    headers = {
-        "Authorization": f"Bearer {AZURE_OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    body = {
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": 5000,
-        "temperature": 0.5,
-    }
+# Load salesperson data (imported from synthetic_sales_data.csv)
+def load_salesperson_data():
+    sales_df = get_lead_store().load_salespeople()
+    if sales_df.empty:
+        st.error("Salesperson data (synthetic_sales_data.csv) is missing!")
+    return sales_df
 
-    try:
-        with st.spinner(f"Generating synthetic data for the batch of businesses..."):
-            response = requests.post(
-                f"{AZURE_OPENAI_ENDPOINT}/openai/deployments/{AZURE_OPENAI_DEPLOYMENT_NAME}/chat/completions?api-version={AZURE_OPENAI_API_VERSION}",
-                headers=headers,
-                json=body,
-                timeout=30,
-            )
 
-            if response.status_code != 200:
-                st.error(f"OpenAI API Error: {response.status_code} - {response.text}")
-                return []
+# Seconds between reruns while a background job of this page is still running
+JOB_POLL_SECONDS = 1.5
 
-            try:
-                msg = response.json()["choices"][0]["message"]["content"].strip()
+# Keys of the unfinished jobs shown on this run; the page reruns until they finish
+pending_jobs = []
 
-                # Clean up the response
-                msg_cleaned = re.sub(r"^```json|```$", "", msg).strip()
-                if msg_cleaned.endswith("},"):
-                    msg_cleaned = msg_cleaned[:-1]  # Remove trailing comma after the last object
-                if msg_cleaned.endswith("] }"):
-                    msg_cleaned = msg_cleaned[:-2] + "]"  # Remove extra closing brace after the last object
-                if not msg_cleaned.endswith("]"):
-                    msg_cleaned = msg_cleaned.rstrip(',') + "]"  # Ensure proper closing of JSON array
 
-                data = json.loads(msg_cleaned)  # Parse JSON response
-                return data
+# Show a background job's state; unfinished jobs schedule a rerun of the page
+def show_job_progress(job, label):
+    if job.status == "failed":
+        st.error(f"{label} failed: {job.error}")
+    elif job.status == "partial":
+        st.warning(f"{label} is incomplete: {job.error}. It is retried on a later run.")
+    elif not job.finished:
+        total = job.total or "?"
+        st.progress(job.fraction, text=f"{label}: {job.done} of {total}...")
+        pending_jobs.append(job.key)
+    return job
 
-            except json.JSONDecodeError as e:
-                st.error(f"Error decoding OpenAI response as JSON: {e}")
-                return []
 
-    except Exception as e:
-        st.error(f"Error during OpenAI API request: {e}")
-        return []
-
-# Function to get the rank from OpenAI based on synthetic data
-def get_rank_from_openai(synthetic_data):
-    """
-    Use OpenAI to calculate the rank for a business based on its synthetic data.
-    """
-    if not synthetic_data:
-        return random.randint(1, 100)  # Fallback if no data is available
-
-    # Prepare prompt to explicitly request a rank between 1 and 100
-    prompt = f"""
-    Based on the following synthetic data for the business, please provide a rank between 1 and 100, where 1 is the best and 100 is the worst:
-    - Estimated Revenue: {synthetic_data.get("estimated_revenue")}
-    - Market Share: {synthetic_data.get("market_share")}
-    - Credit Score: {synthetic_data.get("credit_score")}
-    - Location Rating: {synthetic_data.get("location_rating")}
-
-    Please return only the rank number, without any additional explanation or text. 
-    """
-
-    headers = {
-        "Authorization": f"Bearer {AZURE_OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    body = {
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": 50,
-        "temperature": 0.5,
-    }
-
-    try:
-        with st.spinner(f"Getting rank from OpenAI..."):
-            response = requests.post(
-                f"{AZURE_OPENAI_ENDPOINT}/openai/deployments/{AZURE_OPENAI_DEPLOYMENT_NAME}/chat/completions?api-version={AZURE_OPENAI_API_VERSION}",
-                headers=headers,
-                json=body,
-                timeout=30,
-            )
-
-            if response.status_code != 200:
-                st.error(f"OpenAI API Error: {response.status_code} - {response.text}")
-                return None
-
-            try:
-                rank_response = response.json()["choices"][0]["message"]["content"].strip()
-                rank = int(rank_response)  # Attempt to convert the response directly to an integer
-                return min(max(rank, 1), 100)  # Ensure the rank is between 1 and 100
-
-            except json.JSONDecodeError as e:
-                st.error(f"Error decoding OpenAI rank response: {e}")
-                return None
-            except ValueError as e:
-                st.error(f"Error: Invalid rank format returned by OpenAI: {e}")
-                return None
-
-    except Exception as e:
-        st.error(f"Error during OpenAI API request: {e}")
-        return None
+# Synthetic data for `business_names`: stored records right away, the others
+# generated by a background job that every session asking for the same names shares.
+# Returns (records so far, whether generation is still running).
+def generate_synthetic_data_batch(business_names, label="Generating synthetic data"):
+    data, missing_names = services.split_stored_synthetic(business_names)
+    if not missing_names:
+        return data, False
 
+    job = show_job_progress(get_job_queue().submit("enrichment", {"names": business_names}), label)
+    if job.status == "done":
+        if not data:
+            st.error("OpenAI did not return any synthetic data for this batch.")
+        else:
+            st.warning(f"Synthetic data is missing for {len(missing_names)} businesses.")
+    return data, not job.finished
 
 # Streamlit Layout (remains the same as your previous code)
 st.set_page_config(page_title="SHV Energy Lead Management", page_icon="🔥", layout="wide")
@@ -320,6 +128,63 @@ tab_selection = st.sidebar.radio("Select a Tab", [
     "Carbon Intensity Data", "Additional Insights", "Targeted Marketing Strategy"
 ])
 
+# Shared LLM completion cache. Bypassing it only forces fresh answers for this
+# session's own calls; the fresh answers still replace the cached ones.
+completion_cache = get_completion_cache()
+set_fresh_answers(st.sidebar.checkbox("Bypass LLM cache", value=completion_cache.bypass))
+cache_stats = completion_cache.stats()
+st.sidebar.caption(
+    f"LLM cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, {cache_stats['entries']} entries"
+)
+for endpoint, totals in get_http_client().summary().items():
+    st.sidebar.caption(
+        f"{endpoint}: {totals['requests']} requests, {totals['errors']} errors, "
+        f"{totals['latency'] / totals['requests']:.2f}s avg, "
+        f"{totals['prompt_tokens'] + totals['completion_tokens']} tokens"
+    )
+
+# Ops panel: rolling per-feature LLM latency, tokens, retries, cache hits and failures
+with st.sidebar.expander("Ops"):
+    ops_window = st.selectbox(
+        "Window", [900, 3600, 86400], index=1, format_func=lambda seconds: f"last {seconds // 60} min"
+    )
+    ops_summary = get_metrics().summary(ops_window)
+    if ops_summary.empty:
+        st.caption("No LLM calls in this window yet.")
+    else:
+        st.dataframe(ops_summary.set_index("call_site"))
+        st.caption(
+            f"{ops_summary['calls'].sum()} calls, "
+            f"{ops_summary['prompt_tokens'].sum() + ops_summary['completion_tokens'].sum():,} tokens, "
+            f"{ops_summary['failures'].sum()} failures"
+        )
+
+# Ranking mode: the local model ranks a whole batch in one pass, the LLM path is opt-in
+st.sidebar.markdown("**Ranking**")
+use_llm_ranking = st.sidebar.checkbox(
+    "Rank with LLM instead of the local model (one call per business)", value=False,
+    help="Replaces the local ranks with a 1-100 rank from Azure OpenAI for each business; no explanation is returned.",
+)
+rank_normalization = st.sidebar.selectbox("Rank normalisation", ["fixed", "minmax", "zscore"])
+if "rank_weights" not in st.session_state:
+    st.session_state.rank_weights = None  # None means DEFAULT_RANK_WEIGHTS
+
+
+# Rank a synthetic data batch with the selected ranking mode. Local ranks are
+# cheap and recomputed on every rerun; LLM ranks come from a background job
+# (started once enrichment is complete) and show up as they arrive.
+def rank_synthetic_batch(synthetic_data_batch, enriching=False, label="Ranking with the LLM"):
+    if not use_llm_ranking:
+        return services.rank_synthetic_batch(synthetic_data_batch, False, st.session_state.rank_weights, rank_normalization)
+    if enriching or not synthetic_data_batch:
+        return {}
+
+    names = sorted(record["business_name"] for record in synthetic_data_batch)
+    job = show_job_progress(get_job_queue().submit("ranking", {"names": names}), label)
+    if job.status in ("done", "partial"):
+        return job.result["ranks"]
+    return job.partial or {}
+
 # Process prospects and add checkboxes
 # Process prospects and add checkboxes
 # Custom styling for table, adding borders and alternating row colors (light green and light blue)
@@ -350,116 +215,158 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# Sort key that orders numeric-looking columns numerically and text case-insensitively
+def grid_sort_key(column):
+    numeric = pd.to_numeric(column, errors="coerce")
+    if numeric.notna().any():
+        return numeric
+    return column.astype(str).str.casefold()
+
+
+# Server-side filter, sort and pagination controls for a grid.
+# Returns the rows of the current page and a key identifying the current view.
+def paginate_grid(df, key, default_sort="Rank"):
+    controls = st.columns([3, 2, 1, 1, 1])
+    search = controls[0].text_input("Filter by name or address", "", key=f"{key}_search")
+    sort_by = controls[1].selectbox(
+        "Sort by", list(df.columns), index=list(df.columns).index(default_sort) if default_sort in df.columns else 0,
+        key=f"{key}_sort",
+    )
+    descending = controls[2].checkbox("Descending", key=f"{key}_desc")
+    page_size = controls[3].selectbox("Rows per page", [25, 50, 100, 250], index=1, key=f"{key}_page_size")
+
+    view_df = df
+    if search:
+        mask = pd.Series(False, index=df.index)
+        for column in ("Name", "Address"):
+            if column in df.columns:
+                mask |= df[column].astype(str).str.contains(search, case=False, regex=False)
+        view_df = view_df[mask]
+    if sort_by in view_df.columns:
+        view_df = view_df.sort_values(sort_by, ascending=not descending, key=grid_sort_key, kind="stable")
+
+    page_count = max(1, -(-len(view_df) // page_size))
+    page = controls[4].number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key=f"{key}_page")
+    page_df = view_df.iloc[(page - 1) * page_size: page * page_size]
+
+    st.caption(f"Showing {len(page_df)} of {len(view_df)} matching rows ({len(df)} total), page {page} of {page_count}")
+    return page_df, f"{key}_{search}_{sort_by}_{descending}_{page_size}_{page}"
+
+
 if tab_selection == "Prospects":
     st.title("Prospects")
 
-    # Load restaurant data
-    restaurants_df = load_data()
+    # Prospect sources: Places restaurants and/or companies from the business register
+    prospect_sources = st.sidebar.multiselect(
+        "Prospect sources", ["Google Places", "Business Register"], default=["Google Places"]
+    )
+    source_frames = []
+    if "Google Places" in prospect_sources:
+        source_frames.append(load_data())
+    if "Business Register" in prospect_sources:
+        register = get_business_register()
+        facets = register.facets()
+        register_city = st.sidebar.selectbox("Register city", ["All"] + facets["cities"], key="register_city")
+        register_legal_form = st.sidebar.selectbox("Register legal form", ["All"] + facets["legal_forms"], key="register_legal_form")
+        register_filters = {
+            "city": None if register_city == "All" else register_city,
+            "legal_form": None if register_legal_form == "All" else register_legal_form,
+        }
+        # Register prospects come a page at a time, since each one is enriched by the LLM
+        register_pages = max(1, math.ceil(register.count(**register_filters) / PROSPECT_PAGE_SIZE))
+        register_page = st.sidebar.number_input(
+            f"Register page (of {register_pages}, {PROSPECT_PAGE_SIZE} companies each)",
+            min_value=1, max_value=register_pages, value=1, step=1, key="register_page",
+        )
+        source_frames.append(register_prospects(register, **register_filters, page=int(register_page) - 1))
+
+    # Load restaurant data (row ids stay stable while the sources are unchanged)
+    restaurants_df = pd.concat(source_frames, ignore_index=True) if source_frames else load_data().iloc[0:0]
 
-    # Load customer and leads data to exclude businesses already added
-    customers_df = load_leads_data()
-    leads_df = load_leads_data()
-    existing_businesses = pd.concat([customers_df, leads_df])['Name'].tolist()
+    # Row ids are positions in the combined sources, so a new source selection resets the selection
+    source_view = (
+        tuple(prospect_sources), st.session_state.get("register_city"), st.session_state.get("register_legal_form"),
+        st.session_state.get("register_page"),
+    )
+    if st.session_state.get("prospect_source_view") != source_view:
+        st.session_state.prospect_source_view = source_view
+        st.session_state.get("selected_prospect_ids", set()).clear()
 
-    # Filter restaurants
-    filtered_restaurants_df = restaurants_df[
-        ~restaurants_df['Name'].isin(existing_businesses)
-    ]
+    # Exclude businesses already added as leads or customers
+    filtered_restaurants_df = services.new_prospects(restaurants_df)
 
     # =========================================================
-    # 1. Generate synthetic data ONCE and store in session state
+    # 1. Synthetic data: stored records now, new prospects enriched in the background
     # =========================================================
-    if "synthetic_data_batch" not in st.session_state:
-        business_names = filtered_restaurants_df["Name"].tolist()
-        st.session_state.synthetic_data_batch = generate_synthetic_data_batch(business_names)
-
-    synthetic_data_batch = st.session_state.synthetic_data_batch
+    business_names = filtered_restaurants_df["Name"].tolist()
+    synthetic_data_batch, enriching = generate_synthetic_data_batch(business_names, "Generating synthetic data for prospects")
 
     # =========================================================
-    # 2. Generate ranks ONCE per business and store in session state
+    # 2. Rank the prospects enriched so far
     # =========================================================
-    if "prospect_ranks" not in st.session_state:
-        st.session_state.prospect_ranks = {}
-
-        with st.spinner("Generating ranks for prospects..."):
-            for item in synthetic_data_batch:
-                business_name = item["business_name"]
-                st.session_state.prospect_ranks[business_name] = get_rank_from_openai(item)
+    if st.sidebar.button("Calibrate rank weights against LLM sample"):
+        with st.spinner("Calibrating local rank weights..."):
+            st.session_state.rank_weights = calibrate_against_llm(synthetic_data_batch, normalization=rank_normalization)
+        st.sidebar.json(st.session_state.rank_weights)
 
-    ranks = st.session_state.prospect_ranks
+    ranks = rank_synthetic_batch(synthetic_data_batch, enriching, "Ranking prospects with the LLM")
 
     # =========================================================
     # 3. Build prospects table
     # =========================================================
-    prospects_list = []
-    for idx, row in filtered_restaurants_df.iterrows():
-        syn = next((x for x in synthetic_data_batch if x["business_name"] == row["Name"]), None)
-        if syn:
-            prospects_list.append({
-                "Rank": ranks.get(row["Name"], 999),
-                "Name": row["Name"],
-                "Address": row["Address"],
-                "Profit": syn.get("estimated_revenue", "N/A"),
-                "Popularity": row["Popularity"] if pd.notna(row["Popularity"]) else "N/A",
-                "Market Share": syn.get("market_share", "N/A"),
-                "Credit Score": syn.get("credit_score", "N/A"),
-                "Location Rating": syn.get("location_rating", "N/A")
-            })
-
-    prospects_df = pd.DataFrame(prospects_list).sort_values(by="Rank")
-
-    # Ensure checkbox state tracking
-    if "prospect_checkbox" not in st.session_state:
-        st.session_state.prospect_checkbox = {
-            name: False for name in prospects_df["Name"]
-        }
+    # One join on normalized business names instead of a scan per row
+    prospects_df, match_report = services.prospects_grid(filtered_restaurants_df, synthetic_data_batch, ranks)
+
+    if match_report["missing_synthetic"] or match_report["unused_synthetic"]:
+        with st.expander(f"{len(match_report['missing_synthetic'])} prospects without synthetic data"):
+            st.write("No synthetic data for:", match_report["missing_synthetic"])
+            st.write("Synthetic records that matched no prospect:", match_report["unused_synthetic"])
+
+    # Selected prospects are tracked by row id of restaurants_df
+    if "selected_prospect_ids" not in st.session_state:
+        st.session_state.selected_prospect_ids = set()
+    selected_ids = st.session_state.selected_prospect_ids
 
     # =========================================================
-    # 4. Render table INSIDE A FORM → prevents reruns
+    # 4. Render one paginated grid with a selection column
     # =========================================================
-    with st.form("prospects_form_unique"):
-        st.subheader("Select Prospects")
-
-        # Header row
-        cols = st.columns([1, 3, 3, 2, 2, 2, 2, 2, 1])
-        headers = ["Rank", "Name", "Address", "Profit", "Popularity", "Market Share", "Credit Score", "Location Rating", "Select"]
-        for c, h in zip(cols, headers):
-            c.write(f"**{h}**")
-
-        # Data rows
-        for idx, row in prospects_df.iterrows():
-            cols = st.columns([1, 3, 3, 2, 2, 2, 2, 2, 1])
-            cols[0].write(row['Rank'])
-            cols[1].write(row['Name'])
-            cols[2].write(row['Address'])
-            cols[3].write(row['Profit'])
-            cols[4].write(row['Popularity'])
-            cols[5].write(row['Market Share'])
-            cols[6].write(row['Credit Score'])
-            cols[7].write(row['Location Rating'])
-
-            # Checkbox that does NOT trigger rerun
-            state_key = row['Name']
-            st.session_state.prospect_checkbox[state_key] = cols[8].checkbox(
-                "", value=st.session_state.prospect_checkbox[state_key],
-                key=f"prospect_{state_key}"
-            )
+    st.subheader("Select Prospects")
+    page_df, view_key = paginate_grid(prospects_df, "prospects")
+
+    grid_df = page_df.copy()
+    grid_df.insert(0, "Select", grid_df.index.isin(selected_ids))
+    edited_df = st.data_editor(
+        grid_df,
+        hide_index=True,
+        use_container_width=True,
+        disabled=[column for column in grid_df.columns if column != "Select"],
+        column_config={"Select": st.column_config.CheckboxColumn("Select")},
+        key=f"prospects_grid_{view_key}",
+    )
+
+    # Sync the selection set with the rows visible on this page
+    for row_id, selected in edited_df["Select"].items():
+        if selected:
+            selected_ids.add(row_id)
+        else:
+            selected_ids.discard(row_id)
 
-        submit_button = st.form_submit_button("Generate Selected Leads")
+    st.caption(f"{len(selected_ids)} prospects selected")
+    submit_button = st.button("Generate Selected Leads")
 
     # =========================================================
-    # 5. Handle form submission
+    # 5. Handle submission
     # =========================================================
     if submit_button:
-        selected_names = [name for name, selected in st.session_state.prospect_checkbox.items() if selected]
+        if selected_ids:
+            selected_rows = restaurants_df[restaurants_df.index.isin(selected_ids)]
+            get_lead_store().upsert_businesses("leads", selected_rows, status="Lead")
 
-        if selected_names:
-            selected_rows = restaurants_df[restaurants_df["Name"].isin(selected_names)]
-            current_leads = load_leads_data()
-            updated_df = pd.concat([current_leads, selected_rows], ignore_index=True)
-            updated_df.to_csv(leads_csv_path, index=False)
+            # Prepare the new leads' information and summaries in the background
+            get_job_queue().submit("dossiers", {"names": sorted(selected_rows["Name"].tolist())})
 
-            st.success(f"Added {len(selected_names)} prospects as leads.")
+            st.success(f"Added {len(selected_rows)} prospects as leads.")
+            selected_ids.clear()
         else:
             st.warning("Please select at least one prospect.")
 
@@ -473,58 +380,24 @@ if tab_selection == "Leads":
     if not leads_df.empty:
         # Get synthetic data batch for leads from OpenAI
         business_names_batch = leads_df['Name'].tolist()
-        synthetic_data_batch = generate_synthetic_data_batch(business_names_batch)
+        synthetic_data_batch, enriching = generate_synthetic_data_batch(business_names_batch, "Generating synthetic data for leads")
 
-        leads_selection = []
+        # The leads table keeps its columns even when nothing was ranked
+        leads_table = pd.DataFrame(columns=services.GRID_COLUMNS)
 
         if synthetic_data_batch:
-            for idx, row in leads_df.iterrows():
-                # Get synthetic data for the corresponding business
-                synthetic_data = next((item for item in synthetic_data_batch if item["business_name"] == row["Name"]), None)
-
-                if synthetic_data:
-                    # Get the rank from OpenAI
-                    rank = get_rank_from_openai(synthetic_data)
-                    if rank is not None:
-                        leads_selection.append({
-                            "Rank": rank,
-                            "Name": row["Name"],
-                            "Address": row["Address"],
-                            "Profit": synthetic_data.get("estimated_revenue", "Not Available"),
-                            "Popularity": row["Popularity"] if pd.notna(row["Popularity"]) else "Not Available",
-                            "Market Share": synthetic_data.get("market_share", "Not Available"),
-                            "Credit Score": synthetic_data.get("credit_score", "Not Available"),
-                            "Location Rating": synthetic_data.get("location_rating", "Not Available")
-                        })
-
-        # Convert the list of leads to a DataFrame
-        leads_df = pd.DataFrame(leads_selection)
-
-        # Sort the leads by rank (lower rank means better)
-        leads_df = leads_df.sort_values(by=["Rank"], ascending=True)
-
-        # Manually display the headers before the rows
-        cols = st.columns([1, 3, 3, 2, 2, 2, 2, 2, 1])
-        cols[0].write("Rank")
-        cols[1].write("Name")
-        cols[2].write("Address")
-        cols[3].write("Profit")
-        cols[4].write("Popularity")
-        cols[5].write("Market Share")
-        cols[6].write("Credit Score")
-        cols[7].write("Location Rating")
-
-        # Display the rows
-        for idx, row in leads_df.iterrows():
-            cols = st.columns([1, 3, 3, 2, 2, 2, 2, 2, 1])
-            cols[0].write(row['Rank'])
-            cols[1].write(row['Name'])
-            cols[2].write(row['Address'])
-            cols[3].write(row['Profit'])
-            cols[4].write(row['Popularity'])
-            cols[5].write(row['Market Share'])
-            cols[6].write(row['Credit Score'])
-            cols[7].write(row['Location Rating'])
+            # Get the ranks for the whole batch at once
+            lead_ranks = rank_synthetic_batch(synthetic_data_batch, enriching, "Ranking leads with the LLM")
+
+            # One join on normalized business names; leads without a rank are skipped
+            leads_table, match_report = services.leads_grid(leads_df, synthetic_data_batch, lead_ranks)
+
+            if match_report["missing_synthetic"]:
+                st.warning(f"No synthetic data for: {', '.join(map(str, match_report['missing_synthetic']))}")
+
+        # Display the leads in one paginated grid, best rank first
+        page_df, _ = paginate_grid(leads_table, "leads")
+        st.dataframe(page_df, hide_index=True, use_container_width=True)
 
 
 if tab_selection == "Assignment":
@@ -534,41 +407,48 @@ if tab_selection == "Assignment":
     leads_df = load_leads_data()
     sales_df = load_salesperson_data()
 
-    assignment_data = []
+    # Matching options: load-balancing cap, solver and optional LLM tie-break
+    opt_cols = st.columns(3)
+    cap_per_salesperson = opt_cols[0].number_input("Max leads per salesperson (0 = no cap)", min_value=0, value=0, step=1)
+    assignment_method = opt_cols[1].selectbox("Assignment method", ["greedy", "hungarian"])
+    use_llm_tie_break = opt_cols[2].checkbox("Break ties with LLM", value=False)
 
     if not leads_df.empty and not sales_df.empty:
-        for idx, lead in leads_df.iterrows():
-            business_name = lead['Name']
-            expertise_needed = "Off-Grid Solutions"
-
-            # Get the recommended salesperson (your existing function)
-            recommended_salesperson = get_salesperson_recommendation(
-                business_name, expertise_needed, leads_df, sales_df
-            )
-
-            if recommended_salesperson:
-                assignment_data.append({
-                    "Business Name": business_name,
-                    "Location": lead['Address'],
-                    "Sales Person ID": recommended_salesperson.get("Sales Person ID", "N/A"),
-                    "Sales Person Name": recommended_salesperson.get("Name", "N/A"),
-                    "Sales Person Location": recommended_salesperson.get("Location", "N/A"),
-                    "Expertise": recommended_salesperson.get("Expertise", "N/A"),
-                    "Experience": recommended_salesperson.get("Experience", "N/A")
+        # Assignments run in the background and are saved so the Sales Email tab
+        # can read them; the LLM is only consulted for leads where several
+        # salespeople score the same. The current leads and salespeople are part
+        # of the job key, so any change to them starts a fresh assignment.
+        job = show_job_progress(get_job_queue().submit("assignment", {
+            "expertise_needed": services.DEFAULT_EXPERTISE,
+            "max_leads_per_salesperson": int(cap_per_salesperson) or None,
+            "method": assignment_method,
+            "use_llm_tie_break": use_llm_tie_break,
+            "leads": fingerprint(zip(leads_df["Name"], leads_df["Address"])),
+            "salespeople": fingerprint(sales_df["Sales Person ID"]),
+        }), "Assigning leads")
+
+        if job.status == "done":
+            assignment_df = load_assignments_data()
+            assignment_df = assignment_df[assignment_df["Business Name"].isin(leads_df["Name"])]
+            if job.result["rows"]:
+                # New assignments change the emails and strategies; refresh the stale ones in the background
+                dossier_job = get_job_queue().submit("dossiers", {
+                    "names": None,
+                    "assignments": fingerprint(assignment_df.to_numpy().tolist()),
                 })
+                if not dossier_job.finished:
+                    st.caption(f"Preparing lead dossiers in the background: {dossier_job.done} of {dossier_job.total or '?'}")
+
+                st.success("Assignments updated successfully.")
+                if job.result.get("prompt_tokens"):
+                    tokens = job.result["prompt_tokens"]
+                    st.caption(
+                        f"Tie-break prompts: ~{tokens['compact_tokens']:,} tokens in {tokens['compact_calls']} calls "
+                        f"(~{tokens['verbose_tokens']:,} tokens in {tokens['verbose_calls']} calls with the full roster per lead)"
+                    )
+                st.dataframe(assignment_df)
             else:
-                st.warning(f"No salesperson recommendation for {business_name}")
-
-        if assignment_data:
-            assignment_df = pd.DataFrame(assignment_data)
-
-            # SAVE assignments so the Sales Email tab can read them
-            assignment_df.to_csv("assignments.csv", index=False)
-
-            st.success("Assignments updated successfully.")
-            st.dataframe(assignment_df)
-        else:
-            st.warning("No assignments were generated.")
+                st.warning("No assignments were generated.")
 
 
 if tab_selection == "Lead Information":
@@ -596,47 +476,14 @@ if tab_selection == "Lead Information":
         st.markdown(f"**📍 Address:** {business_address}")
         st.markdown("---")
 
-        # Function to get additional business info from OpenAI
+        # Business info from the lead's dossier, or from OpenAI when it is missing or stale
         def get_business_information(business_name, business_address):
-            prompt = f"""
-            You are a business intelligence assistant. Provide detailed information about the company named "{business_name}" located at "{business_address}".
-            Include the following if available:
-            - Overview of the business
-            - Industry and sector
-            - Services or products offered
-            - Company size or popularity
-            - Estimated financial performance (approximate revenue/profit)
-            - Recent news, reviews, or reputation
-            - Competitive landscape and local market context
-
-            Format the response as a clean, structured summary using Markdown headings and bullet points.
-            """
-
-            headers = {
-                "Authorization": f"Bearer {AZURE_OPENAI_API_KEY}",
-                "Content-Type": "application/json",
-            }
-            body = {
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 800,
-                "temperature": 0.6,
-            }
-
+            inputs = dossiers.artifact_inputs({"Name": business_name, "Address": business_address})["information"]
             try:
-                response = requests.post(
-                    f"{AZURE_OPENAI_ENDPOINT}/openai/deployments/{AZURE_OPENAI_DEPLOYMENT_NAME}/chat/completions?api-version={AZURE_OPENAI_API_VERSION}",
-                    headers=headers,
-                    json=body,
-                    timeout=40,
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    ai_output = data["choices"][0]["message"]["content"].strip()
-                    return ai_output
-                else:
-                    st.error(f"OpenAI API Error: {response.status_code}")
-                    return None
+                return dossiers.get_artifact("information", business_name, business_address, inputs)
+            except OpenAIError as e:
+                st.error(f"OpenAI API Error: {e.status_code}")
+                return None
             except Exception as e:
                 st.error(f"Error fetching business information: {e}")
                 return None
@@ -678,151 +525,71 @@ if tab_selection == "Sales Email":
         # --------------------------------------------------------------------
         # Load assigned salesperson (from Assignment tab)
         # --------------------------------------------------------------------
-        salesperson_name = ""
-        salesperson_experience = ""
-        salesperson_expertise = "Off-Grid Gas Solutions"
-        salesperson_location = ""
-
-        if os.path.exists("assignments.csv"):
-            assignments_df = pd.read_csv("assignments.csv")
-            lead_assignment = assignments_df[assignments_df["Business Name"] == selected_lead]
-
-            if not lead_assignment.empty:
-                salesperson_name = lead_assignment.iloc[0]["Sales Person Name"]
-                salesperson_experience = lead_assignment.iloc[0]["Experience"]
-                salesperson_expertise = "Off-Grid Gas Solutions"
-                salesperson_location = lead_assignment.iloc[0]["Sales Person Location"]
+        assignments_df = load_assignments_data()
+        salesperson, assigned = services.salesperson_for_lead(selected_lead, assignments_df, sales_df)
+        if not assigned:
+            if assignments_df.empty:
+                st.warning("No assignments found. Selecting random salesperson.")
             else:
                 st.warning("No assigned salesperson found. Selecting a random one.")
-                sp = sales_df.sample(1).iloc[0]
-                salesperson_name = sp["Name"]
-                salesperson_experience = sp["Experience (Years)"]
-                salesperson_expertise = "Off-Grid Gas Solutions"
-                salesperson_location = sp["Location (City in Italy)"]
-        else:
-            st.warning("Assignments file not found. Selecting random salesperson.")
-            sp = sales_df.sample(1).iloc[0]
-            salesperson_name = sp["Name"]
-            salesperson_experience = sp["Experience (Years)"]
-            salesperson_expertise = "Off-Grid Gas Solutions"
-            salesperson_location = sp["Location (City in Italy)"]
 
         # --------------------------------------------------------------------
         # Fetch AI-generated business summary (context)
         # --------------------------------------------------------------------
-        def get_business_summary(business_name, business_address):
-            prompt = f"""
-            Provide a short 2–3 sentence description about the business '{business_name}', located at '{business_address}'.
-            Highlight what the business is known for and any characteristics relevant to energy usage (such as customer volume, operational hours, food service, hospitality, or location).
-            Write in natural, human-like sentences appropriate for a sales email introduction.
-            """
-
-            headers = {
-                "Authorization": f"Bearer {AZURE_OPENAI_API_KEY}",
-                "Content-Type": "application/json",
-            }
-            body = {
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 250,
-                "temperature": 0.7,
-            }
-
-            try:
-                response = requests.post(
-                    f"{AZURE_OPENAI_ENDPOINT}/openai/deployments/{AZURE_OPENAI_DEPLOYMENT_NAME}/chat/completions?api-version={AZURE_OPENAI_API_VERSION}",
-                    headers=headers,
-                    json=body,
-                    timeout=30,
-                )
-                if response.status_code == 200:
-                    return response.json()["choices"][0]["message"]["content"].strip()
-                return ""
-            except:
-                return ""
-
-        with st.spinner(f"Gathering background for {selected_lead}..."):
-            business_context = get_business_summary(selected_lead, business_address)
+        lead = {"Name": selected_lead, "Address": business_address}
+        business_context = dossiers.get_artifact(
+            "summary", selected_lead, business_address, dossiers.artifact_inputs(lead)["summary"], generate=False
+        )
+        if business_context is None:
+            summary_job = show_job_progress(
+                get_job_queue().submit("business_summary", {"name": selected_lead, "address": business_address}),
+                f"Gathering background for {selected_lead}",
+            )
+            summary_ready = summary_job.finished
+            business_context = summary_job.result["summary"] if summary_job.status == "done" else ""
+        else:
+            summary_ready = True
 
         # --------------------------------------------------------------------
         # Generate the personalized email with OFF-GRID GAS focus
         # --------------------------------------------------------------------
-        def generate_sales_email():
-            prompt = f"""
-            Write a professional outreach email from SHV Energy addressed to the owners or managers of '{selected_lead}'.
-
-            The email MUST clearly promote SHV Energy’s **Off-Grid Gas solutions**, emphasizing:
-            - reliable and uninterrupted gas supply for businesses operating off the main energy grid
-            - safer, cleaner alternatives to diesel or old heating systems
-            - consistent heating and cooking performance for restaurants / hospitality / food service operations
-            - cost stability, high efficiency, and reduced emissions with modern LPG-based systems
-
-            The sender details to include:
-            - Name: {salesperson_name}
-            - Location: based in {salesperson_location}
-            - Experience: {salesperson_experience} years of experience
-            - Expertise: Off-Grid Gas Solutions
-
-            Incorporate the following business context naturally at the beginning:
-            {business_context}
-
-            Additional instructions:
-            - Write in clear, polished paragraphs (3–5 paragraphs).
-            - Keep the tone professional, helpful, and confident.
-            - Invite the business to a meeting or call to discuss Off-Grid Gas options.
-            - Make the benefits specific and relevant to their business type.
-            - End with a warm sign-off and a proper email signature for the salesperson.
-            - DO NOT mention AI or that this text is generated.
-
-            Output only the email content, no extra commentary.
-            """
-
-            headers = {
-                "Authorization": f"Bearer {AZURE_OPENAI_API_KEY}",
-                "Content-Type": "application/json",
-            }
-            body = {
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 700,
-                "temperature": 0.7,
-            }
+        # Assigned leads keep their email in the dossier, so it is generated once per assignment
+        lead_assignments = [] if assignments_df.empty else assignments_df[
+            (assignments_df["Business Name"] == selected_lead) & (assignments_df["Location"] == business_address)
+        ].to_dict("records")
 
+        def generate_sales_email():
             try:
-                response = requests.post(
-                    f"{AZURE_OPENAI_ENDPOINT}/openai/deployments/{AZURE_OPENAI_DEPLOYMENT_NAME}/chat/completions?api-version={AZURE_OPENAI_API_VERSION}",
-                    headers=headers,
-                    json=body,
-                    timeout=40,
-                )
-                if response.status_code == 200:
-                    return response.json()["choices"][0]["message"]["content"].strip()
-            except:
-                pass
-
-            return None
-
-        # Generate email
-        with st.spinner("Generating personalized Off-Grid Gas email..."):
-            email_output = generate_sales_email()
-
-        if email_output:
-            st.markdown("### ✉️ Generated Sales Email (Off-Grid Gas Focused)")
-            st.markdown(email_output)
-
-            if st.button("Copy to Clipboard"):
-                pyperclip.copy(email_output)
-                st.success("Email copied!")
-        else:
-            st.warning("Failed to generate email.")
+                if lead_assignments:
+                    inputs = dossiers.artifact_inputs(lead, lead_assignments[0], business_context)["email"]
+                    return dossiers.get_artifact("email", selected_lead, business_address, inputs)
+                return services.sales_email(selected_lead, salesperson, business_context)
+            except Exception:
+                return None
+
+        # Generate email once the background is in (the page reruns until then)
+        if summary_ready:
+            with st.spinner("Generating personalized Off-Grid Gas email..."):
+                email_output = generate_sales_email()
+
+            if email_output:
+                st.markdown("### ✉️ Generated Sales Email (Off-Grid Gas Focused)")
+                st.markdown(email_output)
+
+                if st.button("Copy to Clipboard"):
+                    pyperclip.copy(email_output)
+                    st.success("Email copied!")
+            else:
+                st.warning("Failed to generate email.")
 
 
 if tab_selection == "Carbon Intensity Data":
-    st.title("Carbon Intensity Based on AI-Extracted Location")
+    st.title("Carbon Intensity Based on Lead Location")
 
-    # 1️⃣ Load leads from the leads.csv file
-    try:
-        leads_df = pd.read_csv("leads.csv")  # Changed to leads.csv
-    except:
-        st.error("Leads file not found. Ensure leads.csv is available.")
+    # 1️⃣ Load leads from the lead store
+    leads_df = load_leads_data()
+    if leads_df.empty:
+        st.error("No leads found. Please generate leads first.")
         st.stop()
 
     # Strip spaces from column names just in case
@@ -839,102 +606,30 @@ if tab_selection == "Carbon Intensity Data":
     lead_row = leads_df[leads_df["Name"] == selected_business].iloc[0]  # Changed to "Name"
     full_lead_record = lead_row.to_dict()
 
-    # 3️⃣ Load ENV vars for Azure OpenAI (the same you use in Assignment tab)
-    AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-    AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-    AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
-    AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION")
-
-    # ------------------------
-    # AI Prompt Construction
-    # ------------------------
-    prompt = f"""
-    You are an expert in Italian geography and Electricity Maps API zones.
-
-    Here is a complete business lead record:
-    {full_lead_record}
-
-    TASKS:
-    1. Extract the EXACT Italian city or regional location from the address.
-    2. Convert that location into the correct Electricity Maps zone code.
-    3. Return data ONLY in this exact JSON format:
-
-    {{
-        "location": "[Extracted Italian location]",
-        "zone": "[Electricity Maps zone code]"
-    }}
-
-    Examples:
-    Central North Italy -> IT-CNO
-    Central South Italy -> IT-CSO
-    North Italy -> IT-NO
-    Sardinia -> IT-SAR
-    Sicily -> IT-SIC
-    South Italy -> IT-SO
-
-    DO NOT RETURN ANYTHING OTHER THAN THE JSON ABOVE.
-    """
-
-    # ------------------------
-    # Prepare request to Azure OpenAI
-    # ------------------------
-    headers = {
-        "Authorization": f"Bearer {AZURE_OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    body = {
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": 300,
-        "temperature": 0.2,
-    }
+    # Resolve every lead's zone locally in one pass (no network calls)
+    with st.expander("Electricity Maps zones for all leads"):
+        st.dataframe(services.lead_zones_table(leads_df))
 
+    # Local index first; the LLM only for addresses it can't resolve
     try:
-        ai_response = requests.post(
-            f"{AZURE_OPENAI_ENDPOINT}/openai/deployments/{AZURE_OPENAI_DEPLOYMENT_NAME}/chat/completions?api-version={AZURE_OPENAI_API_VERSION}",
-            headers=headers,
-            json=body,
-            timeout=30,
-        )
-
-        if ai_response.status_code != 200:
-            st.error(f"Azure OpenAI Error {ai_response.status_code}: {ai_response.text}")
-            st.stop()
-
-        ai_content = ai_response.json()["choices"][0]["message"]["content"].strip()
-
-        try:
-            location_obj = json.loads(ai_content)
-        except json.JSONDecodeError:
-            st.error("AI response is not valid JSON:")
-            st.write(ai_content)
-            st.stop()
-
-        location = location_obj.get("location")
-        zone = location_obj.get("zone")
-
-        st.success(f"📍 AI Extracted Location: {location}")
-        st.success(f"🔌 Electricity Maps Zone: {zone}")
-
+        resolved = services.lead_zone(full_lead_record)
+    except OpenAIError as e:
+        st.error(f"Azure OpenAI Error {e.status_code}: {e.text}")
+        st.stop()
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
     except Exception as e:
         st.error(f"Error calling Azure OpenAI: {e}")
         st.stop()
 
-    # ------------------------
-    # Zone Mapping Based on Region Name
-    # ------------------------
-    zone_mapping = {
-        "Central North Italy": "IT-CNO",
-        "Central South Italy": "IT-CSO",
-        "North Italy": "IT-NO",
-        "Sardinia": "IT-SAR",
-        "Sicily": "IT-SIC",
-        "South Italy": "IT-SO",
-    }
-
-    # If zone is not provided by AI, try mapping the region
-    if not zone:
-        zone = zone_mapping.get(location, None)
+    location = resolved["location"]
+    zone = resolved["zone"]
+    if resolved["source"] == "llm":
+        st.success(f"📍 AI Extracted Location: {location}")
+    else:
+        st.success(f"📍 Location: {location} (from {resolved['source']})")
+    st.success(f"🔌 Electricity Maps Zone: {zone}")
 
     # If no valid zone is found, display an error
     if not zone:
@@ -944,54 +639,34 @@ if tab_selection == "Carbon Intensity Data":
     st.success(f"Resolved Zone: {zone}")
 
     # ------------------------
-    # Make the API Call
+    # Make the API Call (cached per zone per hour)
     # ------------------------
-    carbon_url = "https://api.electricitymaps.com/v3/carbon-intensity/latest"
-    headers = {"auth-token": os.getenv("ELECTRICITYMAPS_API_KEY")}  # Ensure correct header for the API
-    params = {"zone": zone}
-
-    resp = requests.get(carbon_url, headers=headers, params=params)
-
-    if resp.status_code == 200:
-        carbon = resp.json()
+    try:
+        carbon = get_carbon_intensity(zone)
+    except CarbonIntensityError as e:
+        carbon = None
+        st.error(f"Electricity Maps API Error {e.status_code}: {e.text}")
 
+    if carbon:
         st.subheader(f"🌍 Carbon Intensity for {location} ({zone})")
         st.write(f"**Current Carbon Intensity:** {carbon['carbonIntensity']} gCO₂/kWh")
 
         # ------------------------
         # Convert API response to a table format
         # ------------------------
-        carbon_data = {
-            "Field": [
-                "Zone",
-                "Carbon Intensity (gCO₂/kWh)",
-                "Datetime",
-                "Updated At",
-                "Created At",
-                "Emission Factor Type",
-                "Is Estimated",
-                "Estimation Method",
-                "Temporal Granularity",
-                "_Disclaimer"
-            ],
-            "Value": [
-                carbon.get("zone", "N/A"),
-                carbon.get("carbonIntensity", "N/A"),
-                carbon.get("datetime", "N/A"),
-                carbon.get("updatedAt", "N/A"),
-                carbon.get("createdAt", "N/A"),
-                carbon.get("emissionFactorType", "N/A"),
-                carbon.get("isEstimated", "N/A"),
-                carbon.get("estimationMethod", "N/A"),
-                carbon.get("temporalGranularity", "N/A"),
-                carbon.get("_disclaimer", "N/A")
-            ]
-        }
+        st.table(services.carbon_reading_table(carbon))
 
-        st.table(pd.DataFrame(carbon_data))
+        # Hourly history stored for this zone
+        zone_history = get_carbon_store().history(zone)
+        if len(zone_history) > 1:
+            st.line_chart(zone_history.set_index("Hour")["Carbon Intensity"])
 
-    else:
-        st.error(f"Electricity Maps API Error {resp.status_code}: {resp.text}")
+    # ------------------------
+    # Carbon intensity for every lead at once
+    # ------------------------
+    if st.checkbox("Show carbon intensity for all leads"):
+        with st.spinner("Fetching carbon intensity for all zones..."):
+            st.dataframe(leads_carbon_intensity(leads_df))
 
 
 if tab_selection == "Additional Insights":
@@ -1065,9 +740,8 @@ if tab_selection == "Targeted Marketing Strategy":
     # ------------------------------------------------------------------
     # Load the assignments (lead + salesperson combined profile)
     # ------------------------------------------------------------------
-    try:
-        assignment_df = pd.read_csv("assignments.csv")
-    except:
+    assignment_df = load_assignments_data()
+    if assignment_df.empty:
         st.error("Assignments not found. Please run Assignment tab first.")
         st.stop()
 
@@ -1078,7 +752,8 @@ if tab_selection == "Targeted Marketing Strategy":
     )
 
     # Extract full combined profile for this lead
-    lead_data = assignment_df[assignment_df["Business Name"] == selected_business].iloc[0].to_dict()
+    # (as a plain record, the way the dossier jobs hash it)
+    lead_data = assignment_df[assignment_df["Business Name"] == selected_business].to_dict("records")[0]
 
     # Try displaying nicely
     with st.expander("View Lead Profile Used for Strategy"):
@@ -1089,109 +764,21 @@ if tab_selection == "Targeted Marketing Strategy":
     # ------------------------------------------------------------------
     carbon_intensity = lead_data.get("CarbonIntensity", None)
 
-    # Load ODM PDF (context)
-    odm_pdf_path = "2024_odm_factsheet_italy.pdf"
-    odm_context = """
-    Italy's Open Data Maturity (ODM) 2024 indicates a highly advanced national digital ecosystem.
-
-    Key quick facts used for marketing context:
-    - Policy: 93.8  
-    - Portal: 89.6  
-    - Quality: 85.7  
-    - Impact: 100  
-    - Strong adoption of open data for local & regional development  
-    - Strong public initiatives supporting sustainability and green innovation
-    """
-
-    # ------------------------------------------------------------------
-    # Azure OpenAI ENV
-    # ------------------------------------------------------------------
-    AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-    AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-    AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
-    AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION")
-
     # ------------------------------------------------------------------
-    # Build the prompt to send ALL RELEVANT INFO to OpenAI
+    # CALL AZURE OPENAI with ALL RELEVANT INFO (lead, carbon, ODM context)
     # ------------------------------------------------------------------
 
-    prompt = f"""
-    You are an expert in marketing strategy, off-grid gas solutions, Italian SME behavior, 
-    and regional energy economics.
-
-    Create a **deeply personalized marketing strategy** for the exact restaurant lead below.
-
-    ===============================
-    LEAD PROFILE (FULL DATA INPUT)
-    ===============================
-    {json.dumps(lead_data, indent=2)}
-
-    ===============================
-    CARBON INTENSITY (IF AVAILABLE)
-    ===============================
-    {carbon_intensity}
-
-    ===============================
-    ITALY OPEN DATA MATURITY (ODM 2024)
-    USED TO UNDERSTAND ECONOMIC CONTEXT
-    ===============================
-    {odm_context}
-
-    ===============================
-    YOUR TASK
-    ===============================
-
-    Create a **highly tailored marketing strategy** ONLY for this specific lead.  
-    Base all reasoning strictly on the provided data.  
-    Do NOT generalize.  
-    Write the output in beautifully formatted MARKDOWN.
-
-    Include the following sections:
-
-    1. **Lead Summary**
-    2. **Operational Pain Points (Based on location, type, popularity, profit)**
-    3. **Energy Risk Profile (Using carbon intensity if provided)**
-    4. **Tailored Off-Grid Gas Solution Recommendation**
-    5. **Financial ROI Estimation (based strictly on lead data)**
-    6. **Environmental Impact & Emission Benefits**
-    7. **Recommended Messaging Style (tone, angle)**
-    8. **Targeted Outreach Plan (step-by-step)**
-    9. **Campaign Ideas (local incentives, context from ODM Italy)**
-
-    Make everything look clean with bold headers, bullet points, and spacing.
-    """
-
-    # ------------------------------------------------------------------
-    # CALL AZURE OPENAI
-    # ------------------------------------------------------------------
-
-    headers = {
-        "Authorization": f"Bearer {AZURE_OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    body = {
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": 1500,
-        "temperature": 0.3,
-    }
-
     # Using a spinner to indicate the request is in progress
     with st.spinner("Generating marketing strategy..."):
         try:
-            response = requests.post(
-                f"{AZURE_OPENAI_ENDPOINT}/openai/deployments/{AZURE_OPENAI_DEPLOYMENT_NAME}/chat/completions?api-version={AZURE_OPENAI_API_VERSION}",
-                headers=headers,
-                json=body,
-                timeout=45,
+            final_strategy = dossiers.get_artifact(
+                "strategy", selected_business, lead_data["Location"],
+                {"lead_data": lead_data, "carbon_intensity": carbon_intensity},
             )
 
-            if response.status_code != 200:
-                st.error(f"OpenAI Error {response.status_code}: {response.text}")
-                st.stop()
-
-            final_strategy = response.json()["choices"][0]["message"]["content"]
-
+        except OpenAIError as e:
+            st.error(f"OpenAI Error {e.status_code}: {e.text}")
+            st.stop()
         except Exception as e:
             st.error(f"OpenAI request failed: {e}")
             st.stop()
@@ -1207,4 +794,7 @@ if tab_selection == "Targeted Marketing Strategy":
     st.info("This strategy is automatically generated using Azure OpenAI using all relevant lead data, carbon intensity, and Italian economic insights.")
 
 
-
+# Poll background jobs: rerun the page until they finish, showing partial results meanwhile
+if pending_jobs:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
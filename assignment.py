@@ -0,0 +1,194 @@
+import logging
+import math
+
+import numpy as np
+import pandas as pd
+
+from italy_geo import address_coordinates, city_coordinates
+
+logger = logging.getLogger(__name__)
+
+# Relative weight of each matching criterion
+DEFAULT_ASSIGNMENT_WEIGHTS = {
+    "distance": 0.5,
+    "expertise": 0.35,
+    "experience": 0.15,
+}
+
+# Distances beyond this score zero on the distance criterion
+MAX_DISTANCE_KM = 600.0
+MAX_EXPERIENCE_YEARS = 20.0
+
+# Scores closer than this to the best candidate count as a tie
+TIE_EPSILON = 0.01
+
+# Largest lead x slot cost matrix the Hungarian method builds (~32 MB of floats);
+# bigger capacitated runs fall back to the greedy pass
+HUNGARIAN_MAX_CELLS = 4_000_000
+
+# Partial credit for expertise adjacent to the one needed
+EXPERTISE_AFFINITY = {
+    "Off-Grid Solutions": {
+        "Off-Grid Solutions": 1.0,
+        "Battery Storage": 0.6,
+        "Solar Power": 0.5,
+        "Renewable Energy Solutions": 0.5,
+        "Wind Energy": 0.4,
+        "Energy Efficiency": 0.3,
+    },
+}
+
+
+# Great-circle distance (km) between every pair of points, as a matrix
+def haversine_matrix(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    dlat = lat2[None, :] - lat1[:, None]
+    dlon = lon2[None, :] - lon1[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin(dlon / 2) ** 2
+    return 6371.0 * 2 * np.arcsin(np.sqrt(a))
+
+
+# Score every (lead, salesperson) pair in one vectorized pass.
+# Returns (scores, distances_km) matrices of shape (n_leads, n_salespeople).
+def score_matrix(leads_df, sales_df, expertise_needed, weights=None):
+    weights = {**DEFAULT_ASSIGNMENT_WEIGHTS, **(weights or {})}
+
+    lead_coordinates = [address_coordinates(address) or (np.nan, np.nan) for address in leads_df["Address"]]
+    sales_coordinates = [
+        city_coordinates(city) or (np.nan, np.nan) for city in sales_df["Location (City in Italy)"]
+    ]
+    lead_lat, lead_lon = np.array(lead_coordinates, dtype=float).reshape(-1, 2).T
+    sales_lat, sales_lon = np.array(sales_coordinates, dtype=float).reshape(-1, 2).T
+
+    distances = haversine_matrix(lead_lat, lead_lon, sales_lat, sales_lon)
+    # Unknown locations get a neutral distance score rather than excluding the pair
+    distance_score = np.where(np.isnan(distances), 0.5, 1.0 - np.clip(distances / MAX_DISTANCE_KM, 0.0, 1.0))
+
+    affinity = EXPERTISE_AFFINITY.get(expertise_needed, {expertise_needed: 1.0})
+    expertise_score = sales_df["Expertise in Off-Grid Energy"].map(affinity).fillna(0.0).to_numpy(dtype=float)
+
+    experience = pd.to_numeric(sales_df["Experience (Years)"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    experience_score = np.clip(experience / MAX_EXPERIENCE_YEARS, 0.0, 1.0)
+
+    scores = (
+        weights["distance"] * distance_score
+        + weights["expertise"] * expertise_score[None, :]
+        + weights["experience"] * experience_score[None, :]
+    )
+    return scores, distances
+
+
+# Pick one salesperson per lead, at most `capacity[j]` leads per salesperson.
+# Uses an optimal assignment (Hungarian, via scipy) when requested, available
+# and within HUNGARIAN_MAX_CELLS, otherwise a greedy pass over all pairs from
+# best to worst score.
+def _capacitated_assignment(scores, capacity, method):
+    n_leads, n_sales = scores.shape
+
+    # One column per free slot of each salesperson; no one can use more slots than there are leads
+    slots = np.repeat(np.arange(n_sales), np.minimum(capacity, n_leads))
+    if method == "hungarian" and n_leads * len(slots) > HUNGARIAN_MAX_CELLS:
+        logger.warning(
+            "Hungarian assignment of %d leads to %d slots exceeds %d cells; falling back to greedy assignment",
+            n_leads, len(slots), HUNGARIAN_MAX_CELLS,
+        )
+    elif method == "hungarian":
+        try:
+            from scipy.optimize import linear_sum_assignment
+        except ImportError:
+            logger.warning("scipy is not installed; falling back to greedy assignment")
+        else:
+            rows, cols = linear_sum_assignment(-scores[:, slots])
+            choice = np.full(n_leads, -1)
+            choice[rows] = slots[cols]
+            return choice
+
+    choice = np.full(n_leads, -1)
+    remaining = np.array(capacity, dtype=int)
+    order = np.argsort(-scores, axis=None, kind="stable")
+    for lead, sales in zip(*np.unravel_index(order, scores.shape)):
+        if choice[lead] == -1 and remaining[sales] > 0:
+            choice[lead] = sales
+            remaining[sales] -= 1
+    return choice
+
+
+# Match every lead to a salesperson locally.
+#   max_leads_per_salesperson - load-balancing cap (None means unlimited)
+#   method                    - "greedy" or "hungarian" when a cap is set
+#   tie_breaker               - optional fn(ties) -> [Sales Person ID or None], called once with
+#                               a (lead_row, candidates_df) pair for every lead whose top
+#                               score is tied, so all ties can be settled in one batch
+#   max_tie_candidates        - best-scoring candidates passed per tie (None means all)
+def assign_leads(leads_df, sales_df, expertise_needed="Off-Grid Solutions", weights=None,
+                 max_leads_per_salesperson=None, method="greedy", tie_breaker=None, max_tie_candidates=None):
+    columns = [
+        "Business Name", "Location", "Sales Person ID", "Sales Person Name", "Sales Person Location",
+        "Expertise", "Experience", "Match Score", "Distance (km)",
+    ]
+    if leads_df.empty or sales_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    leads_df = leads_df.reset_index(drop=True)
+    sales_df = sales_df.reset_index(drop=True)
+    scores, distances = score_matrix(leads_df, sales_df, expertise_needed, weights)
+
+    cap = None
+    if max_leads_per_salesperson is None:
+        choice = scores.argmax(axis=1)
+    else:
+        # Never cap below what is needed to place every lead
+        cap = max(int(max_leads_per_salesperson), math.ceil(len(leads_df) / len(sales_df)))
+        choice = _capacitated_assignment(scores, np.full(len(sales_df), cap), method)
+
+    if tie_breaker is not None:
+        choice = _break_ties(leads_df, sales_df, scores, choice, tie_breaker, cap, max_tie_candidates)
+
+    lead_index = np.arange(len(leads_df))[choice >= 0]
+    chosen = choice[choice >= 0]
+    salespeople = sales_df.iloc[chosen].reset_index(drop=True)
+    return pd.DataFrame({
+        "Business Name": leads_df["Name"].iloc[lead_index].to_numpy(),
+        "Location": leads_df["Address"].iloc[lead_index].to_numpy(),
+        "Sales Person ID": salespeople["Sales Person ID"],
+        "Sales Person Name": salespeople["Name"],
+        "Sales Person Location": salespeople["Location (City in Italy)"],
+        "Expertise": salespeople["Expertise in Off-Grid Energy"],
+        "Experience": salespeople["Experience (Years)"],
+        "Match Score": np.round(scores[lead_index, chosen], 3),
+        "Distance (km)": np.round(distances[lead_index, chosen], 1),
+    }, columns=columns)
+
+
+# Let the tie breaker choose among candidates within TIE_EPSILON of the chosen score,
+# skipping salespeople that are already at their cap. Ties are collected first and
+# settled in one tie_breaker call; picks are then applied in lead order against the cap.
+def _break_ties(leads_df, sales_df, scores, choice, tie_breaker, cap=None, max_candidates=None):
+    load = np.bincount(choice[choice >= 0], minlength=len(sales_df))
+    tied_leads, tied_candidates = [], []
+    for lead in np.flatnonzero(choice >= 0):
+        current = choice[lead]
+        tied = np.flatnonzero(scores[lead] >= scores[lead, current] - TIE_EPSILON)
+        if cap is not None:
+            tied = tied[(load[tied] < cap) | (tied == current)]
+        if max_candidates is not None:
+            tied = tied[np.argsort(-scores[lead, tied], kind="stable")[:max_candidates]]
+        if len(tied) >= 2:
+            tied_leads.append(lead)
+            tied_candidates.append(tied)
+    if not tied_leads:
+        return choice
+
+    picked_ids = tie_breaker([(leads_df.iloc[lead], sales_df.iloc[tied]) for lead, tied in zip(tied_leads, tied_candidates)])
+    for lead, tied, picked_id in zip(tied_leads, tied_candidates, picked_ids):
+        current = choice[lead]
+        matches = np.flatnonzero(sales_df["Sales Person ID"].iloc[tied].to_numpy() == picked_id)
+        if not len(matches) or tied[matches[0]] == current:
+            continue
+        picked = tied[matches[0]]
+        if cap is not None and load[picked] >= cap:
+            continue
+        choice[lead] = picked
+        load[current] -= 1
+        load[picked] += 1
+    return choice
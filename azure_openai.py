@@ -0,0 +1,86 @@
+import os
+import time
+
+from http_client import get_http_client
+from llm_cache import fresh_answers_requested, get_completion_cache
+from metrics import get_metrics
+
+
+# Raised when Azure OpenAI answers with a non-200 status
+class OpenAIError(Exception):
+    def __init__(self, status_code, text):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+# Build the chat completions URL for the configured deployment
+def chat_completions_url():
+    endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+    deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+    api_version = os.getenv("AZURE_OPENAI_API_VERSION")
+    return f"{endpoint}/openai/deployments/{deployment}/chat/completions?api-version={api_version}"
+
+
+# Send a single-prompt chat completion and return the message content.
+# Answers are served from the shared completion cache when available; throttled
+# (429) and transient failures are retried by the shared HTTP client. Every call
+# is recorded in the LLM metrics under `call_site`, the feature making it.
+# `response_format` is passed through for deployments with JSON / schema mode.
+# With `fresh` (default: fresh_answers_requested()) the cached answer is skipped
+# but the new one still replaces it.
+def chat_completion(prompt, max_tokens, temperature, timeout=None, use_cache=True, call_site=None,
+                    response_format=None, fresh=None):
+    cache = get_completion_cache()
+    metrics = get_metrics()
+    key = cache.make_key(os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"), prompt, temperature, max_tokens, response_format)
+    started = time.perf_counter()
+
+    if fresh is None:
+        fresh = fresh_answers_requested()
+
+    if use_cache and not fresh:
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.record(call_site, time.perf_counter() - started, cache_hit=True)
+            return cached
+
+    headers = {
+        "Authorization": f"Bearer {os.getenv('AZURE_OPENAI_API_KEY')}",
+        "Content-Type": "application/json",
+    }
+    body = {
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+    if response_format is not None:
+        body["response_format"] = response_format
+
+    client = get_http_client()
+    try:
+        response = client.post("azure_openai", chat_completions_url(), headers=headers, json=body, timeout=timeout)
+    except Exception as e:
+        metrics.record(call_site, time.perf_counter() - started, retries=client.max_retries, error=str(e))
+        raise
+    retries = getattr(response, "attempts", 1) - 1
+    if response.status_code != 200:
+        metrics.record(
+            call_site, time.perf_counter() - started, retries=retries, error=f"HTTP {response.status_code}"
+        )
+        raise OpenAIError(response.status_code, response.text)
+
+    payload = response.json()
+    usage = payload.get("usage") or {}
+    metrics.record(
+        call_site,
+        time.perf_counter() - started,
+        prompt_tokens=usage.get("prompt_tokens", 0),
+        completion_tokens=usage.get("completion_tokens", 0),
+        retries=retries,
+    )
+
+    content = payload["choices"][0]["message"]["content"]
+    if use_cache:
+        cache.set(key, content)
+    return content
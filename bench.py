@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from urllib.request import urlopen
+
+import pandas as pd
+
+import services
+from carbon import get_carbon_intensity, leads_carbon_intensity
+from lead_store import LeadStore
+from synthetic_fixtures import FIXTURE_FILES, LEAD_FRACTION, write_fixtures
+
+# Headless benchmarks of the Lead-Mgmt.py tabs at growing fixture sizes,
+# against the local stub server standing in for Azure OpenAI and Electricity Maps.
+#   python bench.py --sizes 100 1000 --latency 0.05 --output bench_results.json
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+DEFAULT_LATENCY = 0.05          # Seconds per stubbed Azure OpenAI / Electricity Maps answer
+DEFAULT_SALESPEOPLE = 100
+DEFAULT_OUTPUT = "bench_results.json"
+
+# Tabs in the order a user walks through them; later tabs read what earlier ones stored
+TABS = [
+    "prospects", "leads", "assignment", "lead_information", "sales_email", "carbon_intensity", "marketing_strategy",
+]
+
+
+# Ranked grid of `businesses` as the Prospects and Leads tabs build it
+def _ranked_grid(store, businesses, llm_ranking, grid):
+    synthetic_data_batch = services.synthetic_data_batch(businesses["Name"].tolist(), store)
+    ranks = services.rank_synthetic_batch(synthetic_data_batch, use_llm=llm_ranking)
+    table, match_report = grid(businesses, synthetic_data_batch, ranks)
+    return {"rows": len(table), "missing_synthetic": len(match_report["missing_synthetic"])}
+
+
+def tab_prospects(store, options):
+    prospects_df = services.new_prospects(store.load_businesses("restaurants"), store)
+    return _ranked_grid(store, prospects_df, options["llm_ranking"], services.prospects_grid)
+
+
+def tab_leads(store, options):
+    return _ranked_grid(store, store.load_businesses("leads"), options["llm_ranking"], services.leads_grid)
+
+
+def tab_assignment(store, options):
+    leads_df, sales_df = store.load_businesses("leads"), store.load_salespeople()
+    assignment_df = services.assign_and_store(leads_df, sales_df, use_llm_tie_break=options["llm_tie_break"], store=store)
+    # Estimated size of the salesperson prompts, full roster per lead against compact batches
+    return {"rows": len(assignment_df), **services.salesperson_prompt_tokens(leads_df, sales_df)}
+
+
+def tab_lead_information(store, options):
+    lead = store.load_businesses("leads").iloc[0]
+    return {"chars": len(services.business_information(lead["Name"], lead["Address"]))}
+
+
+def tab_sales_email(store, options):
+    lead = store.load_businesses("leads").iloc[0]
+    salesperson, _ = services.salesperson_for_lead(lead["Name"], store.load_assignments(), store.load_salespeople())
+    context = services.business_summary(lead["Name"], lead["Address"])
+    return {"chars": len(services.sales_email(lead["Name"], salesperson, context))}
+
+
+def tab_carbon_intensity(store, options):
+    leads_df = store.load_businesses("leads")
+    lead_zones = services.lead_zones_table(leads_df)
+    carbon = get_carbon_intensity(services.lead_zone(leads_df.iloc[0].to_dict())["zone"])
+    services.carbon_reading_table(carbon)
+    all_leads = leads_carbon_intensity(leads_df)
+    return {"rows": len(all_leads), "unresolved": int(lead_zones["Zone"].isna().sum())}
+
+
+def tab_marketing_strategy(store, options):
+    lead_data = store.load_assignments().iloc[0].to_dict()
+    return {"chars": len(services.marketing_strategy(lead_data, lead_data.get("CarbonIntensity")))}
+
+
+TAB_FUNCTIONS = {name: globals()[f"tab_{name}"] for name in TABS}
+
+
+def _stub_stats(stub_url):
+    with urlopen(f"{stub_url}/_stats") as response:
+        return json.load(response)
+
+
+# Run `fn` and measure wall time, stub traffic and peak traced memory
+def _measure(fn, stub_url):
+    before = _stub_stats(stub_url)
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        detail, error = fn(), None
+    except Exception as e:
+        detail, error = {}, f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    after = _stub_stats(stub_url)
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    result = {
+        "seconds": round(seconds, 4),
+        "outbound_calls": delta("requests"),
+        "llm_calls": delta("chat_requests"),
+        "carbon_calls": delta("carbon_requests"),
+        "prompt_tokens": delta("prompt_tokens"),
+        "completion_tokens": delta("completion_tokens"),
+        "peak_memory_mb": round(peak / 2 ** 20, 2),
+        **detail,
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+# Peak resident memory of this process in MB, or None where the resource
+# module is missing (Windows)
+def _max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+# One fixture size, in this process: import the fixtures into a fresh store and run every tab
+def run_size(workdir, stub_url, tabs, options):
+    store = LeadStore(os.path.join(workdir, "leads.sqlite3"))
+    started = time.perf_counter()
+    # Fixture CSVs only; the working directory's assignments.csv is left out
+    sources = {table: os.path.join(workdir, name) for table, name in FIXTURE_FILES.items()}
+    store.import_csvs({**sources, "assignments": None})
+    results = {"import_seconds": round(time.perf_counter() - started, 4), "tabs": {}}
+
+    for name in tabs:
+        results["tabs"][name] = _measure(lambda: TAB_FUNCTIONS[name](store, options), stub_url)
+    results["max_rss_mb"] = _max_rss_mb()
+    return results
+
+
+# Each size runs in its own process, so caches, singletons and peak memory start fresh
+def run_benchmarks(sizes, latency=DEFAULT_LATENCY, tabs=TABS, salespeople=DEFAULT_SALESPEOPLE, seed=0,
+                   lead_fraction=LEAD_FRACTION, llm_ranking=False, llm_tie_break=False):
+    from stub_server import start_stub_server
+
+    server = start_stub_server(latency=latency)
+    runs = []
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory(prefix=f"bench-{size}-") as workdir:
+                counts = write_fixtures(workdir, size, salespeople=salespeople, seed=seed, lead_fraction=lead_fraction)
+                env = {
+                    **os.environ,
+                    "AZURE_OPENAI_ENDPOINT": server.base_url,
+                    "AZURE_OPENAI_DEPLOYMENT_NAME": "bench",
+                    "AZURE_OPENAI_API_VERSION": "bench",
+                    "AZURE_OPENAI_API_KEY": "bench",
+                    "ELECTRICITYMAPS_BASE_URL": f"{server.base_url}/v3",
+                    "ELECTRICITYMAPS_API_KEY": "bench",
+                    "LEAD_STORE_PATH": os.path.join(workdir, "leads.sqlite3"),
+                    "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite3"),
+                    "CARBON_INTENSITY_STORE_PATH": os.path.join(workdir, "carbon_intensity.sqlite3"),
+                    "METRICS_PATH": os.path.join(workdir, "metrics.sqlite3"),
+                }
+                command = [
+                    sys.executable, os.path.abspath(__file__), "--run-size", workdir, "--stub-url", server.base_url,
+                    "--tabs", *tabs,
+                ] + (["--llm-ranking"] if llm_ranking else []) + (["--llm-tie-break"] if llm_tie_break else [])
+                completed = subprocess.run(command, env=env, capture_output=True, text=True)
+                if completed.returncode != 0:
+                    raise RuntimeError(f"Benchmark of {size} rows failed:\n{completed.stderr}")
+                runs.append({"rows": size, "fixtures": counts, **json.loads(completed.stdout.splitlines()[-1])})
+    finally:
+        server.shutdown()
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "latency": latency,
+        "seed": seed,
+        "lead_fraction": lead_fraction,
+        "llm_ranking": llm_ranking,
+        "llm_tie_break": llm_tie_break,
+        "runs": runs,
+    }
+
+
+def print_report(report):
+    rows = []
+    for run in report["runs"]:
+        for name, tab in run["tabs"].items():
+            rows.append({
+                "rows": run["rows"], "tab": name, "seconds": tab["seconds"], "calls": tab["outbound_calls"],
+                "prompt_tokens": tab["prompt_tokens"], "peak_mb": tab["peak_memory_mb"], "error": tab.get("error", ""),
+            })
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Lead-Mgmt.py tabs headless against the stub server.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Restaurant rows per fixture")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="Seconds per stubbed API answer")
+    parser.add_argument("--tabs", nargs="+", choices=TABS, default=TABS)
+    parser.add_argument("--salespeople", type=int, default=DEFAULT_SALESPEOPLE)
+    parser.add_argument("--lead-fraction", type=float, default=LEAD_FRACTION, help="Share of restaurants that are leads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-ranking", action="store_true", help="Rank with one LLM call per business")
+    parser.add_argument("--llm-tie-break", action="store_true", help="Break assignment ties with the LLM")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file for the results")
+    # Internal: run one size in a child process
+    parser.add_argument("--run-size", help=argparse.SUPPRESS)
+    parser.add_argument("--stub-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size:
+        options = {"llm_ranking": args.llm_ranking, "llm_tie_break": args.llm_tie_break}
+        print(json.dumps(run_size(args.run_size, args.stub_url, args.tabs, options)))
+    else:
+        report = run_benchmarks(
+            args.sizes, latency=args.latency, tabs=args.tabs, salespeople=args.salespeople, seed=args.seed,
+            lead_fraction=args.lead_fraction, llm_ranking=args.llm_ranking, llm_tie_break=args.llm_tie_break,
+        )
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print_report(report)
+        print(f"Results written to {args.output}")
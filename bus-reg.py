@@ -1,52 +1,25 @@
-import random
-import pandas as pd
-from faker import Faker
-
-# Initialize Faker instance for generating random names
-fake = Faker()
-
-# List of Italian cities
-italian_cities = [
-    "Rome", "Milan", "Naples", "Turin", "Palermo", "Genoa", "Bologna", "Florence", "Venice", "Verona",
-    "Messina", "Padua", "Trieste", "Bari", "Catania", "Brescia", "Reggio Calabria", "Modena", "Cagliari", "Parma"
-]
-
-# List of expertise in off-grid energy (you can expand it)
-expertise_list = [
-    "Solar Power", "Wind Energy", "Battery Storage", "Off-Grid Solutions", "Renewable Energy Solutions", "Energy Efficiency"
-]
-
-# Function to generate synthetic salesperson data
-def generate_synthetic_sales_data(num_salespersons):
-    sales_data = []
-    
-    for _ in range(num_salespersons):
-        salesperson_id = f"SP-{random.randint(1000, 9999)}"  # Generate a unique Salesperson ID
-        name = fake.name()  # Generate a random name
-        experience = random.randint(1, 20)  # Random experience between 1 and 20 years
-        expertise = random.choice(expertise_list)  # Randomly select expertise
-        city = random.choice(italian_cities)  # Randomly select city in Italy
-        
-        sales_data.append({
-            "Sales Person ID": salesperson_id,
-            "Name": name,
-            "Experience (Years)": experience,
-            "Expertise in Off-Grid Energy": expertise,
-            "Location (City in Italy)": city
-        })
-    
-    return sales_data
-
-# Generate data for 100 salespeople (you can change the number as needed)
-num_salespersons = 100
-sales_data = generate_synthetic_sales_data(num_salespersons)
-
-# Create a DataFrame
-sales_df = pd.DataFrame(sales_data)
-
-# Save the DataFrame to a CSV file
-csv_file_path = "synthetic_sales_data.csv"
-sales_df.to_csv(csv_file_path, index=False)
-
-# Print success message
-print(f"Synthetic sales data CSV has been created and saved as '{csv_file_path}'!")
+import argparse
+
+from synthetic_fixtures import generate_salespeople, write_fixtures
+
+# Generate synthetic salespeople (and, with --fixtures, restaurants, leads and customers)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic sales data and load-test fixtures.")
+    parser.add_argument("--rows", type=int, default=100, help="Number of salespeople to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed gives the same data")
+    parser.add_argument("--output", default="synthetic_sales_data.csv", help="CSV file for the salespeople")
+    parser.add_argument("--fixtures", metavar="DIR", help="Write a full fixture set (restaurants, leads, customers, salespeople) to DIR")
+    parser.add_argument("--restaurants", type=int, default=1000000, help="Restaurants in the fixture set")
+    parser.add_argument("--faker", action="store_true", help="Use Faker for salesperson names, if installed (slower)")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        counts = write_fixtures(args.fixtures, args.restaurants, salespeople=args.rows, seed=args.seed, use_faker=args.faker)
+        print(f"Fixtures written to '{args.fixtures}': {counts}")
+    else:
+        # Create the salespeople DataFrame and save it to a CSV file
+        sales_df = generate_salespeople(args.rows, seed=args.seed, use_faker=args.faker)
+        sales_df.to_csv(args.output, index=False)
+
+        # Print success message
+        print(f"Synthetic sales data CSV has been created and saved as '{args.output}'!")
@@ -0,0 +1,291 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import astuple, dataclass
+from itertools import islice
+
+import pandas as pd
+
+from enrichment import normalize_business_keys
+from italy_geo import normalize_place_name
+
+DEFAULT_REGISTER_PATH = "business_register.sqlite3"
+
+# Register exports loaded on first use (or with `python business_register.py ingest`)
+REGISTER_SOURCES = ["Italian-Business-Register.txt"]
+
+# Line that follows the company name in every record
+OFFICE_LABELS = {"Registered Office", "Sede legale"}
+
+# Pagination banners of the export ("Shown from 1 to 75 of 298.263 results")
+BANNER_PREFIXES = ("Shown from ", "Visualizzati da ")
+
+INGEST_BATCH_SIZE = 10000
+
+# Register companies offered as prospects at a time; every prospect costs LLM enrichment
+PROSPECT_PAGE_SIZE = 200
+
+# App column name -> record field
+REGISTER_COLUMNS = {
+    "Name": "name",
+    "City": "city",
+    "Legal Form": "legal_form",
+    "Status": "status",
+    "Office": "office",
+}
+
+
+# One company of a register export
+@dataclass(frozen=True)
+class RegisterRecord:
+    name: str
+    city: str
+    legal_form: str
+    status: str = ""
+    office: str = "Registered Office"
+
+
+# Parse register lines into records, one at a time, in constant memory.
+# A record is an optional status marker ("ko"), the company name (possibly
+# quoted), an office label, a blank line, the city and the legal form; page
+# banners and stray blank lines between records are skipped.
+def iter_register_records(lines):
+    previous = []     # Last two meaningful lines before an office label
+    record = None     # Fields collected after the office label
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith(BANNER_PREFIXES):
+            continue
+
+        if record is not None:
+            record.append(line)
+            if len(record) == 4:
+                status, name, city, legal_form = record
+                yield RegisterRecord(name=name, city=city, legal_form=legal_form, status=status, office=office)
+                record = None
+            continue
+
+        if line in OFFICE_LABELS and previous:
+            name = previous[-1].strip('"').strip()
+            # A short line before the name is the status marker; a record cut by a page break has none
+            status = previous[-2] if len(previous) == 2 and len(previous[-2]) <= 3 else ""
+            office = line
+            record = [status, name]
+            previous = []
+        else:
+            previous = (previous + [line])[-2:]
+
+
+# Records of a register export file, read lazily line by line
+def iter_register_file(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        yield from iter_register_records(f)
+
+
+# SQLite index of register records, queryable by city and legal form
+class BusinessRegister:
+    def __init__(self, path=DEFAULT_REGISTER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS companies (
+                    name_key TEXT NOT NULL,
+                    city_key TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    city TEXT NOT NULL,
+                    legal_form TEXT,
+                    status TEXT,
+                    office TEXT,
+                    source TEXT,
+                    PRIMARY KEY (name_key, city_key)
+                );
+                CREATE INDEX IF NOT EXISTS idx_companies_city ON companies (city_key, legal_form);
+                CREATE INDEX IF NOT EXISTS idx_companies_legal_form ON companies (legal_form);
+                CREATE TABLE IF NOT EXISTS entity_links (
+                    place_key TEXT NOT NULL,
+                    place_address TEXT NOT NULL,
+                    place_name TEXT,
+                    company_name TEXT,
+                    city TEXT,
+                    legal_form TEXT,
+                    confidence REAL,
+                    linked_at REAL,
+                    PRIMARY KEY (place_key, place_address)
+                );
+                CREATE TABLE IF NOT EXISTS ingested_files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime REAL,
+                    records INTEGER,
+                    ingested_at REAL
+                );
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # Write records in fixed-size batches so memory stays flat for any file size.
+    # Companies already indexed under the same name and city are kept once.
+    def ingest(self, records, source=""):
+        total = 0
+        records = iter(records)
+        with self._lock, self._connect() as conn:
+            while True:
+                batch = list(islice(records, INGEST_BATCH_SIZE))
+                if not batch:
+                    break
+                name_keys = normalize_business_keys([r.name for r in batch])
+                rows = [
+                    (name_key, normalize_place_name(r.city), *astuple(r), source)
+                    for name_key, r in zip(name_keys, batch)
+                ]
+                conn.executemany(
+                    "INSERT OR REPLACE INTO companies (name_key, city_key, name, city, legal_form, status, office, source) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                total += len(rows)
+        return total
+
+    # Ingest an export file unless this exact file (size and mtime) was already loaded
+    def ingest_file(self, path, force=False):
+        stat = os.stat(path)
+        with self._connect() as conn:
+            row = conn.execute("SELECT size, mtime FROM ingested_files WHERE path = ?", (path,)).fetchone()
+        if row == (stat.st_size, stat.st_mtime) and not force:
+            return 0
+
+        total = self.ingest(iter_register_file(path), source=os.path.basename(path))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ingested_files (path, size, mtime, records, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime, total, time.time()),
+            )
+        return total
+
+    # Companies filtered by city and/or legal form, with the app's column names
+    @staticmethod
+    def _where(city=None, legal_form=None):
+        conditions, params = [], []
+        if city:
+            conditions.append("city_key = ?")
+            params.append(normalize_place_name(city))
+        if legal_form:
+            conditions.append("legal_form = ?")
+            params.append(legal_form)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    def query(self, city=None, legal_form=None, limit=None, offset=0):
+        where, params = self._where(city, legal_form)
+        query = f"SELECT {', '.join(REGISTER_COLUMNS.values())} FROM companies{where} ORDER BY rowid"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [int(limit), int(offset)]
+
+        conn = self._connect()
+        try:
+            df = pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+        return df.rename(columns={v: k for k, v in REGISTER_COLUMNS.items()})
+
+    # Number of companies matching the filters
+    def count(self, city=None, legal_form=None):
+        where, params = self._where(city, legal_form)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM companies{where}", params).fetchone()[0]
+
+    # Distinct cities and legal forms, for filter widgets
+    def facets(self):
+        with self._connect() as conn:
+            cities = [row[0] for row in conn.execute("SELECT MIN(city) FROM companies GROUP BY city_key ORDER BY 1")]
+            legal_forms = [row[0] for row in conn.execute("SELECT DISTINCT legal_form FROM companies ORDER BY legal_form")]
+        return {"cities": cities, "legal_forms": legal_forms}
+
+    # Store resolved Places -> register links; re-linking a restaurant replaces its row
+    def upsert_links(self, links):
+        if links.empty:
+            return 0
+        place_keys = normalize_business_keys(links["Places Name"]).tolist()
+        now = time.time()
+        rows = [
+            (key, row["Places Address"], row["Places Name"], row["Register Name"], row["City"],
+             row["Legal Form"], float(row["Confidence"]), now)
+            for key, (_, row) in zip(place_keys, links.iterrows())
+        ]
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entity_links (place_key, place_address, place_name, company_name, city, "
+                "legal_form, confidence, linked_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def load_links(self, min_confidence=0.0):
+        conn = self._connect()
+        try:
+            df = pd.read_sql_query(
+                "SELECT place_name, place_address, company_name, city, legal_form, confidence FROM entity_links "
+                "WHERE confidence >= ? ORDER BY confidence DESC",
+                conn, params=(min_confidence,),
+            )
+        finally:
+            conn.close()
+        return df.rename(columns={
+            "place_name": "Places Name", "place_address": "Places Address", "company_name": "Register Name",
+            "city": "City", "legal_form": "Legal Form", "confidence": "Confidence",
+        })
+
+
+# Register companies shaped like the prospects table (Name, Address, Type, ...).
+# The city stands in for the address, which the register export does not carry.
+# One page of `limit` companies at a time (all of them with limit=None).
+def register_prospects(register, city=None, legal_form=None, limit=PROSPECT_PAGE_SIZE, page=0):
+    df = register.query(city=city, legal_form=legal_form, limit=limit, offset=page * (limit or 0))
+    return pd.DataFrame({
+        "Name": df["Name"],
+        "Address": df["City"],
+        "Type": df["Legal Form"],
+        "Profit": float("nan"),
+        "Popularity": float("nan"),
+    })
+
+
+_business_register = None
+_business_register_lock = threading.Lock()
+
+
+# Shared register; loads the known export files that are new or changed
+def get_business_register():
+    global _business_register
+    with _business_register_lock:
+        if _business_register is None:
+            _business_register = BusinessRegister(os.getenv("BUSINESS_REGISTER_PATH", DEFAULT_REGISTER_PATH))
+            for path in REGISTER_SOURCES:
+                if os.path.exists(path):
+                    _business_register.ingest_file(path)
+        return _business_register
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index Italian Business Register exports.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = subparsers.add_parser("ingest", help="Load register export files")
+    ingest_parser.add_argument("files", nargs="*", default=REGISTER_SOURCES)
+    ingest_parser.add_argument("--force", action="store_true", help="Reload files that were already ingested")
+    query_parser = subparsers.add_parser("query", help="List indexed companies")
+    query_parser.add_argument("--city")
+    query_parser.add_argument("--legal-form")
+    query_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    register = BusinessRegister(os.getenv("BUSINESS_REGISTER_PATH", DEFAULT_REGISTER_PATH))
+    if args.command == "ingest":
+        for path in args.files:
+            print(f"{path}: {register.ingest_file(path, force=args.force)} records")
+    else:
+        print(register.query(city=args.city, legal_form=args.legal_form, limit=args.limit).to_string(index=False))
@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from http_client import get_http_client
+from zones import ZONES, resolve_zones
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.electricitymaps.com/v3"
+DEFAULT_STORE_PATH = "carbon_intensity.sqlite3"
+
+
+# Raised when Electricity Maps answers with a non-200 status
+class CarbonIntensityError(Exception):
+    def __init__(self, status_code, text):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+# Hour bucket (UTC) a reading belongs to, e.g. "2026-10-16T13"
+def hour_bucket(timestamp=None):
+    moment = datetime.fromtimestamp(timestamp if timestamp is not None else time.time(), tz=timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H")
+
+
+# On-disk history of carbon intensity readings, one per (zone, hour bucket)
+class CarbonIntensityStore:
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS carbon_intensity (
+                    zone TEXT NOT NULL,
+                    hour_bucket TEXT NOT NULL,
+                    carbon_intensity REAL,
+                    fetched_at REAL NOT NULL,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (zone, hour_bucket)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, zone, bucket):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload FROM carbon_intensity WHERE zone = ? AND hour_bucket = ?", (zone, bucket)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, zone, bucket, payload):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO carbon_intensity VALUES (?, ?, ?, ?, ?)",
+                (zone, bucket, payload.get("carbonIntensity"), time.time(), json.dumps(payload)),
+            )
+
+    # Stored readings for one zone (or all zones), oldest first
+    def history(self, zone=None, limit=24 * 7):
+        query = "SELECT zone, hour_bucket, carbon_intensity FROM carbon_intensity"
+        params = ()
+        if zone:
+            query += " WHERE zone = ?"
+            params = (zone,)
+        query += " ORDER BY hour_bucket DESC LIMIT ?"
+        with self._connect() as conn:
+            df = pd.read_sql_query(query, conn, params=params + (limit,))
+        return df.rename(columns={"zone": "Zone", "hour_bucket": "Hour", "carbon_intensity": "Carbon Intensity"}).iloc[::-1]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+# Shared store; prefetch_zones asks for it from its worker threads
+def get_carbon_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CarbonIntensityStore(os.getenv("CARBON_INTENSITY_STORE_PATH", DEFAULT_STORE_PATH))
+        return _store
+
+
+# Call Electricity Maps for the latest reading of one zone.
+# ELECTRICITYMAPS_BASE_URL can point at a local stub server.
+def fetch_latest_carbon_intensity(zone):
+    base_url = os.getenv("ELECTRICITYMAPS_BASE_URL", DEFAULT_BASE_URL).rstrip("/")
+    headers = {"auth-token": os.getenv("ELECTRICITYMAPS_API_KEY")}
+    response = get_http_client().get(
+        "electricity_maps", f"{base_url}/carbon-intensity/latest", headers=headers, params={"zone": zone}
+    )
+    if response.status_code != 200:
+        raise CarbonIntensityError(response.status_code, response.text)
+    return response.json()
+
+
+# Latest reading for a zone, fetched at most once per zone per hour
+def get_carbon_intensity(zone, timestamp=None):
+    store = get_carbon_store()
+    bucket = hour_bucket(timestamp)
+    payload = store.get(zone, bucket)
+    if payload is None:
+        payload = fetch_latest_carbon_intensity(zone)
+        store.put(zone, bucket, payload)
+    return payload
+
+
+# Fill the current hour bucket for every zone concurrently; failed zones map to None
+def prefetch_zones(zones=ZONES, max_workers=None):
+    def fetch(zone):
+        try:
+            return get_carbon_intensity(zone)
+        except Exception as e:
+            logger.error("Carbon intensity fetch failed for %s: %s", zone, e)
+            return None
+
+    zones = list(zones)
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(zones))) as executor:
+        return dict(zip(zones, executor.map(fetch, zones)))
+
+
+# Current carbon intensity for every lead, by joining leads to their zones
+def leads_carbon_intensity(leads_df):
+    lead_zones = resolve_zones(leads_df["Address"])
+    lead_zones.insert(0, "Name", leads_df["Name"].values)
+
+    readings = prefetch_zones(sorted(set(lead_zones["Zone"].dropna())))
+    zone_df = pd.DataFrame([
+        {
+            "Zone": zone,
+            "Carbon Intensity (gCO₂/kWh)": payload.get("carbonIntensity") if payload else None,
+            "Datetime": payload.get("datetime") if payload else None,
+        }
+        for zone, payload in readings.items()
+    ], columns=["Zone", "Carbon Intensity (gCO₂/kWh)", "Datetime"])
+    return lead_zones.merge(zone_df, on="Zone", how="left")
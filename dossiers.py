@@ -0,0 +1,267 @@
+import argparse
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+
+import services
+from enrichment import normalize_business_keys
+from prompts import business_information_prompt, business_summary_prompt, marketing_strategy_prompt, sales_email_prompt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DOSSIER_PATH = "dossiers.sqlite3"
+DEFAULT_MAX_WORKERS = 4
+
+# Per-lead artifacts, in generation order (the email opens with the summary)
+ARTIFACTS = ("information", "summary", "email", "strategy")
+
+
+def _hash(value):
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Hash of an artifact's prompt template: the prompt rendered with placeholder
+# inputs, so any edit to the template text changes it
+@lru_cache(maxsize=None)
+def template_hash(artifact):
+    if artifact == "information":
+        prompt = business_information_prompt("{name}", "{address}")
+    elif artifact == "summary":
+        prompt = business_summary_prompt("{name}", "{address}")
+    elif artifact == "email":
+        prompt = sales_email_prompt("{name}", "{salesperson}", "{location}", "{experience}", "{context}")
+    elif artifact == "strategy":
+        prompt = marketing_strategy_prompt({"lead": "{lead}"}, "{carbon_intensity}")
+    else:
+        raise ValueError(f"Unknown dossier artifact {artifact!r}, expected one of {ARTIFACTS}")
+    return _hash(prompt)
+
+
+# Inputs of every artifact that can be built for a lead. Email and strategy
+# need the lead's assignment row; the email also needs the summary text.
+def artifact_inputs(lead, assignment=None, business_context=None):
+    inputs = {
+        "information": {"name": lead["Name"], "address": lead["Address"]},
+        "summary": {"name": lead["Name"], "address": lead["Address"]},
+    }
+    if assignment is not None:
+        if business_context is not None:
+            inputs["email"] = {
+                "name": lead["Name"],
+                "salesperson": {
+                    "name": assignment["Sales Person Name"],
+                    "experience": assignment["Experience"],
+                    "location": assignment["Sales Person Location"],
+                    "expertise": services.SALES_EXPERTISE,
+                },
+                "business_context": business_context,
+            }
+        inputs["strategy"] = {"lead_data": assignment, "carbon_intensity": assignment.get("CarbonIntensity")}
+    return inputs
+
+
+# Ask the LLM for one artifact
+def generate_artifact(artifact, inputs):
+    if artifact == "information":
+        return services.business_information(inputs["name"], inputs["address"])
+    if artifact == "summary":
+        return services.business_summary(inputs["name"], inputs["address"])
+    if artifact == "email":
+        return services.sales_email(inputs["name"], inputs["salesperson"], inputs["business_context"])
+    if artifact == "strategy":
+        return services.marketing_strategy(inputs["lead_data"], inputs["carbon_intensity"])
+    raise ValueError(f"Unknown dossier artifact {artifact!r}, expected one of {ARTIFACTS}")
+
+
+class DossierStore:
+    """
+    Precomputed per-lead LLM artifacts (business information, summary, sales
+    email, marketing strategy), backed by SQLite.
+
+    Each artifact is stored with a hash of its inputs (the lead record and,
+    for email and strategy, its assignment) and of its prompt template. It is
+    fresh while both still match, so leads are regenerated incrementally: only
+    when their record or a template changes.
+    """
+
+    def __init__(self, path=DEFAULT_DOSSIER_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    name_key TEXT NOT NULL,
+                    address TEXT NOT NULL,
+                    artifact TEXT NOT NULL,
+                    name TEXT,
+                    input_hash TEXT NOT NULL,
+                    template_hash TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    generated_at REAL NOT NULL,
+                    PRIMARY KEY (name_key, address, artifact)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _key(name, address):
+        return normalize_business_keys([name]).iloc[0], address or ""
+
+    # Stored content of an artifact if it is fresh for `inputs`, else None
+    def get(self, name, address, artifact, inputs):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT content, input_hash, template_hash FROM artifacts WHERE name_key = ? AND address = ? AND artifact = ?",
+                (*self._key(name, address), artifact),
+            ).fetchone()
+        fresh = row is not None and row[1] == _hash(inputs) and row[2] == template_hash(artifact)
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row[0] if fresh else None
+
+    def put(self, name, address, artifact, inputs, content):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (name_key, address, artifact, name, input_hash, template_hash, content, "
+                "generated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*self._key(name, address), artifact, name, _hash(inputs), template_hash(artifact), content, time.time()),
+            )
+
+    # Every stored artifact of a lead, fresh or not: {artifact: content}
+    def load(self, name, address):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT artifact, content FROM artifacts WHERE name_key = ? AND address = ?", self._key(name, address)
+            ).fetchall()
+        return dict(rows)
+
+    def stats(self):
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT artifact, COUNT(*) FROM artifacts GROUP BY artifact").fetchall())
+        return {"hits": self.hits, "misses": self.misses, "artifacts": counts}
+
+
+# Artifact content for a lead: a local read when the stored one is fresh,
+# otherwise generated now (and stored) unless `generate` is off.
+def get_artifact(artifact, name, address, inputs, generate=True, store=None):
+    store = store or get_dossier_store()
+    content = store.get(name, address, artifact, inputs)
+    if content is not None or not generate:
+        return content
+
+    content = generate_artifact(artifact, inputs)
+    if content:
+        store.put(name, address, artifact, inputs, content)
+    return content
+
+
+# Bring every artifact of one lead up to date.
+# Returns {artifact: "fresh" | "generated" | "failed" | "skipped"}.
+def build_dossier(lead, assignment=None, store=None):
+    store = store or get_dossier_store()
+    statuses = {}
+    business_context = None
+
+    for artifact in ARTIFACTS:
+        inputs = artifact_inputs(lead, assignment, business_context).get(artifact)
+        if inputs is None:
+            statuses[artifact] = "skipped"
+            continue
+
+        content = store.get(lead["Name"], lead["Address"], artifact, inputs)
+        if content is not None:
+            statuses[artifact] = "fresh"
+        else:
+            try:
+                content = generate_artifact(artifact, inputs)
+            except Exception as e:
+                logger.error("Dossier %s for %r failed: %s", artifact, lead["Name"], e)
+                content = None
+            if content:
+                store.put(lead["Name"], lead["Address"], artifact, inputs, content)
+                statuses[artifact] = "generated"
+            else:
+                statuses[artifact] = "failed"
+
+        if artifact == "summary":
+            business_context = content or ""
+    return statuses
+
+
+# Build dossiers for many leads concurrently. Assignments are matched by
+# business name and address. `on_result(name, statuses)` is called from the
+# calling thread as each lead finishes. Returns the count per artifact status.
+def build_dossiers(leads_df, assignments_df=None, store=None, max_workers=None, on_result=None):
+    if max_workers is None:
+        max_workers = int(os.getenv("DOSSIER_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+    store = store or get_dossier_store()
+
+    assignments = {}
+    if assignments_df is not None and not assignments_df.empty:
+        for row in assignments_df.to_dict("records"):
+            assignments[(row["Business Name"], row["Location"])] = row
+
+    report = {}
+    leads = leads_df[["Name", "Address"]].to_dict("records")
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(
+                contextvars.copy_context().run, build_dossier, lead,
+                assignments.get((lead["Name"], lead["Address"])), store,
+            ): lead
+            for lead in leads
+        }
+        for future in as_completed(futures):
+            lead = futures[future]
+            statuses = future.result()
+            for artifact, status in statuses.items():
+                report.setdefault(artifact, {}).setdefault(status, 0)
+                report[artifact][status] += 1
+            if on_result is not None:
+                on_result(lead["Name"], statuses)
+    return report
+
+
+_dossier_store = None
+_dossier_store_lock = threading.Lock()
+
+
+def get_dossier_store():
+    global _dossier_store
+    with _dossier_store_lock:
+        if _dossier_store is None:
+            _dossier_store = DossierStore(os.getenv("DOSSIER_STORE_PATH", DEFAULT_DOSSIER_PATH))
+        return _dossier_store
+
+
+if __name__ == "__main__":
+    from lead_store import get_lead_store
+
+    parser = argparse.ArgumentParser(description="Precompute lead dossiers (information, summary, email, strategy).")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--limit", type=int, help="Only the first N leads")
+    args = parser.parse_args()
+
+    lead_store = get_lead_store()
+    leads_df = lead_store.load_businesses("leads")
+    if args.limit is not None:
+        leads_df = leads_df.head(args.limit)
+    started = time.perf_counter()
+    print(build_dossiers(leads_df, lead_store.load_assignments(), max_workers=args.workers))
+    print(f"{len(leads_df)} leads in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,175 @@
+import contextvars
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from structured_output import SyntheticRecord, request_keyed_records
+
+logger = logging.getLogger(__name__)
+
+# Size bounds for one synthetic-data request
+DEFAULT_CHUNK_SIZE = 20             # Businesses per request
+DEFAULT_MAX_CHUNK_CHARS = 2000      # Characters of business names per request
+TOKENS_PER_BUSINESS = 80            # Completion budget per returned JSON object
+DEFAULT_MAX_WORKERS = 4
+
+# Fields of one synthetic-data record
+SYNTHETIC_FIELDS = ["business_name", "estimated_revenue", "market_share", "credit_score", "location_rating"]
+
+SYNTHETIC_DATA_PROMPT = """
+    Please provide the following data for each restaurant in valid JSON format:
+    - Use proper commas between items.
+    - Ensure no trailing commas at the end of the array or objects.
+    - All keys and string values should be properly quoted (double quotes).
+    - Every JSON object must be properly structured and have the necessary commas to separate each entry in the array.
+    - The response should be a JSON array with each object representing a restaurant and having the following fields: "business_name", "estimated_revenue", "market_share", "credit_score", "location_rating".
+
+    For the "estimated_revenue" and "market_share", please ensure the following:
+    - **"estimated_revenue"** should be a number without any symbols like "€". Just provide the number, e.g., "1200000" (without the currency symbol).
+    - **"market_share"** should be a plain numeric value without the "%" symbol. For example, "2.5" instead of "2.5%".
+    - **"credit_score"** should be a plain number between 0 and 100, e.g., "87" instead of "780".
+    - **"location_rating"** should be a number between 0 and 5.
+    - Ensure the JSON array is properly closed with `]` at the end and there are no extra characters like `}`.
+
+    The format should look like this:
+    [
+        {
+            "business_name": "Business Name",
+            "estimated_revenue": 1200000,
+            "market_share": 2.5,
+            "credit_score": 86,
+            "location_rating": 4.5
+        },
+        {
+            "business_name": "Another Business",
+            "estimated_revenue": 1500000,
+            "market_share": 3.0,
+            "credit_score": 90,
+            "location_rating": 4.8
+        }
+    ]
+
+    Do not include any additional text or formatting other than proper JSON. Ensure the JSON array is correctly closed with `]`.
+    """
+
+
+# Split business names into chunks bounded by count and by prompt size
+def chunk_business_names(business_names, chunk_size=DEFAULT_CHUNK_SIZE, max_chunk_chars=DEFAULT_MAX_CHUNK_CHARS):
+    chunks = []
+    current, current_chars = [], 0
+    for name in business_names:
+        if current and (len(current) >= chunk_size or current_chars + len(name) > max_chunk_chars):
+            chunks.append(current)
+            current, current_chars = [], 0
+        current.append(name)
+        current_chars += len(name)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# Request synthetic data for one chunk of businesses. Records are validated
+# against SyntheticRecord.SCHEMA and only the businesses whose record is missing
+# or invalid are asked for again. Names that normalize to the same key are asked
+# for once and all get the returned record.
+def generate_synthetic_data_chunk(business_names):
+    names_by_key = {}
+    for key, name in zip(normalize_business_keys(business_names), business_names):
+        names_by_key.setdefault(key, []).append(name)
+    keys_by_name = {name: key for key, names in names_by_key.items() for name in names}
+
+    # Answers usually echo the requested name; only normalize the ones that don't
+    def key_of(obj):
+        name = obj.get("business_name")
+        if not isinstance(name, str):
+            return None
+        return keys_by_name.get(name) or normalize_business_keys([name]).iloc[0]
+
+    def build_request(keys):
+        prompt = SYNTHETIC_DATA_PROMPT
+        for key in keys:
+            prompt += f"Business Name: {names_by_key[key][0]}\n"
+        return prompt, 200 + TOKENS_PER_BUSINESS * len(keys)
+
+    records = request_keyed_records(
+        build_request,
+        list(names_by_key),
+        SyntheticRecord,
+        key_of=key_of,
+        call_site="enrichment",
+    )
+    # One record per requested spelling of each name
+    return [
+        {**record.to_dict(), "business_name": name}
+        for key, record in records.items()
+        for name in names_by_key[key]
+    ]
+
+
+# Function to generate synthetic data for any number of businesses.
+# Names are sent in size-bounded chunks concurrently; a failed chunk only
+# loses its own rows. Records are merged by business name, in input order.
+def generate_synthetic_data(business_names, chunk_size=None, max_workers=None):
+    if chunk_size is None:
+        chunk_size = int(os.getenv("SYNTHETIC_DATA_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+    if max_workers is None:
+        max_workers = int(os.getenv("SYNTHETIC_DATA_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+
+    # Skip duplicates so every name is requested once
+    business_names = list(dict.fromkeys(name for name in business_names if name))
+    chunks = chunk_business_names(business_names, chunk_size)
+    if not chunks:
+        return []
+
+    records = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, generate_synthetic_data_chunk, chunk): chunk
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            try:
+                for record in future.result():
+                    records.setdefault(record["business_name"], record)
+            except Exception as e:
+                logger.error("Synthetic data chunk of %d businesses failed: %s", len(futures[future]), e)
+
+    # Requested names, in input order
+    return [records[name] for name in business_names if name in records]
+
+
+# Normalize business names into join keys: accents stripped, casefolded,
+# punctuation dropped and whitespace collapsed ("Caffè  Roma!" -> "caffe roma")
+def normalize_business_keys(names):
+    names = pd.Series(names, dtype="object").fillna("").astype(str)
+    return (
+        names.str.normalize("NFKD")
+        .str.encode("ascii", "ignore")
+        .str.decode("ascii")
+        .str.casefold()
+        .str.replace(r"[^\w\s]", " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
+# Join synthetic data onto `df` by normalized business name in one merge.
+# Returns the merged DataFrame (synthetic columns are NaN where nothing matched)
+# and a report of the names that did not match on either side.
+def merge_synthetic_data(df, synthetic_data_batch, name_column="Name"):
+    synthetic_df = pd.DataFrame(list(synthetic_data_batch or []), columns=SYNTHETIC_FIELDS)
+    synthetic_df["_key"] = normalize_business_keys(synthetic_df["business_name"]).values
+    synthetic_df = synthetic_df[synthetic_df["_key"] != ""].drop_duplicates("_key")
+
+    keys = normalize_business_keys(df[name_column]).values
+    merged = df.assign(_key=keys).merge(synthetic_df, on="_key", how="left", validate="many_to_one")
+    merged.index = df.index
+
+    matched = merged["business_name"].notna()
+    report = {
+        "missing_synthetic": merged.loc[~matched, name_column].tolist(),
+        "unused_synthetic": synthetic_df.loc[~synthetic_df["_key"].isin(keys), "business_name"].tolist(),
+    }
+    return merged.drop(columns="_key"), report
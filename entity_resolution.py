@@ -0,0 +1,192 @@
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from enrichment import normalize_business_keys
+from italy_geo import normalize_place_name, parse_address
+
+logger = logging.getLogger(__name__)
+
+# Legal-form suffixes dropped before comparing names (after key normalization
+# "S.R.L." reads "s r l")
+LEGAL_SUFFIX_PATTERN = (
+    r"\b(?:s r l s|s r l|srls|srl|s p a|spa|s a s|sas|s n c|snc|s a p a|sapa|s c a r l|scarl|s c r l|scrl"
+    r"|s s|soc coop|societa cooperativa|cooperativa|coop|unipersonale|in liquidazione)\b"
+)
+
+NUM_PERMUTATIONS = 64           # MinHash signature length
+LSH_BANDS = 16                  # Bands of NUM_PERMUTATIONS / LSH_BANDS rows; pairs above ~0.5 similarity collide
+SHINGLE_SIZE = 3                # Character n-grams
+MAX_NAME_CHARS = 64             # Longer names are truncated before shingling
+MAX_BUCKET_SIZE = 200           # LSH buckets larger than this (very generic names) are skipped
+DEFAULT_THRESHOLD = 0.5
+PERMUTATION_CHUNK = 8           # Permutations hashed at once, bounding memory
+SCORE_CHUNK = 500000            # Candidate pairs scored at once
+
+
+# Names reduced to comparable tokens: normalized keys without legal-form suffixes
+def normalize_entity_names(names):
+    keys = normalize_business_keys(names)
+    return keys.str.replace(LEGAL_SUFFIX_PATTERN, " ", regex=True).str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+# Character n-grams of every name as integers, in one vectorized pass.
+# Returns (rows, shingles): the name index and code of each n-gram, sorted by row.
+def shingle_matrix(names, n=SHINGLE_SIZE):
+    padded = [f" {name[:MAX_NAME_CHARS - 2]} " for name in names]
+    width = max([len(name) for name in padded] + [n])
+    chars = np.zeros((len(padded), width), dtype=np.uint64)
+    if padded:
+        encoded = np.array(padded, dtype=f"S{width}")
+        chars[:] = encoded.view(np.uint8).reshape(len(padded), width)
+
+    codes = np.zeros((len(padded), width - n + 1), dtype=np.uint64)
+    valid = np.ones(codes.shape, dtype=bool)
+    for offset in range(n):
+        window = chars[:, offset:offset + codes.shape[1]]
+        codes = (codes << np.uint64(8)) | window
+        valid &= window != 0
+    rows, columns = np.nonzero(valid)
+    return rows, codes[rows, columns]
+
+
+# SplitMix64 finalizer: a well-mixed 64-bit hash of every element (wraps mod 2**64)
+def _mix64(x):
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+# MinHash signatures (len(names) x permutations); names without n-grams keep the max value
+def minhash_signatures(names, permutations=NUM_PERMUTATIONS, seed=0):
+    rows, shingles = shingle_matrix(names)
+    seeds = np.random.default_rng(seed).integers(0, np.iinfo(np.int64).max, size=permutations).astype(np.uint64)
+
+    signatures = np.full((len(names), permutations), np.iinfo(np.uint64).max, dtype=np.uint64)
+    if len(rows) == 0:
+        return signatures
+
+    # Rows are sorted, so each name's n-grams are one contiguous run
+    present, starts = np.unique(rows, return_index=True)
+    with np.errstate(over="ignore"):
+        for start in range(0, permutations, PERMUTATION_CHUNK):
+            stop = min(start + PERMUTATION_CHUNK, permutations)
+            hashed = _mix64(shingles[None, :] ^ seeds[start:stop, None])
+            signatures[present, start:stop] = np.minimum.reduceat(hashed, starts, axis=1).T
+    return signatures
+
+
+# One hash per LSH band of every signature
+def band_hashes(signatures, bands=LSH_BANDS):
+    rows_per_band = signatures.shape[1] // bands
+    hashes = np.zeros((signatures.shape[0], bands), dtype=np.uint64)
+    for row in range(rows_per_band):
+        hashes = hashes * np.uint64(1000003) ^ signatures[:, row::rows_per_band][:, :bands]
+    return hashes
+
+
+# Candidate (left, right) index pairs sharing a block and an LSH band, one band at a time
+def iter_candidate_pairs(left_blocks, left_bands, right_blocks, right_bands):
+    # Fold the block into every band hash so one integer key covers both
+    codes, _ = pd.factorize(np.concatenate([np.asarray(left_blocks, dtype=object), np.asarray(right_blocks, dtype=object)]))
+    codes = codes.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    left_codes, right_codes = codes[:len(left_blocks)], codes[len(left_blocks):]
+
+    for band in range(left_bands.shape[1]):
+        left = pd.DataFrame({"key": left_bands[:, band] ^ left_codes, "left": np.arange(len(left_codes))})
+        right = pd.DataFrame({"key": right_bands[:, band] ^ right_codes, "right": np.arange(len(right_codes))})
+
+        # Skip buckets of very common names, which would explode into all-pairs
+        left = left[left.groupby("key")["left"].transform("size") <= MAX_BUCKET_SIZE]
+        right = right[right.groupby("key")["right"].transform("size") <= MAX_BUCKET_SIZE]
+
+        pairs = left.merge(right, on="key")
+        yield pairs["left"].to_numpy(), pairs["right"].to_numpy()
+
+
+# Link Places restaurants to register companies.
+# Both sides are blocked by normalized city, names are compared as MinHash
+# signatures of character n-grams (legal suffixes stripped) and only pairs
+# sharing an LSH band are scored, in bounded chunks. Each restaurant keeps its
+# best match with estimated similarity >= threshold. Returns (links, report).
+def resolve_entities(places_df, register_df, threshold=DEFAULT_THRESHOLD):
+    started = time.perf_counter()
+
+    places_city = places_df["Address"].map(lambda address: parse_address(address)["city"])
+    places_blocks = places_city.map(normalize_place_name).to_numpy()
+    register_blocks = register_df["City"].map(normalize_place_name).to_numpy()
+
+    places_names = normalize_entity_names(places_df["Name"]).to_numpy(dtype=object)
+    register_names = normalize_entity_names(register_df["Name"]).to_numpy(dtype=object)
+
+    places_signatures = minhash_signatures(places_names.tolist())
+    register_signatures = minhash_signatures(register_names.tolist())
+
+    best_score = np.full(len(places_df), -1.0)
+    best_match = np.full(len(places_df), -1, dtype=np.int64)
+    scored_pairs = 0
+    pairs = iter_candidate_pairs(
+        places_blocks, band_hashes(places_signatures), register_blocks, band_hashes(register_signatures),
+    )
+    for band_left, band_right in pairs:
+        # Unparsed addresses fall into the "" block and are not linked
+        keep = places_blocks[band_left] != ""
+        band_left, band_right = band_left[keep], band_right[keep]
+
+        for start in range(0, len(band_left), SCORE_CHUNK):
+            left, right = band_left[start:start + SCORE_CHUNK], band_right[start:start + SCORE_CHUNK]
+            similarity = (places_signatures[left] == register_signatures[right]).mean(axis=1)
+            similarity[places_names[left] == register_names[right]] = 1.0
+            scored_pairs += len(left)
+
+            # Best candidate per restaurant in this chunk, then keep it if it beats the best so far
+            order = np.lexsort((-similarity, left))
+            left, right, similarity = left[order], right[order], similarity[order]
+            first = np.r_[True, left[1:] != left[:-1]]
+            left, right, similarity = left[first], right[first], similarity[first]
+            better = similarity > best_score[left]
+            best_score[left[better]] = similarity[better]
+            best_match[left[better]] = right[better]
+
+    linked = np.nonzero(best_score >= threshold)[0]
+    best = pd.DataFrame({"left": linked, "right": best_match[linked], "Confidence": best_score[linked]})
+
+    places_rows = places_df.iloc[best["left"].to_numpy()]
+    register_rows = register_df.iloc[best["right"].to_numpy()]
+    links = pd.DataFrame({
+        "Places Name": places_rows["Name"].to_numpy(),
+        "Places Address": places_rows["Address"].to_numpy(),
+        "Register Name": register_rows["Name"].to_numpy(),
+        "City": register_rows["City"].to_numpy(),
+        "Legal Form": register_rows["Legal Form"].to_numpy(),
+        "Confidence": best["Confidence"].round(3).to_numpy(),
+    }).sort_values(["Confidence", "Places Name"], ascending=[False, True], ignore_index=True)
+
+    report = {
+        "places": len(places_df),
+        "register": len(register_df),
+        "unblocked_places": int((places_blocks == "").sum()),
+        "candidate_pairs": scored_pairs,
+        "links": len(links),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    return links, report
+
+
+if __name__ == "__main__":
+    from business_register import get_business_register
+    from lead_store import get_lead_store
+
+    parser = argparse.ArgumentParser(description="Link Places restaurants to Business Register companies.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Minimum estimated name similarity")
+    parser.add_argument("--output", default="entity_links.csv", help="CSV file for the linked records")
+    args = parser.parse_args()
+
+    register = get_business_register()
+    links, report = resolve_entities(get_lead_store().load_businesses("restaurants"), register.query(), args.threshold)
+    register.upsert_links(links)
+    links.to_csv(args.output, index=False)
+    print(report)
@@ -0,0 +1,203 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Timeouts (seconds) per logical endpoint, used when a call does not pass one
+ENDPOINT_TIMEOUTS = {
+    "azure_openai": 30,
+    "electricity_maps": 15,
+    "google_places": 20,
+    "default": 30,
+}
+
+# Status codes that are worth retrying
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.5      # Seconds
+DEFAULT_BACKOFF_CAP = 30.0      # Seconds
+DEFAULT_POOL_SIZE = 32
+REQUEST_LOG_SIZE = 1000
+
+
+# One entry of the request log
+@dataclass
+class RequestRecord:
+    endpoint: str
+    method: str
+    url: str
+    status_code: int
+    latency: float
+    attempts: int
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    error: str = ""
+
+
+# Session-backed HTTP client with keep-alive pooling, retries and a request log
+class HttpClient:
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_cap=DEFAULT_BACKOFF_CAP, pool_size=DEFAULT_POOL_SIZE, transport=None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.session = requests.Session()
+
+        # Either a real pooled adapter or a test transport handles every URL
+        adapter = transport or HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.log = deque(maxlen=REQUEST_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    # Seconds to wait before the next attempt: Retry-After if sent, else full jitter
+    def _backoff(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            try:
+                return min(max(float(retry_after), 0.0), self.backoff_cap)
+            except (TypeError, ValueError):
+                pass
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    # Send a request, retrying throttled/server errors and connection failures
+    def request(self, endpoint, method, url, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = ENDPOINT_TIMEOUTS.get(endpoint, ENDPOINT_TIMEOUTS["default"])
+
+        started = time.perf_counter()
+        response = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    self._record(endpoint, method, url, 0, started, attempt + 1, error=str(e))
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                break
+            time.sleep(self._backoff(attempt, response))
+
+        self._record(endpoint, method, url, response.status_code, started, attempt + 1, response=response)
+        # Callers that report retries (e.g. the LLM metrics) read them off the response
+        response.attempts = attempt + 1
+        return response
+
+    def post(self, endpoint, url, **kwargs):
+        return self.request(endpoint, "POST", url, **kwargs)
+
+    def get(self, endpoint, url, **kwargs):
+        return self.request(endpoint, "GET", url, **kwargs)
+
+    def _record(self, endpoint, method, url, status_code, started, attempts, response=None, error=""):
+        prompt_tokens = completion_tokens = 0
+        if response is not None and response.status_code == 200 and "json" in response.headers.get("Content-Type", ""):
+            try:
+                usage = response.json().get("usage") or {}
+                prompt_tokens = usage.get("prompt_tokens", 0)
+                completion_tokens = usage.get("completion_tokens", 0)
+            except (ValueError, AttributeError):
+                pass
+
+        record = RequestRecord(
+            endpoint=endpoint,
+            method=method,
+            url=url.split("?")[0],
+            status_code=status_code,
+            latency=time.perf_counter() - started,
+            attempts=attempts,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            error=error,
+        )
+        with self._lock:
+            self.log.append(record)
+        logger.info(
+            "%s %s %s -> %s in %.3fs (%d attempts, %d/%d tokens)",
+            endpoint, method, record.url, status_code, record.latency, attempts, prompt_tokens, completion_tokens,
+        )
+
+    # Aggregate the request log per endpoint
+    def summary(self):
+        with self._lock:
+            records = list(self.log)
+        totals = {}
+        for record in records:
+            entry = totals.setdefault(record.endpoint, {
+                "requests": 0, "errors": 0, "latency": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+            })
+            entry["requests"] += 1
+            entry["errors"] += int(record.status_code != 200)
+            entry["latency"] += record.latency
+            entry["prompt_tokens"] += record.prompt_tokens
+            entry["completion_tokens"] += record.completion_tokens
+        return totals
+
+
+# Transport adapter answering requests from registered routes instead of the network.
+# Mount it with HttpClient(transport=MockTransport()) to exercise callers offline.
+class MockTransport(BaseAdapter):
+    def __init__(self):
+        super().__init__()
+        self.routes = []
+        self.requests = []
+
+    # Register a canned answer (or a handler(request) -> (status, body, headers))
+    # for requests whose URL starts with `url_prefix`
+    def add(self, method, url_prefix, status_code=200, json_body=None, headers=None, handler=None):
+        self.routes.append((method.upper(), url_prefix, status_code, json_body, headers or {}, handler))
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        for method, url_prefix, status_code, json_body, headers, handler in self.routes:
+            if request.method == method and request.url.startswith(url_prefix):
+                if handler is not None:
+                    status_code, json_body, headers = handler(request)
+                return self._build_response(request, status_code, json_body, headers)
+        return self._build_response(request, 404, {"error": "no mock route"}, {})
+
+    @staticmethod
+    def _build_response(request, status_code, json_body, headers):
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update({"Content-Type": "application/json", **headers})
+        response._content = json.dumps(json_body).encode("utf-8")
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+# Shared client used by every outbound call in the app
+def get_http_client():
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HttpClient()
+        return _http_client
+
+
+# Swap the shared client, e.g. for one backed by MockTransport
+def set_http_client(client):
+    global _http_client
+    with _http_client_lock:
+        _http_client = client
@@ -0,0 +1,231 @@
+import re
+import unicodedata
+
+# Italian provinces: code -> (capital, region, latitude, longitude)
+PROVINCES = {
+    # Piemonte
+    "TO": ("Torino", "Piemonte", 45.070, 7.686),
+    "VC": ("Vercelli", "Piemonte", 45.320, 8.419),
+    "NO": ("Novara", "Piemonte", 45.446, 8.622),
+    "CN": ("Cuneo", "Piemonte", 44.384, 7.543),
+    "AT": ("Asti", "Piemonte", 44.900, 8.207),
+    "AL": ("Alessandria", "Piemonte", 44.913, 8.615),
+    "BI": ("Biella", "Piemonte", 45.563, 8.058),
+    "VB": ("Verbania", "Piemonte", 45.922, 8.551),
+    # Valle d'Aosta
+    "AO": ("Aosta", "Valle d'Aosta", 45.737, 7.315),
+    # Lombardia
+    "VA": ("Varese", "Lombardia", 45.820, 8.825),
+    "CO": ("Como", "Lombardia", 45.808, 9.085),
+    "SO": ("Sondrio", "Lombardia", 46.170, 9.872),
+    "MI": ("Milano", "Lombardia", 45.464, 9.190),
+    "BG": ("Bergamo", "Lombardia", 45.698, 9.677),
+    "BS": ("Brescia", "Lombardia", 45.541, 10.212),
+    "PV": ("Pavia", "Lombardia", 45.185, 9.160),
+    "CR": ("Cremona", "Lombardia", 45.133, 10.023),
+    "MN": ("Mantova", "Lombardia", 45.156, 10.791),
+    "LC": ("Lecco", "Lombardia", 45.856, 9.397),
+    "LO": ("Lodi", "Lombardia", 45.314, 9.503),
+    "MB": ("Monza", "Lombardia", 45.584, 9.274),
+    # Trentino-Alto Adige
+    "BZ": ("Bolzano", "Trentino-Alto Adige", 46.498, 11.355),
+    "TN": ("Trento", "Trentino-Alto Adige", 46.070, 11.121),
+    # Veneto
+    "VR": ("Verona", "Veneto", 45.438, 10.992),
+    "VI": ("Vicenza", "Veneto", 45.546, 11.546),
+    "BL": ("Belluno", "Veneto", 46.142, 12.217),
+    "TV": ("Treviso", "Veneto", 45.667, 12.245),
+    "VE": ("Venezia", "Veneto", 45.440, 12.316),
+    "PD": ("Padova", "Veneto", 45.406, 11.877),
+    "RO": ("Rovigo", "Veneto", 45.070, 11.790),
+    # Friuli-Venezia Giulia
+    "UD": ("Udine", "Friuli-Venezia Giulia", 46.063, 13.235),
+    "GO": ("Gorizia", "Friuli-Venezia Giulia", 45.941, 13.622),
+    "TS": ("Trieste", "Friuli-Venezia Giulia", 45.650, 13.777),
+    "PN": ("Pordenone", "Friuli-Venezia Giulia", 45.956, 12.660),
+    # Liguria
+    "IM": ("Imperia", "Liguria", 43.889, 8.039),
+    "SV": ("Savona", "Liguria", 44.309, 8.477),
+    "GE": ("Genova", "Liguria", 44.405, 8.946),
+    "SP": ("La Spezia", "Liguria", 44.102, 9.824),
+    # Emilia-Romagna
+    "PC": ("Piacenza", "Emilia-Romagna", 45.052, 9.693),
+    "PR": ("Parma", "Emilia-Romagna", 44.801, 10.328),
+    "RE": ("Reggio Emilia", "Emilia-Romagna", 44.698, 10.631),
+    "MO": ("Modena", "Emilia-Romagna", 44.647, 10.925),
+    "BO": ("Bologna", "Emilia-Romagna", 44.494, 11.343),
+    "FE": ("Ferrara", "Emilia-Romagna", 44.838, 11.620),
+    "RA": ("Ravenna", "Emilia-Romagna", 44.418, 12.204),
+    "FC": ("Forlì", "Emilia-Romagna", 44.222, 12.041),
+    "RN": ("Rimini", "Emilia-Romagna", 44.060, 12.566),
+    # Toscana
+    "MS": ("Massa", "Toscana", 44.036, 10.141),
+    "LU": ("Lucca", "Toscana", 43.843, 10.505),
+    "PT": ("Pistoia", "Toscana", 43.933, 10.917),
+    "FI": ("Firenze", "Toscana", 43.770, 11.255),
+    "LI": ("Livorno", "Toscana", 43.548, 10.311),
+    "PI": ("Pisa", "Toscana", 43.723, 10.402),
+    "AR": ("Arezzo", "Toscana", 43.463, 11.880),
+    "SI": ("Siena", "Toscana", 43.318, 11.331),
+    "GR": ("Grosseto", "Toscana", 42.763, 11.113),
+    "PO": ("Prato", "Toscana", 43.880, 11.097),
+    # Umbria
+    "PG": ("Perugia", "Umbria", 43.112, 12.389),
+    "TR": ("Terni", "Umbria", 42.563, 12.643),
+    # Marche
+    "PU": ("Pesaro", "Marche", 43.910, 12.913),
+    "AN": ("Ancona", "Marche", 43.616, 13.519),
+    "MC": ("Macerata", "Marche", 43.298, 13.453),
+    "AP": ("Ascoli Piceno", "Marche", 42.854, 13.575),
+    "FM": ("Fermo", "Marche", 43.160, 13.718),
+    # Lazio
+    "VT": ("Viterbo", "Lazio", 42.417, 12.105),
+    "RI": ("Rieti", "Lazio", 42.404, 12.857),
+    "RM": ("Roma", "Lazio", 41.903, 12.496),
+    "LT": ("Latina", "Lazio", 41.468, 12.904),
+    "FR": ("Frosinone", "Lazio", 41.640, 13.340),
+    # Abruzzo
+    "AQ": ("L'Aquila", "Abruzzo", 42.350, 13.400),
+    "TE": ("Teramo", "Abruzzo", 42.659, 13.704),
+    "PE": ("Pescara", "Abruzzo", 42.462, 14.216),
+    "CH": ("Chieti", "Abruzzo", 42.351, 14.168),
+    # Molise
+    "CB": ("Campobasso", "Molise", 41.561, 14.668),
+    "IS": ("Isernia", "Molise", 41.596, 14.233),
+    # Campania
+    "CE": ("Caserta", "Campania", 41.074, 14.332),
+    "BN": ("Benevento", "Campania", 41.130, 14.782),
+    "NA": ("Napoli", "Campania", 40.852, 14.268),
+    "AV": ("Avellino", "Campania", 40.914, 14.793),
+    "SA": ("Salerno", "Campania", 40.682, 14.768),
+    # Puglia
+    "FG": ("Foggia", "Puglia", 41.462, 15.544),
+    "BA": ("Bari", "Puglia", 41.117, 16.872),
+    "TA": ("Taranto", "Puglia", 40.464, 17.247),
+    "BR": ("Brindisi", "Puglia", 40.632, 17.936),
+    "LE": ("Lecce", "Puglia", 40.352, 18.169),
+    "BT": ("Barletta", "Puglia", 41.320, 16.283),
+    # Basilicata
+    "PZ": ("Potenza", "Basilicata", 40.640, 15.806),
+    "MT": ("Matera", "Basilicata", 40.666, 16.604),
+    # Calabria
+    "CS": ("Cosenza", "Calabria", 39.298, 16.254),
+    "CZ": ("Catanzaro", "Calabria", 38.910, 16.587),
+    "RC": ("Reggio Calabria", "Calabria", 38.111, 15.647),
+    "KR": ("Crotone", "Calabria", 39.081, 17.127),
+    "VV": ("Vibo Valentia", "Calabria", 38.676, 16.101),
+    # Sicilia
+    "TP": ("Trapani", "Sicilia", 38.018, 12.514),
+    "PA": ("Palermo", "Sicilia", 38.116, 13.361),
+    "ME": ("Messina", "Sicilia", 38.193, 15.554),
+    "AG": ("Agrigento", "Sicilia", 37.311, 13.577),
+    "CL": ("Caltanissetta", "Sicilia", 37.490, 14.062),
+    "EN": ("Enna", "Sicilia", 37.567, 14.279),
+    "CT": ("Catania", "Sicilia", 37.502, 15.087),
+    "RG": ("Ragusa", "Sicilia", 36.926, 14.725),
+    "SR": ("Siracusa", "Sicilia", 37.075, 15.286),
+    # Sardegna
+    "SS": ("Sassari", "Sardegna", 40.726, 8.560),
+    "NU": ("Nuoro", "Sardegna", 40.321, 9.330),
+    "CA": ("Cagliari", "Sardegna", 39.224, 9.122),
+    "OR": ("Oristano", "Sardegna", 39.906, 8.589),
+    "SU": ("Carbonia", "Sardegna", 39.167, 8.522),
+}
+
+# English (and other common) spellings of Italian city names
+CITY_ALIASES = {
+    "rome": "roma",
+    "milan": "milano",
+    "naples": "napoli",
+    "turin": "torino",
+    "genoa": "genova",
+    "florence": "firenze",
+    "venice": "venezia",
+    "padua": "padova",
+    "mantua": "mantova",
+    "syracuse": "siracusa",
+    "leghorn": "livorno",
+    "reggio nell'emilia": "reggio emilia",
+    "reggio di calabria": "reggio calabria",
+    "monza e brianza": "monza",
+    "pesaro e urbino": "pesaro",
+    "bozen": "bolzano",
+}
+
+
+# Casefold, strip accents and collapse whitespace so names compare reliably
+def normalize_place_name(name):
+    if not isinstance(name, str):
+        return ""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    name = re.sub(r"\s+", " ", name.replace("’", "'")).strip().casefold()
+    return CITY_ALIASES.get(name, name)
+
+
+# Coordinates of known cities, keyed by normalized name
+CITY_COORDINATES = {
+    normalize_place_name(capital): (lat, lon) for capital, _, lat, lon in PROVINCES.values()
+}
+
+# Province code for every province capital, keyed by normalized name
+CITY_PROVINCES = {normalize_place_name(capital): code for code, (capital, _, _, _) in PROVINCES.items()}
+
+# "..., 42013 Casalgrande RE, Italia" -> postal code, comune, province code
+ADDRESS_PATTERN = re.compile(r"\b(\d{5})\s+([^,\d]+?)\s+([A-Z]{2})\b")
+
+# "Italy" / "Italia" anywhere in an address
+ITALY_PATTERN = re.compile(r"\bItal", re.IGNORECASE)
+
+# "Rome, GA 30161, USA": a US state code followed by a ZIP code
+US_STATE_ZIP = re.compile(r"\b[A-Z]{2}\s+\d{5}(?:-\d{4})?\b")
+
+# Countries (normalized) that end the addresses of homonyms of Italian cities
+FOREIGN_COUNTRIES = {
+    "usa", "us", "united states", "united states of america", "uk", "united kingdom", "england", "canada",
+    "australia", "germany", "deutschland", "france", "spain", "espana", "switzerland", "schweiz", "suisse",
+    "svizzera", "austria", "osterreich", "slovenia", "croatia", "malta", "san marino", "vatican city",
+    "greece", "portugal", "netherlands", "belgium", "ireland", "argentina", "brazil", "mexico",
+}
+
+
+# Extract postal code, city and province code from a Google-style Italian address
+def parse_address(address):
+    if not isinstance(address, str):
+        return {"postal_code": None, "city": None, "province": None}
+
+    match = ADDRESS_PATTERN.search(address)
+    if match and match.group(3) in PROVINCES:
+        return {"postal_code": match.group(1), "city": match.group(2).strip(), "province": match.group(3)}
+
+    # Fall back to any known city name mentioned in the address
+    for part in reversed(address.split(",")):
+        name = normalize_place_name(re.sub(r"\d+", "", part))
+        if name in CITY_PROVINCES:
+            return {"postal_code": None, "city": part.strip(), "province": CITY_PROVINCES[name]}
+
+    return {"postal_code": None, "city": None, "province": None}
+
+
+# Whether an address is explicitly outside Italy: it does not mention Italy
+# and ends in another country or carries a US state + ZIP block
+def is_foreign_address(address):
+    if not isinstance(address, str) or ITALY_PATTERN.search(address):
+        return False
+    country = normalize_place_name(re.sub(r"\d+", "", address.rsplit(",", 1)[-1]))
+    return country in FOREIGN_COUNTRIES or US_STATE_ZIP.search(address) is not None
+
+
+# Coordinates of a city name, or None if it is not in the table
+def city_coordinates(city):
+    return CITY_COORDINATES.get(normalize_place_name(city))
+
+
+# Best-effort coordinates for an address: the comune if known, else its province capital
+def address_coordinates(address):
+    parsed = parse_address(address)
+    coordinates = city_coordinates(parsed["city"]) if parsed["city"] else None
+    if coordinates is None and parsed["province"]:
+        _, _, lat, lon = PROVINCES[parsed["province"]]
+        coordinates = (lat, lon)
+    return coordinates
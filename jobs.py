@@ -0,0 +1,463 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import services
+from dossiers import build_dossiers, get_artifact
+from lead_store import get_lead_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_PATH = "jobs.sqlite3"
+DEFAULT_WORKERS = 4
+POLL_INTERVAL = 0.5              # Seconds an idle worker waits before looking for work again
+STALE_SECONDS = 600              # Running jobs silent for this long (dead worker) are picked up again
+PROGRESS_INTERVAL = 1.0          # Seconds between partial-result writes of a running job
+ENRICHMENT_JOB_CHUNK = 200       # Businesses enriched and stored per step, so results show up progressively
+RETRY_SECONDS = 30               # Failed or partial jobs are queued again when resubmitted after this long
+DONE_TTL_SECONDS = 24 * 3600     # Done jobs are run again when resubmitted after this long
+
+# "partial" jobs finished with some of their results missing (e.g. a failed LLM call)
+JOB_STATUSES = ("queued", "running", "done", "partial", "failed")
+FINISHED_STATUSES = ("done", "partial", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    partial TEXT,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+"""
+
+
+# Stable hash of a list of values, e.g. to tie a job key to the current lead set
+def fingerprint(values):
+    payload = json.dumps(list(values), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+# Raised by a handler that finished with some results missing. The job keeps
+# `result` and is marked "partial", so the next submit retries it.
+class JobIncomplete(Exception):
+    def __init__(self, message, result):
+        super().__init__(message)
+        self.result = result
+
+
+# One job as stored in the queue
+@dataclass
+class Job:
+    key: str
+    kind: str
+    status: str
+    params: dict = field(default_factory=dict)
+    done: int = 0
+    total: int = 0
+    partial: object = None
+    result: object = None
+    error: str = None
+    created_at: float = None
+    started_at: float = None
+    finished_at: float = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def fraction(self):
+        if self.status in ("done", "partial"):
+            return 1.0
+        return min(1.0, self.done / self.total) if self.total else 0.0
+
+
+def _job_from_row(row):
+    key, kind, params, status, done, total, partial, result, error, created_at, started_at, finished_at = row
+    return Job(
+        key=key, kind=kind, status=status, params=json.loads(params), done=done, total=total,
+        partial=json.loads(partial) if partial else None, result=json.loads(result) if result else None,
+        error=error, created_at=created_at, started_at=started_at, finished_at=finished_at,
+    )
+
+
+JOB_COLUMNS = "key, kind, params, status, done, total, partial, result, error, created_at, started_at, finished_at"
+
+
+class JobQueue:
+    """
+    Background job queue backed by SQLite, run by a pool of worker threads.
+
+    Jobs are keyed by their kind and parameters, so submitting work that is
+    already queued, running or recently done returns the existing job instead
+    of starting another: concurrent sessions share one computation. Failed and
+    partial jobs are retried on the next submit after RETRY_SECONDS, done jobs
+    after DONE_TTL_SECONDS. Workers claim jobs with a single atomic update, so
+    several processes can serve the same queue file. A job reports progress
+    and partial results while it runs and its result (JSON) once finished.
+    """
+
+    def __init__(self, path=DEFAULT_JOBS_PATH, workers=DEFAULT_WORKERS, handlers=None):
+        self.path = path
+        self.workers = workers
+        self.handlers = dict(JOB_HANDLERS if handlers is None else handlers)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    # Key of a job: its kind and a hash of its normalized parameters
+    @staticmethod
+    def make_key(kind, params):
+        payload = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        return f"{kind}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    # Queue a job unless the same one is already queued, running or recently
+    # finished. `force` re-runs a finished job right away.
+    def submit(self, kind, params, key=None, force=False):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind {kind!r}, expected one of {sorted(self.handlers)}")
+        key = key or self.make_key(kind, params)
+        now = time.time()
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT status, finished_at FROM jobs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO jobs (key, kind, params, status, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                    (key, kind, json.dumps(params, ensure_ascii=False, default=str), now, now),
+                )
+            elif row[0] in FINISHED_STATUSES and (
+                force or now - (row[1] or 0) >= (DONE_TTL_SECONDS if row[0] == "done" else RETRY_SECONDS)
+            ):
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', done = 0, total = 0, partial = NULL, result = NULL, error = NULL, "
+                    "worker = NULL, created_at = ?, started_at = NULL, finished_at = NULL, updated_at = ? WHERE key = ?",
+                    (now, now, key),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        self.start()
+        self._wakeup.set()
+        return self.get(key)
+
+    def get(self, key):
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return _job_from_row(row) if row else None
+
+    # Most recent jobs, optionally of one status
+    def list(self, status=None, limit=50):
+        query = f"SELECT {JOB_COLUMNS} FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        conn = self._connect()
+        try:
+            return [_job_from_row(row) for row in conn.execute(query, params)]
+        finally:
+            conn.close()
+
+    # Drop finished jobs older than `max_age` seconds
+    def prune(self, max_age=7 * 24 * 3600):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'partial', 'failed') AND finished_at < ?", (time.time() - max_age,)
+            ).rowcount
+        finally:
+            conn.close()
+
+    # Take the oldest queued job (or one whose worker went silent) for this worker
+    def _claim(self, worker):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, updated_at = ? WHERE key = ("
+                "SELECT key FROM jobs WHERE status = 'queued' OR (status = 'running' AND updated_at < ?) "
+                "ORDER BY created_at LIMIT 1)",
+                (worker, now, now, now - STALE_SECONDS),
+            )
+            row = conn.execute(
+                f"SELECT {JOB_COLUMNS} FROM jobs WHERE status = 'running' AND worker = ? ORDER BY started_at DESC LIMIT 1",
+                (worker,),
+            ).fetchone()
+        finally:
+            conn.close()
+        return _job_from_row(row) if row else None
+
+    def _update(self, key, worker, **values):
+        values["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in values)
+        conn = self._connect()
+        try:
+            # A job requeued as stale and claimed by another worker is no longer ours to update
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE key = ? AND worker = ?", (*values.values(), key, worker))
+        finally:
+            conn.close()
+
+    # Run one claimed job to completion, recording progress, result or error
+    def _run(self, job, worker):
+        def progress(done, total, partial=None):
+            values = {"done": int(done), "total": int(total)}
+            if partial is not None:
+                values["partial"] = json.dumps(partial, ensure_ascii=False, default=str)
+            self._update(job.key, worker, **values)
+
+        started = time.perf_counter()
+        try:
+            result = self.handlers[job.kind](job.params, progress)
+        except JobIncomplete as e:
+            logger.warning("Job %s partial after %.1fs: %s", job.key, time.perf_counter() - started, e)
+            self._update(
+                job.key, worker, status="partial", result=json.dumps(e.result, ensure_ascii=False, default=str),
+                error=str(e), finished_at=time.time(),
+            )
+            return
+        except Exception as e:
+            logger.error("Job %s failed after %.1fs: %s", job.key, time.perf_counter() - started, e)
+            self._update(job.key, worker, status="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time())
+            return
+        logger.info("Job %s done in %.1fs", job.key, time.perf_counter() - started)
+        self._update(
+            job.key, worker, status="done", result=json.dumps(result, ensure_ascii=False, default=str),
+            finished_at=time.time(),
+        )
+
+    # Run queued jobs in the calling thread until none are left; returns how many ran
+    def run_pending(self):
+        worker = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        count = 0
+        while (job := self._claim(worker)) is not None:
+            self._run(job, worker)
+            count += 1
+        return count
+
+    def _worker_loop(self):
+        worker = f"{os.getpid()}-{threading.get_ident()}"
+        while not self._stopping.is_set():
+            job = self._claim(worker)
+            if job is None:
+                self._wakeup.wait(POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self._run(job, worker)
+
+    # Start the worker threads (once)
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for index in range(max(1, self.workers)):
+                thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        with self._lock:
+            self._stopping.set()
+            self._wakeup.set()
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    # Block until the job `key` finishes (or `timeout` seconds pass) and return it
+    def wait(self, key, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(key)
+            if job is None or job.finished or (deadline is not None and time.monotonic() >= deadline):
+                return job
+            time.sleep(POLL_INTERVAL / 5)
+
+
+# ----------------------------------------------------------------------
+# Job handlers: fn(params, progress) -> JSON-serializable result.
+# progress(done, total, partial=None) records how far a job got; a handler
+# with results missing raises JobIncomplete with what it has.
+# ----------------------------------------------------------------------
+
+# Synthetic data for params["names"], generated in steps and stored as it
+# arrives so readers of the lead store see results progressively
+def run_enrichment_job(params, progress):
+    names = params["names"]
+    stored, missing_names = services.split_stored_synthetic(names)
+    progress(len(names) - len(missing_names), len(names))
+
+    generated = 0
+    for start in range(0, len(missing_names), ENRICHMENT_JOB_CHUNK):
+        chunk = missing_names[start:start + ENRICHMENT_JOB_CHUNK]
+        try:
+            generated += len(services.generate_and_store_synthetic(chunk))
+        except Exception as e:
+            logger.error("Enrichment of %d businesses failed: %s", len(chunk), e)
+        progress(len(names) - len(missing_names) + start + len(chunk), len(names))
+    result = {"stored": len(stored), "generated": generated, "missing": len(missing_names) - generated}
+    if result["missing"]:
+        raise JobIncomplete(f"No synthetic data for {result['missing']} of {len(names)} businesses", result)
+    return result
+
+
+# One LLM rank per business of params["names"], from their stored synthetic data.
+# Ranks known so far are published as the partial result.
+def run_ranking_job(params, progress):
+    synthetic_data_batch = get_lead_store().load_synthetic(params["names"])
+    ranks = {}
+    last_report = [0.0]
+
+    def on_result(business_name, rank):
+        ranks[business_name] = rank
+        if time.monotonic() - last_report[0] >= PROGRESS_INTERVAL:
+            last_report[0] = time.monotonic()
+            progress(len(ranks), len(synthetic_data_batch), ranks)
+
+    progress(0, len(synthetic_data_batch))
+    services.rank_synthetic_batch(synthetic_data_batch, use_llm=True, on_result=on_result)
+    unranked = len(params["names"]) - sum(rank is not None for rank in ranks.values())
+    if unranked:
+        raise JobIncomplete(f"No rank for {unranked} of {len(params['names'])} businesses", {"ranks": ranks})
+    return {"ranks": ranks}
+
+
+# Assign the stored leads to the stored salespeople and store the assignments
+def run_assignment_job(params, progress):
+    store = get_lead_store()
+    leads_df, sales_df = store.load_businesses("leads"), store.load_salespeople()
+    progress(0, len(leads_df))
+    assignment_df = services.assign_and_store(
+        leads_df,
+        sales_df,
+        expertise_needed=params.get("expertise_needed", services.DEFAULT_EXPERTISE),
+        max_leads_per_salesperson=params.get("max_leads_per_salesperson"),
+        method=params.get("method", "greedy"),
+        use_llm_tie_break=params.get("use_llm_tie_break", False),
+        store=store,
+    )
+    result = {"rows": len(assignment_df)}
+    if params.get("use_llm_tie_break"):
+        result["prompt_tokens"] = services.salesperson_prompt_tokens(
+            leads_df, sales_df, params.get("expertise_needed", services.DEFAULT_EXPERTISE)
+        )
+    return result
+
+
+# Summary through the lead's dossier, so it is generated once and kept
+def run_business_summary_job(params, progress):
+    inputs = {"name": params["name"], "address": params["address"]}
+    summary = get_artifact("summary", params["name"], params["address"], inputs) or ""
+    if not summary:
+        raise JobIncomplete(f"No summary for {params['name']!r}", {"summary": ""})
+    return {"summary": summary}
+
+
+# Dossiers of the stored leads named in params["names"] (all leads when None)
+def run_dossiers_job(params, progress):
+    store = get_lead_store()
+    leads_df = store.load_businesses("leads")
+    if params.get("names") is not None:
+        leads_df = leads_df[leads_df["Name"].isin(params["names"])]
+    finished = [0]
+
+    def on_result(business_name, statuses):
+        finished[0] += 1
+        progress(finished[0], len(leads_df))
+
+    progress(0, len(leads_df))
+    report = build_dossiers(leads_df, store.load_assignments(), on_result=on_result)
+    failed = sum(statuses.get("failed", 0) for statuses in report.values())
+    if failed:
+        raise JobIncomplete(f"{failed} dossier artifacts failed", report)
+    return report
+
+
+JOB_HANDLERS = {
+    "enrichment": run_enrichment_job,
+    "ranking": run_ranking_job,
+    "assignment": run_assignment_job,
+    "business_summary": run_business_summary_job,
+    "dossiers": run_dossiers_job,
+}
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+# Shared queue of this process; workers start with the first submitted job
+def get_job_queue():
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                path=os.getenv("JOBS_PATH", DEFAULT_JOBS_PATH),
+                workers=int(os.getenv("JOB_WORKERS", DEFAULT_WORKERS)),
+            )
+        return _job_queue
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run or inspect the background job queue.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    worker_parser = subparsers.add_parser("worker", help="Serve queued jobs until interrupted")
+    worker_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    list_parser = subparsers.add_parser("list", help="Show recent jobs")
+    list_parser.add_argument("--status", choices=JOB_STATUSES)
+    list_parser.add_argument("--limit", type=int, default=20)
+    subparsers.add_parser("prune", help="Drop finished jobs older than a week")
+    args = parser.parse_args()
+
+    queue = JobQueue(os.getenv("JOBS_PATH", DEFAULT_JOBS_PATH), workers=getattr(args, "workers", DEFAULT_WORKERS))
+    if args.command == "worker":
+        queue.start()
+        print(f"Serving jobs from {queue.path} with {queue.workers} workers")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            queue.stop()
+    elif args.command == "list":
+        for job in queue.list(status=args.status, limit=args.limit):
+            print(f"{job.status:8} {job.done:>7}/{job.total:<7} {job.key}  {job.error or ''}")
+    else:
+        print(f"Pruned {queue.prune()} jobs")
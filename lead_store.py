@@ -0,0 +1,381 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from enrichment import SYNTHETIC_FIELDS, normalize_business_keys
+
+DEFAULT_STORE_PATH = "leads.sqlite3"
+
+# CSV files imported on first use (or with `python lead_store.py import`)
+CSV_SOURCES = {
+    "restaurants": "restaurants_italy.csv",
+    "leads": "leads.csv",
+    "customers": "customers.csv",
+    "salespeople": "synthetic_sales_data.csv",
+    "assignments": "assignments.csv",
+}
+
+# App column name -> SQL column, per table
+BUSINESS_COLUMNS = {
+    "Name": "name",
+    "Address": "address",
+    "Type": "type",
+    "Popularity": "popularity",
+    "Profit": "profit",
+    "Status": "status",
+}
+SALESPERSON_COLUMNS = {
+    "Sales Person ID": "sales_person_id",
+    "Name": "name",
+    "Experience (Years)": "experience",
+    "Expertise in Off-Grid Energy": "expertise",
+    "Location (City in Italy)": "location",
+}
+ASSIGNMENT_COLUMNS = {
+    "Business Name": "business_name",
+    "Location": "location",
+    "Sales Person ID": "sales_person_id",
+    "Sales Person Name": "sales_person_name",
+    "Sales Person Location": "sales_person_location",
+    "Expertise": "expertise",
+    "Experience": "experience",
+    "Match Score": "match_score",
+    "Distance (km)": "distance_km",
+}
+
+BUSINESS_TABLES = ("restaurants", "leads", "customers")
+
+# Names per `WHERE name_key IN (...)` query, under SQLite's bound-variable limit
+LOOKUP_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    name_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    address TEXT NOT NULL DEFAULT '',
+    type TEXT,
+    popularity REAL,
+    profit REAL,
+    status TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (name_key, address)
+);
+CREATE INDEX IF NOT EXISTS idx_{table}_name ON {table} (name_key);
+CREATE INDEX IF NOT EXISTS idx_{table}_status ON {table} (status);
+"""
+
+EXTRA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS salespeople (
+    sales_person_id TEXT PRIMARY KEY,
+    name TEXT,
+    experience INTEGER,
+    expertise TEXT,
+    location TEXT
+);
+CREATE TABLE IF NOT EXISTS synthetic (
+    name_key TEXT PRIMARY KEY,
+    business_name TEXT NOT NULL,
+    estimated_revenue REAL,
+    market_share REAL,
+    credit_score REAL,
+    location_rating REAL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+ASSIGNMENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assignments (
+    name_key TEXT NOT NULL,
+    business_name TEXT NOT NULL,
+    location TEXT NOT NULL DEFAULT '',
+    sales_person_id TEXT,
+    sales_person_name TEXT,
+    sales_person_location TEXT,
+    expertise TEXT,
+    experience INTEGER,
+    match_score REAL,
+    distance_km REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (name_key, location)
+);
+CREATE INDEX IF NOT EXISTS idx_assignments_sales_person ON assignments (sales_person_id);
+"""
+
+# Stores created before assignments were keyed by (name, location) had one row
+# per name; rebuild that table with the new key, keeping its rows
+ASSIGNMENTS_MIGRATION = """
+DROP INDEX IF EXISTS idx_assignments_sales_person;
+ALTER TABLE assignments RENAME TO assignments_by_name;
+{schema}
+INSERT INTO assignments ({columns})
+    SELECT {source_columns} FROM assignments_by_name;
+DROP TABLE assignments_by_name;
+"""
+
+
+# Replace NaN with None so sqlite stores NULL
+def _records(df, columns):
+    df = df.reindex(columns=columns).astype(object)
+    return df.where(pd.notna(df), None).values.tolist()
+
+
+# Transactional SQLite store for restaurants, leads, customers, salespeople,
+# assignments and synthetic enrichment
+class LeadStore:
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for table in BUSINESS_TABLES:
+                conn.executescript(SCHEMA.format(table=table))
+            conn.executescript(EXTRA_SCHEMA)
+            self._migrate_assignments(conn)
+            conn.executescript(ASSIGNMENTS_SCHEMA)
+
+    # Rebuild an assignments table still keyed by name alone
+    def _migrate_assignments(self, conn):
+        key = [row[1] for row in conn.execute("PRAGMA table_info(assignments)") if row[5]]
+        if key != ["name_key"]:
+            return
+        columns = ["name_key", *ASSIGNMENT_COLUMNS.values(), "updated_at"]
+        source_columns = [f"COALESCE({column}, '')" if column == "location" else column for column in columns]
+        script = ASSIGNMENTS_MIGRATION.format(
+            schema=ASSIGNMENTS_SCHEMA, columns=", ".join(columns), source_columns=", ".join(source_columns),
+        )
+        conn.executescript(f"BEGIN IMMEDIATE;{script}COMMIT;")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    # Run `fn(conn)` in one write transaction; concurrent writers queue up instead of losing rows
+    def _write(self, fn):
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                result = fn(conn)
+                conn.execute("COMMIT")
+                return result
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    def _read(self, query, params=()):
+        conn = self._connect()
+        try:
+            return pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Restaurants / leads / customers
+    # ------------------------------------------------------------------
+
+    # Insert or update businesses keyed by (normalized name, address)
+    def upsert_businesses(self, table, df, status=None):
+        if table not in BUSINESS_TABLES:
+            raise ValueError(f"Unknown business table: {table}")
+        if df.empty:
+            return 0
+
+        df = df.rename(columns=BUSINESS_COLUMNS)
+        df = df[df["name"].notna()].copy()
+        df["address"] = df.get("address", pd.Series("", index=df.index)).fillna("")
+        if status is not None:
+            df["status"] = status
+        for column in ("popularity", "profit"):
+            df[column] = pd.to_numeric(df[column], errors="coerce") if column in df else None
+        df["name_key"] = normalize_business_keys(df["name"]).values
+        df["updated_at"] = time.time()
+        df = df.drop_duplicates(["name_key", "address"], keep="last")
+
+        columns = ["name_key", "name", "address", "type", "popularity", "profit", "status", "updated_at"]
+        rows = _records(df, columns)
+        self._write(lambda conn: conn.executemany(f"""
+            INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})
+            ON CONFLICT (name_key, address) DO UPDATE SET
+                name = excluded.name,
+                type = COALESCE(excluded.type, {table}.type),
+                popularity = COALESCE(excluded.popularity, {table}.popularity),
+                profit = COALESCE(excluded.profit, {table}.profit),
+                status = COALESCE(excluded.status, {table}.status),
+                updated_at = excluded.updated_at
+        """, rows))
+        return len(rows)
+
+    # Load a business table with the app's column names
+    def load_businesses(self, table, status=None):
+        if table not in BUSINESS_TABLES:
+            raise ValueError(f"Unknown business table: {table}")
+        query = f"SELECT name, address, type, popularity, profit, status FROM {table}"
+        params = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            params = (status,)
+        query += " ORDER BY rowid"
+        df = self._read(query, params)
+        df = df.rename(columns={v: k for k, v in BUSINESS_COLUMNS.items()})
+        df["Address"] = df["Address"].replace("", "Not Available")
+        return df
+
+    # Indexed lookup of businesses by name (spelling-insensitive)
+    def find_businesses(self, table, name):
+        if table not in BUSINESS_TABLES:
+            raise ValueError(f"Unknown business table: {table}")
+        key = normalize_business_keys([name]).iloc[0]
+        df = self._read(f"SELECT name, address, type, popularity, profit, status FROM {table} WHERE name_key = ?", (key,))
+        return df.rename(columns={v: k for k, v in BUSINESS_COLUMNS.items()})
+
+    # ------------------------------------------------------------------
+    # Salespeople
+    # ------------------------------------------------------------------
+
+    def upsert_salespeople(self, df):
+        if df.empty:
+            return 0
+        df = df.rename(columns=SALESPERSON_COLUMNS).drop_duplicates("sales_person_id", keep="last")
+        columns = list(SALESPERSON_COLUMNS.values())
+        rows = _records(df, columns)
+        self._write(lambda conn: conn.executemany(
+            f"INSERT OR REPLACE INTO salespeople ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+        ))
+        return len(rows)
+
+    def load_salespeople(self):
+        df = self._read(f"SELECT {', '.join(SALESPERSON_COLUMNS.values())} FROM salespeople ORDER BY rowid")
+        return df.rename(columns={v: k for k, v in SALESPERSON_COLUMNS.items()})
+
+    # ------------------------------------------------------------------
+    # Assignments
+    # ------------------------------------------------------------------
+
+    # One assignment per business, keyed like the business tables by
+    # (normalized name, location); re-assigning a business replaces its row
+    def upsert_assignments(self, df):
+        if df.empty:
+            return 0
+        df = df.rename(columns=ASSIGNMENT_COLUMNS).copy()
+        df["name_key"] = normalize_business_keys(df["business_name"]).values
+        df["location"] = df.get("location", pd.Series("", index=df.index)).fillna("")
+        df["updated_at"] = time.time()
+        df = df.drop_duplicates(["name_key", "location"], keep="last")
+        columns = ["name_key", *ASSIGNMENT_COLUMNS.values(), "updated_at"]
+        rows = _records(df, columns)
+        self._write(lambda conn: conn.executemany(
+            f"INSERT OR REPLACE INTO assignments ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+        ))
+        return len(rows)
+
+    def load_assignments(self):
+        df = self._read(f"SELECT {', '.join(ASSIGNMENT_COLUMNS.values())} FROM assignments ORDER BY rowid")
+        return df.rename(columns={v: k for k, v in ASSIGNMENT_COLUMNS.items()})
+
+    # ------------------------------------------------------------------
+    # Synthetic enrichment
+    # ------------------------------------------------------------------
+
+    def upsert_synthetic(self, records):
+        df = pd.DataFrame(list(records), columns=SYNTHETIC_FIELDS)
+        df = df[df["business_name"].notna()].copy()
+        if df.empty:
+            return 0
+        for column in SYNTHETIC_FIELDS[1:]:
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+        df["name_key"] = normalize_business_keys(df["business_name"]).values
+        df["updated_at"] = time.time()
+        df = df.drop_duplicates("name_key", keep="last")
+        columns = ["name_key", *SYNTHETIC_FIELDS, "updated_at"]
+        rows = _records(df, columns)
+        self._write(lambda conn: conn.executemany(
+            f"INSERT OR REPLACE INTO synthetic ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+        ))
+        return len(rows)
+
+    # Stored synthetic records, optionally only for the given business names
+    # (an indexed lookup in batches of LOOKUP_BATCH normalized names)
+    def load_synthetic(self, business_names=None):
+        query = f"SELECT {', '.join(SYNTHETIC_FIELDS)} FROM synthetic"
+        if business_names is None:
+            return self._read(query).to_dict("records")
+
+        keys = list(dict.fromkeys(normalize_business_keys(list(business_names))))
+        records = []
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            df = self._read(f"{query} WHERE name_key IN ({', '.join('?' * len(batch))})", batch)
+            records += df.to_dict("records")
+        return records
+
+    # ------------------------------------------------------------------
+    # CSV import
+    # ------------------------------------------------------------------
+
+    def is_imported(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT 1 FROM store_meta WHERE key = 'csv_imported'").fetchone() is not None
+        finally:
+            conn.close()
+
+    # One-shot import of the legacy CSV files into the store
+    def import_csvs(self, sources=None):
+        sources = {**CSV_SOURCES, **(sources or {})}
+        counts = {}
+        for table, path in sources.items():
+            if not path or not os.path.exists(path):
+                continue
+            try:
+                df = pd.read_csv(path)
+            except pd.errors.EmptyDataError:
+                continue
+
+            if table in BUSINESS_TABLES:
+                default_status = {"leads": "Lead", "customers": "Customer"}.get(table)
+                if default_status:
+                    df["Status"] = df.get("Status", pd.Series(index=df.index, dtype=object)).fillna(default_status)
+                counts[table] = self.upsert_businesses(table, df)
+            elif table == "salespeople":
+                counts[table] = self.upsert_salespeople(df)
+            elif table == "assignments":
+                counts[table] = self.upsert_assignments(df)
+
+        self._write(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('csv_imported', ?)", (str(time.time()),)
+        ))
+        return counts
+
+
+_lead_store = None
+_lead_store_lock = threading.Lock()
+
+
+# Shared store; imports the legacy CSVs the first time it is created
+def get_lead_store():
+    global _lead_store
+    with _lead_store_lock:
+        if _lead_store is None:
+            _lead_store = LeadStore(os.getenv("LEAD_STORE_PATH", DEFAULT_STORE_PATH))
+            if not _lead_store.is_imported():
+                _lead_store.import_csvs()
+        return _lead_store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "import":
+        store = LeadStore(os.getenv("LEAD_STORE_PATH", DEFAULT_STORE_PATH))
+        print(store.import_csvs())
+    else:
+        print("Usage: python lead_store.py import")
@@ -0,0 +1,150 @@
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Default location and limits for the on-disk completion cache
+DEFAULT_CACHE_PATH = "llm_cache.sqlite3"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600   # One week
+DEFAULT_MAX_ENTRIES = 5000
+
+
+class CompletionCache:
+    """
+    Content-addressed store for chat completions, backed by SQLite.
+
+    Entries are keyed by a hash of (deployment, prompt, temperature, max_tokens),
+    expire after `ttl` seconds and are evicted least-recently-used first once
+    the store grows past `max_entries`. With `bypass` set (LLM_CACHE_BYPASS)
+    lookups always miss, but fresh answers are still stored.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES, bypass=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_last_access ON completions (last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # Build the cache key for a single chat completion request. The response
+    # format only joins the key when set, so plain-text keys stay as they were.
+    @staticmethod
+    def make_key(deployment, prompt, temperature, max_tokens, response_format=None):
+        parts = [deployment, prompt, temperature, max_tokens]
+        if response_format is not None:
+            parts.append(response_format)
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # Return the cached content for `key`, or None on a miss / expired entry
+    def get(self, key):
+        if self.bypass:
+            return None
+
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT content, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            content, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return content
+
+    # Store `content` under `key` and evict the least recently used entries
+    def set(self, key, content):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, content, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, content, now, now),
+            )
+            if self.max_entries is not None:
+                conn.execute("""
+                    DELETE FROM completions WHERE key IN (
+                        SELECT key FROM completions
+                        ORDER BY last_access DESC
+                        LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_entries,))
+
+    # Drop every entry (or only the expired ones)
+    def clear(self, expired_only=False):
+        with self._lock, self._connect() as conn:
+            if expired_only and self.ttl is not None:
+                conn.execute("DELETE FROM completions WHERE created_at < ?", (time.time() - self.ttl,))
+            else:
+                conn.execute("DELETE FROM completions")
+
+    def stats(self):
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bypass": self.bypass,
+        }
+
+
+# Per-context "fresh answers" switch. Kept in a context variable rather than on
+# the shared cache, so one Streamlit session bypassing the cache leaves the
+# other sessions (and the background jobs) alone.
+_fresh_answers = contextvars.ContextVar("llm_cache_fresh_answers", default=False)
+
+
+# Skip cached answers for the LLM calls made from the current context
+def set_fresh_answers(enabled):
+    _fresh_answers.set(bool(enabled))
+
+
+def fresh_answers_requested():
+    return _fresh_answers.get()
+
+
+_completion_cache = None
+_completion_cache_lock = threading.Lock()
+
+
+# Shared cache instance, configured from the environment on first use.
+# Chat completions run on worker threads, so the first calls may race here.
+def get_completion_cache():
+    global _completion_cache
+    with _completion_cache_lock:
+        if _completion_cache is None:
+            _completion_cache = CompletionCache(
+                path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl=float(os.getenv("LLM_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                bypass=os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes"),
+            )
+        return _completion_cache
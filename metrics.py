@@ -0,0 +1,204 @@
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_PATH = "metrics.sqlite3"
+DEFAULT_WINDOW_SECONDS = 3600       # Rolling window of the Ops panel and the exporter
+DEFAULT_RETENTION_SECONDS = 7 * 24 * 3600
+DEFAULT_PROMETHEUS_PORT = 9464
+
+# Latency quantiles reported per call site
+QUANTILES = (0.5, 0.9, 0.99)
+
+SUMMARY_COLUMNS = [
+    "call_site", "calls", "p50_s", "p90_s", "p99_s", "prompt_tokens", "completion_tokens", "retries",
+    "cache_hits", "failures",
+]
+
+
+class LLMMetrics:
+    """
+    Per-call record of every LLM request, backed by SQLite.
+
+    Each chat completion is stored with its call site (the feature that made
+    it), latency, prompt and completion tokens, retries, whether it was served
+    from the completion cache and its error, if any. `summary` aggregates a
+    rolling window per call site; `prometheus_text` renders the same window in
+    the Prometheus text exposition format.
+    """
+
+    def __init__(self, path=DEFAULT_METRICS_PATH, retention=DEFAULT_RETENTION_SECONDS):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_calls (
+                    ts REAL NOT NULL,
+                    call_site TEXT NOT NULL,
+                    latency REAL NOT NULL,
+                    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                    completion_tokens INTEGER NOT NULL DEFAULT 0,
+                    retries INTEGER NOT NULL DEFAULT 0,
+                    cache_hit INTEGER NOT NULL DEFAULT 0,
+                    error TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_calls_ts ON llm_calls (ts)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, call_site, latency, prompt_tokens=0, completion_tokens=0, retries=0, cache_hit=False,
+               error=""):
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO llm_calls (ts, call_site, latency, prompt_tokens, completion_tokens, retries, "
+                    "cache_hit, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (time.time(), call_site or "unknown", latency, prompt_tokens, completion_tokens, retries,
+                     int(cache_hit), error or ""),
+                )
+        except sqlite3.Error as e:
+            # Metrics must never break the call they describe
+            logger.warning("Could not record LLM metrics for %s: %s", call_site, e)
+
+    # Raw calls of the last `window` seconds (all calls when None)
+    def load(self, window=DEFAULT_WINDOW_SECONDS):
+        since = 0 if window is None else time.time() - window
+        with self._connect() as conn:
+            return pd.read_sql_query("SELECT * FROM llm_calls WHERE ts >= ? ORDER BY ts", conn, params=(since,))
+
+    # One row per call site over the last `window` seconds. Latency quantiles
+    # only count calls that reached Azure OpenAI (cache hits take no time).
+    def summary(self, window=DEFAULT_WINDOW_SECONDS):
+        calls = self.load(window)
+        if calls.empty:
+            return pd.DataFrame(columns=SUMMARY_COLUMNS)
+
+        rows = []
+        for call_site, site_calls in calls.groupby("call_site"):
+            latency = site_calls.loc[site_calls["cache_hit"] == 0, "latency"]
+            rows.append({
+                "call_site": call_site,
+                "calls": len(site_calls),
+                **{
+                    f"p{round(q * 100)}_s": round(latency.quantile(q), 3) if not latency.empty else None
+                    for q in QUANTILES
+                },
+                "prompt_tokens": int(site_calls["prompt_tokens"].sum()),
+                "completion_tokens": int(site_calls["completion_tokens"].sum()),
+                "retries": int(site_calls["retries"].sum()),
+                "cache_hits": int(site_calls["cache_hit"].sum()),
+                "failures": int((site_calls["error"] != "").sum()),
+            })
+        return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+    # Summary of the rolling window in the Prometheus text exposition format
+    def prometheus_text(self, window=DEFAULT_WINDOW_SECONDS):
+        summary = self.summary(window)
+        counters = [
+            ("llm_calls", "calls", "LLM calls"),
+            ("llm_prompt_tokens", "prompt_tokens", "Prompt tokens sent"),
+            ("llm_completion_tokens", "completion_tokens", "Completion tokens received"),
+            ("llm_retries", "retries", "Retried attempts"),
+            ("llm_cache_hits", "cache_hits", "Calls served from the completion cache"),
+            ("llm_failures", "failures", "Failed calls"),
+        ]
+        lines = []
+        for metric, column, help_text in counters:
+            lines += [f"# HELP {metric} {help_text} in the last {window}s.", f"# TYPE {metric} gauge"]
+            lines += [f'{metric}{{call_site="{row.call_site}"}} {getattr(row, column)}' for row in summary.itertuples()]
+
+        lines += [
+            f"# HELP llm_latency_seconds LLM call latency in the last {window}s.", "# TYPE llm_latency_seconds summary",
+        ]
+        for row in summary.itertuples():
+            for q in QUANTILES:
+                value = getattr(row, f"p{round(q * 100)}_s")
+                if value is not None and not pd.isna(value):
+                    lines.append(f'llm_latency_seconds{{call_site="{row.call_site}",quantile="{q}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    # Drop calls older than the retention period
+    def prune(self):
+        with self._lock, self._connect() as conn:
+            cur = conn.execute("DELETE FROM llm_calls WHERE ts < ?", (time.time() - self.retention,))
+            return cur.rowcount
+
+
+# Serve `metrics.prometheus_text()` on /metrics from a background thread
+def serve_prometheus(metrics, host="127.0.0.1", port=DEFAULT_PROMETHEUS_PORT):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format, *args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info("Prometheus metrics on http://%s:%d/metrics", host, port)
+    return server
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+# Shared metrics store. With METRICS_PROMETHEUS_PORT set, the exporter is
+# started alongside it.
+def get_metrics():
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = LLMMetrics(os.getenv("METRICS_PATH", DEFAULT_METRICS_PATH))
+            port = os.getenv("METRICS_PROMETHEUS_PORT")
+            if port:
+                try:
+                    serve_prometheus(_metrics, port=int(port))
+                except OSError as e:
+                    logger.warning("Prometheus exporter not started on port %s: %s", port, e)
+        return _metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM call metrics: latency, tokens, retries, cache hits, failures.")
+    parser.add_argument("command", choices=["summary", "prometheus", "serve", "prune"])
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW_SECONDS, help="Rolling window in seconds")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PROMETHEUS_PORT)
+    args = parser.parse_args()
+
+    metrics = LLMMetrics(os.getenv("METRICS_PATH", DEFAULT_METRICS_PATH))
+    if args.command == "summary":
+        print(metrics.summary(args.window).to_string(index=False))
+    elif args.command == "prometheus":
+        print(metrics.prometheus_text(args.window), end="")
+    elif args.command == "prune":
+        print(f"Pruned {metrics.prune()} calls")
+    else:
+        server = serve_prometheus(metrics, args.host, args.port)
+        print(f"Serving http://{args.host}:{args.port}/metrics (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Default location and lifetime of the on-disk Places response cache
+DEFAULT_CACHE_PATH = "places_cache.sqlite3"
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600   # Thirty days
+
+# Cache modes: "use" reads and fills the cache, "bypass" ignores it and
+# "replay" serves from it only, never touching the network
+CACHE_MODES = ("use", "bypass", "replay")
+
+# Request parameters that never take part in the cache key
+IGNORED_PARAMS = {"key"}
+
+# Response statuses worth keeping (INVALID_REQUEST is a not-yet-ready page token)
+CACHEABLE_STATUSES = {"OK", "ZERO_RESULTS"}
+
+
+class PlacesCache:
+    """
+    On-disk cache of Google Places Text Search responses, backed by SQLite.
+
+    Responses are keyed by a hash of the normalized request parameters without
+    the API key. Page tokens differ from run to run, so a paged request is keyed
+    by the first page's key and its page number, found through the tokens
+    recorded when earlier pages were stored. Every place seen is also kept as
+    its own record, keyed by place_id.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL_SECONDS, mode="use"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown Places cache mode {mode!r}, expected one of {CACHE_MODES}")
+        self.path = path
+        self.ttl = ttl
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS page_tokens (
+                    token TEXT PRIMARY KEY,
+                    key TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS places (
+                    place_id TEXT PRIMARY KEY,
+                    name TEXT,
+                    address TEXT,
+                    lat REAL,
+                    lng REAL,
+                    user_ratings_total INTEGER,
+                    record TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # Cache key of a first-page request: its parameters, normalized, without the API key
+    @staticmethod
+    def make_key(params):
+        normalized = {
+            name: " ".join(str(value).split()).casefold()
+            for name, value in params.items()
+            if name not in IGNORED_PARAMS and name != "pagetoken" and value is not None
+        }
+        payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # Key of the request `params`, or None for a page token this cache never issued
+    def _request_key(self, conn, params):
+        token = params.get("pagetoken")
+        if not token:
+            return f"{self.make_key(params)}:0"
+        row = conn.execute("SELECT key FROM page_tokens WHERE token = ?", (token,)).fetchone()
+        return row[0] if row else None
+
+    # Cached response body for `params`, or None on a miss / expired entry.
+    # Returned bodies carry "_cached": True so callers can skip token waits.
+    def get(self, params):
+        if self.mode == "bypass":
+            return None
+
+        with self._lock, self._connect() as conn:
+            key = self._request_key(conn, params)
+            row = key and conn.execute("SELECT body, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if not row:
+                self.misses += 1
+                return None
+
+            body, created_at = row
+            # Stale entries still answer in replay mode, where there is nothing else
+            if self.mode != "replay" and self.ttl is not None and time.time() - created_at > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return {**json.loads(body), "_cached": True}
+
+    # Store the response to `params`, its next-page token and its places
+    def set(self, params, data):
+        if self.mode != "use" or data.get("status") not in CACHEABLE_STATUSES:
+            return
+
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            key = self._request_key(conn, params)
+            if key is None:
+                return  # A page of a chain whose first page was not cached
+
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(data, ensure_ascii=False), now),
+            )
+            next_token = data.get("next_page_token")
+            if next_token:
+                base, page = key.rsplit(":", 1)
+                conn.execute(
+                    "INSERT OR REPLACE INTO page_tokens (token, key) VALUES (?, ?)",
+                    (next_token, f"{base}:{int(page) + 1}"),
+                )
+
+            records = []
+            for result in data.get("results", []):
+                if not result.get("place_id"):
+                    continue
+                location = (result.get("geometry") or {}).get("location") or {}
+                records.append((
+                    result["place_id"], result.get("name"), result.get("formatted_address"),
+                    location.get("lat"), location.get("lng"), result.get("user_ratings_total"),
+                    json.dumps(result, ensure_ascii=False), now,
+                ))
+            conn.executemany(
+                "INSERT OR REPLACE INTO places (place_id, name, address, lat, lng, user_ratings_total, record, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+
+    # Stored record of one place, or None
+    def get_place(self, place_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT record FROM places WHERE place_id = ?", (place_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # Drop every cached response (or only the expired ones); place records are kept
+    def clear(self, expired_only=False):
+        with self._lock, self._connect() as conn:
+            if expired_only and self.ttl is not None:
+                conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+            else:
+                conn.execute("DELETE FROM responses")
+                conn.execute("DELETE FROM page_tokens")
+
+    def stats(self):
+        with self._connect() as conn:
+            responses = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            places = conn.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "responses": responses,
+            "places": places,
+            "mode": self.mode,
+        }
+
+
+_places_cache = None
+_places_cache_lock = threading.Lock()
+
+
+# Shared cache instance, configured from the environment on first use
+def get_places_cache():
+    global _places_cache
+    with _places_cache_lock:
+        if _places_cache is None:
+            _places_cache = PlacesCache(
+                path=os.getenv("PLACES_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl=float(os.getenv("PLACES_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+                mode=os.getenv("PLACES_CACHE_MODE", "use").lower(),
+            )
+        return _places_cache
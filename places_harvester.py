@@ -0,0 +1,193 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from prospects import append_to_csv, fetch_restaurants_from_google, place_to_row
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QPS = 10.0
+DEFAULT_WORKERS = 8
+DEFAULT_CHECKPOINT_PATH = "harvest_checkpoint.jsonl"
+
+# A next_page_token only becomes valid a short while after it is issued
+TOKEN_READY_DELAY = 1.5         # Seconds to wait before the first use of a token
+TOKEN_RETRY_DELAY = 1.0         # Seconds between retries while it is not ready
+TOKEN_MAX_RETRIES = 5
+
+
+# Raised when a query stops before its last page: an error status (throttled,
+# denied, a token that never became valid) or no response at all. Carries the
+# pages fetched so far, which are kept, but the query is not checkpointed.
+class HarvestError(RuntimeError):
+    def __init__(self, message, results, pages):
+        super().__init__(message)
+        self.results = results
+        self.pages = pages
+
+
+# Token bucket shared by every worker so the crawl stays under a global QPS budget
+class RateLimiter:
+    def __init__(self, qps, burst=None):
+        self.rate = float(qps)
+        self.capacity = float(burst or max(1.0, qps))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Block until one request may be sent
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Completed queries are recorded one per line, so an interrupted crawl can resume.
+# The checkpoint only lives until a crawl finishes without failures.
+class HarvestCheckpoint:
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        self.completed = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # A line cut short by an interruption
+                    self.completed[entry["query"]] = entry
+        self._lock = threading.Lock()
+
+    def is_done(self, query):
+        return query in self.completed
+
+    def mark_done(self, query, pages, places):
+        entry = {"query": query, "pages": pages, "places": places, "completed_at": time.time()}
+        with self._lock:
+            self.completed[query] = entry
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+
+    # Forget every completed query, so the next crawl starts from scratch
+    def clear(self):
+        with self._lock:
+            self.completed = {}
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
+
+
+# Fetch every page of one query. Pages of a query are sequential (each needs
+# the previous page's token); the rate limiter is shared with other queries.
+# Only ZERO_RESULTS or a page without next_page_token end a query normally;
+# anything else raises HarvestError.
+def harvest_query(query, rate_limiter, fetch_page=fetch_restaurants_from_google):
+    results = []
+    pages = 0
+    page_token = None
+
+    while True:
+        data = None
+        for attempt in range(TOKEN_MAX_RETRIES + 1):
+            rate_limiter.acquire()
+            data = fetch_page(query, page_token)
+            # INVALID_REQUEST on a paged call means the token is not ready yet
+            if not (page_token and data and data.get("status") == "INVALID_REQUEST"):
+                break
+            time.sleep(TOKEN_RETRY_DELAY)
+
+        if not data:
+            raise HarvestError(f"No response for page {pages + 1} of {query!r}", results, pages)
+        if data.get("status") not in (None, "OK", "ZERO_RESULTS"):
+            raise HarvestError(f"Page {pages + 1} of {query!r} returned status {data.get('status')}", results, pages)
+
+        pages += 1
+        results.extend(data.get("results", []))
+
+        page_token = data.get("next_page_token")
+        if not page_token:
+            break
+        if not data.get("_cached"):
+            time.sleep(TOKEN_READY_DELAY)  # Cached tokens need no wait
+
+    return results, pages
+
+
+# Harvest many queries concurrently under a global QPS budget.
+# Each finished query is appended to the prospects CSV and checkpointed; once
+# every query has completed the checkpoint is cleared, so it only resumes
+# interrupted or partly failed crawls. `reset` discards it before starting.
+# Returns a summary of the crawl.
+def harvest(queries, qps=DEFAULT_QPS, workers=DEFAULT_WORKERS, checkpoint_path=DEFAULT_CHECKPOINT_PATH,
+            fetch_page=fetch_restaurants_from_google, sink=append_to_csv, reset=False):
+    checkpoint = HarvestCheckpoint(checkpoint_path)
+    if reset:
+        checkpoint.clear()
+    rate_limiter = RateLimiter(qps)
+
+    pending = [query for query in dict.fromkeys(queries) if not checkpoint.is_done(query)]
+    summary = {
+        "queries": len(pending), "skipped": len(set(queries)) - len(pending), "failed": 0, "pages": 0, "places": 0,
+        "appended": 0,
+    }
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(harvest_query, query, rate_limiter, fetch_page): query for query in pending}
+        for future in as_completed(futures):
+            query = futures[future]
+            failed = False
+            try:
+                results, pages = future.result()
+            except HarvestError as e:
+                # Keep the pages that did arrive; the query itself is retried on resume
+                logger.error("Query %r failed after %d pages: %s", query, e.pages, e)
+                results, pages, failed = e.results, e.pages, True
+            except Exception as e:
+                logger.error("Query %r failed: %s", query, e)
+                summary["failed"] += 1
+                continue
+
+            # Results are written from this thread only, then a complete query is checkpointed
+            rows = [place_to_row(result) for result in results]
+            appended = sink(rows) if rows else None
+            if failed:
+                summary["failed"] += 1
+            else:
+                checkpoint.mark_done(query, pages, len(rows))
+
+            summary["pages"] += pages
+            summary["places"] += len(rows)
+            summary["appended"] += len(appended) if appended is not None else 0
+
+    if not summary["failed"]:
+        checkpoint.clear()
+    summary["seconds"] = round(time.monotonic() - started, 2)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Harvest restaurants from Google Places for many queries.")
+    parser.add_argument("queries_file", help="Text file with one search query per line")
+    parser.add_argument("--qps", type=float, default=DEFAULT_QPS, help="Global requests-per-second budget")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Queries crawled at once")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH, help="Checkpoint file used to resume")
+    parser.add_argument("--reset", action="store_true", help="Ignore the checkpoint of an earlier, unfinished crawl")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.queries_file, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    print(harvest(queries, qps=args.qps, workers=args.workers, checkpoint_path=args.checkpoint,
+                  reset=args.reset))
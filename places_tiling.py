@@ -0,0 +1,203 @@
+import argparse
+import logging
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from italy_geo import ITALY_PATTERN, PROVINCES, parse_address
+from places_harvester import DEFAULT_QPS, DEFAULT_WORKERS, HarvestError, RateLimiter, harvest_query
+from prospects import append_to_csv, fetch_restaurants_from_google, place_location, place_to_row
+
+logger = logging.getLogger(__name__)
+
+# Bounding box of Italy (lat_min, lat_max, lon_min, lon_max), islands included
+ITALY_BOUNDS = (35.4, 47.1, 6.6, 18.6)
+
+DEFAULT_SEED_DEGREES = 1.0      # Side of the initial grid cells
+DEFAULT_MIN_DEGREES = 0.05      # Saturated tiles are not split below this (~5 km)
+SATURATION_RESULTS = 60         # Text Search returns at most 3 pages of 20
+ANCHOR_MARGIN = 0.6             # Seed cells farther than this from every province capital are skipped
+
+
+# One rectangular search area; searched as the circle that encloses it
+@dataclass(frozen=True)
+class Tile:
+    lat_min: float
+    lat_max: float
+    lon_min: float
+    lon_max: float
+    depth: int = 0
+
+    @property
+    def center(self):
+        return (self.lat_min + self.lat_max) / 2, (self.lon_min + self.lon_max) / 2
+
+    @property
+    def size(self):
+        return max(self.lat_max - self.lat_min, self.lon_max - self.lon_min)
+
+    # Radius (metres) of the circle from the centre that covers every corner
+    @property
+    def radius_m(self):
+        lat, lon = self.center
+        radius = 0.0
+        for corner_lat in (self.lat_min, self.lat_max):
+            dlat = math.radians(corner_lat - lat)
+            dlon = math.radians(self.lon_max - lon)
+            a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat)) * math.cos(math.radians(corner_lat)) * math.sin(dlon / 2) ** 2
+            radius = max(radius, 6371000.0 * 2 * math.asin(math.sqrt(a)))
+        return radius
+
+    @property
+    def area(self):
+        return (self.lat_max - self.lat_min) * (self.lon_max - self.lon_min)
+
+    def contains(self, lat, lon):
+        return self.lat_min <= lat < self.lat_max and self.lon_min <= lon < self.lon_max
+
+    # The four quadrants of this tile
+    def split(self):
+        lat_mid, lon_mid = self.center
+        return [
+            Tile(lat_lo, lat_hi, lon_lo, lon_hi, self.depth + 1)
+            for lat_lo, lat_hi in ((self.lat_min, lat_mid), (lat_mid, self.lat_max))
+            for lon_lo, lon_hi in ((self.lon_min, lon_mid), (lon_mid, self.lon_max))
+        ]
+
+
+# Initial grid over Italy, keeping only cells near a province capital (no open sea)
+def seed_tiles(bounds=ITALY_BOUNDS, degrees=DEFAULT_SEED_DEGREES):
+    lat_min, lat_max, lon_min, lon_max = bounds
+    anchors = [(lat, lon) for _, _, lat, lon in PROVINCES.values()]
+    tiles = []
+    lat = lat_min
+    while lat < lat_max:
+        lon = lon_min
+        while lon < lon_max:
+            tile = Tile(lat, min(lat + degrees, lat_max), lon, min(lon + degrees, lon_max))
+            if any(tile.lat_min - ANCHOR_MARGIN <= a_lat < tile.lat_max + ANCHOR_MARGIN
+                   and tile.lon_min - ANCHOR_MARGIN <= a_lon < tile.lon_max + ANCHOR_MARGIN
+                   for a_lat, a_lon in anchors):
+                tiles.append(tile)
+            lon += degrees
+        lat += degrees
+    return tiles
+
+
+# Results that belong to this tile: inside it, or (without coordinates) with an
+# address that is Italian for sure, i.e. mentions Italy or has a "CAP Comune PR"
+# block. A bare city name is not enough: "Rome, GA 30161, USA" names one too.
+def _tile_results(tile, results):
+    kept = []
+    for result in results:
+        location = place_location(result)
+        address = result.get("formatted_address", "")
+        if location is not None:
+            if tile.contains(*location):
+                kept.append(result)
+        elif ITALY_PATTERN.search(address) or parse_address(address)["postal_code"]:
+            kept.append(result)
+    return kept
+
+
+# Crawl one query over an adaptive grid of Italy. Tiles run in parallel under a
+# global QPS budget; a tile that comes back saturated is split into quadrants.
+# Places are deduplicated by place_id across overlapping tiles and appended to
+# the prospects CSV as each tile completes. Returns a coverage report.
+def crawl_tiles(query, tiles=None, qps=DEFAULT_QPS, workers=DEFAULT_WORKERS, min_degrees=DEFAULT_MIN_DEGREES,
+                fetch_page=fetch_restaurants_from_google, sink=append_to_csv):
+    rate_limiter = RateLimiter(qps)
+    request_count = [0]
+    count_lock = threading.Lock()
+
+    def search_tile(tile):
+        def fetch_tile_page(query, page_token):
+            with count_lock:
+                request_count[0] += 1
+            return fetch_page(query, page_token, location=tile.center, radius=tile.radius_m)
+        return harvest_query(query, rate_limiter, fetch_tile_page)
+
+    seen_place_ids = set()
+    report = {
+        "query": query, "tiles": 0, "split": 0, "saturated_leaves": 0, "max_depth": 0,
+        "results": 0, "outside_tile": 0, "unique_places": 0, "appended": 0, "failed_tiles": 0,
+    }
+    complete_area = searched_area = 0.0
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        pending = {executor.submit(search_tile, tile): tile for tile in (tiles or seed_tiles())}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                tile = pending.pop(future)
+                failed = False
+                try:
+                    results, _ = future.result()
+                except HarvestError as e:
+                    # Keep the pages that arrived, but the tile's area does not count as searched
+                    logger.error("Tile %s failed after %d pages: %s", tile, e.pages, e)
+                    results, failed = e.results, True
+                    report["failed_tiles"] += 1
+                except Exception as e:
+                    logger.error("Tile %s failed: %s", tile, e)
+                    report["failed_tiles"] += 1
+                    continue
+
+                report["tiles"] += 1
+                report["max_depth"] = max(report["max_depth"], tile.depth)
+                report["results"] += len(results)
+
+                saturated = len(results) >= SATURATION_RESULTS
+                if failed:
+                    pass  # Neither split nor counted towards coverage; rerun the crawl to fill it in
+                elif saturated and tile.size / 2 >= min_degrees:
+                    # Search the quadrants; keep what this tile found as well
+                    report["split"] += 1
+                    for child in tile.split():
+                        pending[executor.submit(search_tile, child)] = child
+                else:
+                    searched_area += tile.area
+                    if saturated:
+                        report["saturated_leaves"] += 1
+                    else:
+                        complete_area += tile.area
+
+                in_tile = _tile_results(tile, results)
+                report["outside_tile"] += len(results) - len(in_tile)
+                rows = []
+                for result in in_tile:
+                    place_id = result.get("place_id")
+                    if place_id in seen_place_ids:
+                        continue
+                    if place_id:
+                        seen_place_ids.add(place_id)
+                    rows.append(place_to_row(result))
+
+                report["unique_places"] += len(rows)
+                if rows:
+                    appended = sink(rows)
+                    report["appended"] += len(appended) if appended is not None else 0
+
+    report["requests"] = request_count[0]
+    report["requests_per_new_place"] = round(report["requests"] / max(report["appended"], 1), 3)
+    # Share of the searched area whose tiles were not saturated, i.e. fully listed
+    report["coverage"] = round(complete_area / searched_area, 4) if searched_area else 0.0
+    report["seconds"] = round(time.monotonic() - started, 2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl a Places query over an adaptive grid of Italy.")
+    parser.add_argument("query", help="Search query, e.g. 'pizzeria'")
+    parser.add_argument("--qps", type=float, default=DEFAULT_QPS, help="Global requests-per-second budget")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Tiles searched at once")
+    parser.add_argument("--seed-degrees", type=float, default=DEFAULT_SEED_DEGREES, help="Side of the initial grid cells")
+    parser.add_argument("--min-degrees", type=float, default=DEFAULT_MIN_DEGREES, help="Smallest tile side")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(crawl_tiles(args.query, seed_tiles(degrees=args.seed_degrees), qps=args.qps, workers=args.workers,
+                      min_degrees=args.min_degrees))
@@ -0,0 +1,245 @@
+import json
+import math
+
+# Prompt templates of the Lead-Mgmt.py tabs, shared by the app and the benchmarks
+
+# Rough characters per token, for prompt size estimates without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Italy's Open Data Maturity facts used as marketing context
+ODM_CONTEXT = """
+    Italy's Open Data Maturity (ODM) 2024 indicates a highly advanced national digital ecosystem.
+
+    Key quick facts used for marketing context:
+    - Policy: 93.8
+    - Portal: 89.6
+    - Quality: 85.7
+    - Impact: 100
+    - Strong adoption of open data for local & regional development
+    - Strong public initiatives supporting sustainability and green innovation
+    """
+
+
+# Approximate token count of a prompt
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+# Prompt asking for the best salesperson for a lead out of `sales_df`, with the
+# full roster written out in prose. Kept as the baseline the compact batch prompt
+# below is measured against.
+def salesperson_recommendation_prompt(business_name, expertise_needed, sales_df):
+    prompt = f"""
+    We have a business lead named '{business_name}' that requires expertise in {expertise_needed}. Please recommend the most suitable salesperson from the following list based on their expertise, experience, and location.
+    The response should be in valid JSON format with keys:
+    - "Sales Person ID"
+    - "Name"
+    - "Experience"
+    - "Expertise"
+    - "Location"
+
+    LEAD:
+    Business Name: {business_name}
+    Expertise Needed: {expertise_needed}
+
+    SALESPEOPLE:
+    """
+
+    # Add the salespeople data to the prompt
+    for _, row in sales_df.iterrows():
+        prompt += f"\nSales Person ID: {row['Sales Person ID']}, Name: {row['Name']}, Experience: {row['Experience (Years)']} years, Expertise: {row['Expertise in Off-Grid Energy']}, Location: {row['Location (City in Italy)']}"
+
+    prompt += """
+    PLEASE RESPOND IN THE EXACT JSON FORMAT BELOW:
+    {
+        "Sales Person ID": "[ID]",
+        "Name": "[Name]",
+        "Experience": "[Experience (Years)]",
+        "Expertise": "[Expertise]",
+        "Location": "[Location]"
+    }
+    ONLY provide the data in the JSON format above. Do not include any extra explanation, text, or additional information.
+    """
+    return prompt
+
+
+# Salesperson roster as a dictionary-coded table: each city and expertise is
+# spelled out once in a legend and rows refer to it by code
+def salesperson_roster(sales_df):
+    cities = {city: f"C{i}" for i, city in enumerate(sorted(sales_df["Location (City in Italy)"].astype(str).unique()), 1)}
+    expertise = {
+        value: f"E{i}" for i, value in enumerate(sorted(sales_df["Expertise in Off-Grid Energy"].astype(str).unique()), 1)
+    }
+    rows = (
+        sales_df["Sales Person ID"].astype(str) + "|" + sales_df["Name"].astype(str) + "|"
+        + sales_df["Experience (Years)"].astype(str) + "|"
+        + sales_df["Expertise in Off-Grid Energy"].astype(str).map(expertise) + "|"
+        + sales_df["Location (City in Italy)"].astype(str).map(cities)
+    )
+    return "\n".join([
+        "CITIES: " + "; ".join(f"{code}={city}" for city, code in cities.items()),
+        "EXPERTISE: " + "; ".join(f"{code}={value}" for value, code in expertise.items()),
+        "ID|NAME|YEARS|EXPERTISE|CITY",
+        *rows,
+    ])
+
+
+# Prompt assigning many leads in one call. `leads` is a list of
+# (business_name, business_address, candidate_ids); the roster in `sales_df`
+# is sent once and each lead only lists the IDs it may be given. Leads are
+# labelled L1, L2, ... unless `labels` are given (e.g. when re-asking a subset).
+def salesperson_batch_prompt(leads, expertise_needed, sales_df, labels=None):
+    labels = labels or [f"L{i}" for i in range(1, len(leads) + 1)]
+    lead_rows = "\n".join(
+        f"{label}|{name}|{address}|{','.join(str(candidate) for candidate in candidates)}"
+        for label, (name, address, candidates) in zip(labels, leads)
+    )
+    return f"""
+    Assign each business lead below the most suitable salesperson for {expertise_needed}, based on expertise, experience and how close their city is to the lead. Choose only among the lead's candidate IDs.
+
+    SALESPEOPLE:
+    {salesperson_roster(sales_df)}
+
+    LEADS (LEAD|BUSINESS NAME|ADDRESS|CANDIDATE IDS):
+    {lead_rows}
+
+    Respond ONLY with a JSON array holding one object per lead, no extra text:
+    [{{"lead": "L1", "id": "[Sales Person ID]"}}]
+    """
+
+
+# Prompt for the Lead Information tab
+def business_information_prompt(business_name, business_address):
+    return f"""
+            You are a business intelligence assistant. Provide detailed information about the company named "{business_name}" located at "{business_address}".
+            Include the following if available:
+            - Overview of the business
+            - Industry and sector
+            - Services or products offered
+            - Company size or popularity
+            - Estimated financial performance (approximate revenue/profit)
+            - Recent news, reviews, or reputation
+            - Competitive landscape and local market context
+
+            Format the response as a clean, structured summary using Markdown headings and bullet points.
+            """
+
+
+# Prompt for the short business description opening a sales email
+def business_summary_prompt(business_name, business_address):
+    return f"""
+            Provide a short 2–3 sentence description about the business '{business_name}', located at '{business_address}'.
+            Highlight what the business is known for and any characteristics relevant to energy usage (such as customer volume, operational hours, food service, hospitality, or location).
+            Write in natural, human-like sentences appropriate for a sales email introduction.
+            """
+
+
+# Prompt for the Off-Grid Gas outreach email
+def sales_email_prompt(business_name, salesperson_name, salesperson_location, salesperson_experience, business_context):
+    return f"""
+            Write a professional outreach email from SHV Energy addressed to the owners or managers of '{business_name}'.
+
+            The email MUST clearly promote SHV Energy’s **Off-Grid Gas solutions**, emphasizing:
+            - reliable and uninterrupted gas supply for businesses operating off the main energy grid
+            - safer, cleaner alternatives to diesel or old heating systems
+            - consistent heating and cooking performance for restaurants / hospitality / food service operations
+            - cost stability, high efficiency, and reduced emissions with modern LPG-based systems
+
+            The sender details to include:
+            - Name: {salesperson_name}
+            - Location: based in {salesperson_location}
+            - Experience: {salesperson_experience} years of experience
+            - Expertise: Off-Grid Gas Solutions
+
+            Incorporate the following business context naturally at the beginning:
+            {business_context}
+
+            Additional instructions:
+            - Write in clear, polished paragraphs (3–5 paragraphs).
+            - Keep the tone professional, helpful, and confident.
+            - Invite the business to a meeting or call to discuss Off-Grid Gas options.
+            - Make the benefits specific and relevant to their business type.
+            - End with a warm sign-off and a proper email signature for the salesperson.
+            - DO NOT mention AI or that this text is generated.
+
+            Output only the email content, no extra commentary.
+            """
+
+
+# Prompt resolving a lead's Electricity Maps zone when the local index cannot
+def zone_prompt(full_lead_record):
+    return f"""
+        You are an expert in Italian geography and Electricity Maps API zones.
+
+        Here is a complete business lead record:
+        {full_lead_record}
+
+        TASKS:
+        1. Extract the EXACT Italian city or regional location from the address.
+        2. Convert that location into the correct Electricity Maps zone code.
+        3. Return data ONLY in this exact JSON format:
+
+        {{
+            "location": "[Extracted Italian location]",
+            "zone": "[Electricity Maps zone code]"
+        }}
+
+        Examples:
+        Central North Italy -> IT-CNO
+        Central South Italy -> IT-CSO
+        North Italy -> IT-NO
+        Sardinia -> IT-SAR
+        Sicily -> IT-SIC
+        South Italy -> IT-SO
+
+        DO NOT RETURN ANYTHING OTHER THAN THE JSON ABOVE.
+        """
+
+
+# Prompt for the Targeted Marketing Strategy tab
+def marketing_strategy_prompt(lead_data, carbon_intensity=None, odm_context=ODM_CONTEXT):
+    return f"""
+    You are an expert in marketing strategy, off-grid gas solutions, Italian SME behavior,
+    and regional energy economics.
+
+    Create a **deeply personalized marketing strategy** for the exact restaurant lead below.
+
+    ===============================
+    LEAD PROFILE (FULL DATA INPUT)
+    ===============================
+    {json.dumps(lead_data, indent=2)}
+
+    ===============================
+    CARBON INTENSITY (IF AVAILABLE)
+    ===============================
+    {carbon_intensity}
+
+    ===============================
+    ITALY OPEN DATA MATURITY (ODM 2024)
+    USED TO UNDERSTAND ECONOMIC CONTEXT
+    ===============================
+    {odm_context}
+
+    ===============================
+    YOUR TASK
+    ===============================
+
+    Create a **highly tailored marketing strategy** ONLY for this specific lead.
+    Base all reasoning strictly on the provided data.
+    Do NOT generalize.
+    Write the output in beautifully formatted MARKDOWN.
+
+    Include the following sections:
+
+    1. **Lead Summary**
+    2. **Operational Pain Points (Based on location, type, popularity, profit)**
+    3. **Energy Risk Profile (Using carbon intensity if provided)**
+    4. **Tailored Off-Grid Gas Solution Recommendation**
+    5. **Financial ROI Estimation (based strictly on lead data)**
+    6. **Environmental Impact & Emission Benefits**
+    7. **Recommended Messaging Style (tone, angle)**
+    8. **Targeted Outreach Plan (step-by-step)**
+    9. **Campaign Ideas (local incentives, context from ODM Italy)**
+
+    Make everything look clean with bold headers, bullet points, and spacing.
+    """
@@ -0,0 +1,185 @@
+import contextvars
+import logging
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from azure_openai import chat_completion, OpenAIError
+
+logger = logging.getLogger(__name__)
+
+# Default number of ranking requests allowed in flight at once
+DEFAULT_MAX_WORKERS = 8
+
+# Features used by the local ranking model and their default weights
+RANK_FEATURES = ["estimated_revenue", "market_share", "credit_score", "location_rating"]
+DEFAULT_RANK_WEIGHTS = {
+    "estimated_revenue": 0.35,
+    "market_share": 0.20,
+    "credit_score": 0.30,
+    "location_rating": 0.15,
+}
+
+# Expected value ranges used by the "fixed" normalisation (revenue is log10-scaled)
+FIXED_FEATURE_BOUNDS = {
+    "estimated_revenue": (4.0, 7.0),   # 10k to 10M EUR
+    "market_share": (0.0, 10.0),
+    "credit_score": (0.0, 100.0),
+    "location_rating": (0.0, 5.0),
+}
+
+
+# Function to get the rank from OpenAI based on synthetic data
+def get_rank_from_openai(synthetic_data):
+    """
+    Use OpenAI to calculate the rank for a business based on its synthetic data.
+    Returns None when the request fails or the answer is not a number.
+    """
+    if not synthetic_data:
+        return random.randint(1, 100)  # Fallback if no data is available
+
+    # Prepare prompt to explicitly request a rank between 1 and 100
+    prompt = f"""
+    Based on the following synthetic data for the business, please provide a rank between 1 and 100, where 1 is the best and 100 is the worst:
+    - Estimated Revenue: {synthetic_data.get("estimated_revenue")}
+    - Market Share: {synthetic_data.get("market_share")}
+    - Credit Score: {synthetic_data.get("credit_score")}
+    - Location Rating: {synthetic_data.get("location_rating")}
+
+    Please return only the rank number, without any additional explanation or text.
+    """
+
+    try:
+        rank_response = chat_completion(
+            prompt, max_tokens=50, temperature=0.5, timeout=30, call_site="ranking"
+        ).strip()
+    except OpenAIError as e:
+        logger.error("OpenAI API Error: %s - %s", e.status_code, e.text)
+        return None
+    except Exception as e:
+        logger.error("Error during OpenAI API request: %s", e)
+        return None
+
+    try:
+        rank = int(rank_response)  # Attempt to convert the response directly to an integer
+        return min(max(rank, 1), 100)  # Ensure the rank is between 1 and 100
+    except ValueError as e:
+        logger.error("Invalid rank format returned by OpenAI: %s", e)
+        return None
+
+
+# Rank a batch of synthetic records concurrently.
+# `on_result(business_name, rank)` is called from the calling thread as each
+# rank arrives, so it is safe to update Streamlit state from it.
+def rank_batch(synthetic_data_batch, max_workers=None, on_result=None):
+    if max_workers is None:
+        max_workers = int(os.getenv("RANKING_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+
+    ranks = {}
+    if not synthetic_data_batch:
+        return ranks
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(
+                contextvars.copy_context().run, get_rank_from_openai, item
+            ): item["business_name"]
+            for item in synthetic_data_batch
+        }
+        for future in as_completed(futures):
+            business_name = futures[future]
+            try:
+                rank = future.result()
+            except Exception as e:
+                logger.error("Ranking failed for %s: %s", business_name, e)
+                rank = None
+
+            ranks[business_name] = rank
+            if on_result is not None:
+                on_result(business_name, rank)
+
+    return ranks
+
+
+# Scale the rank features of a DataFrame into [0, 1], higher is better.
+#   "fixed"  - against FIXED_FEATURE_BOUNDS, so a business ranks the same in any batch
+#   "minmax" - against the min/max of this batch
+#   "zscore" - standardised within this batch and squashed with a logistic curve
+# Missing or non-numeric values count as neutral (0.5).
+def normalize_rank_features(df, normalization="fixed"):
+    features = pd.DataFrame(index=df.index)
+    for column in RANK_FEATURES:
+        values = pd.to_numeric(df[column], errors="coerce") if column in df else pd.Series(np.nan, index=df.index)
+        features[column] = values.astype(float)
+
+    features["estimated_revenue"] = np.log10(features["estimated_revenue"].clip(lower=1.0))
+
+    if normalization == "fixed":
+        low = pd.Series({c: FIXED_FEATURE_BOUNDS[c][0] for c in RANK_FEATURES})
+        high = pd.Series({c: FIXED_FEATURE_BOUNDS[c][1] for c in RANK_FEATURES})
+        scaled = (features - low) / (high - low)
+    elif normalization == "minmax":
+        span = (features.max() - features.min()).replace(0, np.nan)
+        scaled = (features - features.min()) / span
+    elif normalization == "zscore":
+        std = features.std(ddof=0).replace(0, np.nan)
+        scaled = 1.0 / (1.0 + np.exp(-(features - features.mean()) / std))
+    else:
+        raise ValueError(f"Unknown normalization: {normalization}")
+
+    return scaled.clip(0.0, 1.0).fillna(0.5)
+
+
+# Compute ranks for a whole DataFrame of synthetic data in one vectorized pass.
+# Returns an integer Series between 1 (best) and 100 (worst), aligned with `df`.
+def local_rank(df, weights=None, normalization="fixed"):
+    weights = pd.Series(weights or DEFAULT_RANK_WEIGHTS).reindex(RANK_FEATURES).fillna(0.0)
+    if weights.sum() <= 0:
+        raise ValueError("Rank weights must sum to a positive value")
+    weights = weights / weights.sum()
+
+    score = normalize_rank_features(df, normalization).to_numpy() @ weights.to_numpy()
+    ranks = 1 + np.rint((1.0 - score) * 99)
+    return pd.Series(ranks.astype(int), index=df.index, name="Rank")
+
+
+# Fit rank weights against LLM ranks for the same records (least squares,
+# non-negative and normalised to sum to 1). `llm_ranks` is aligned with `df`;
+# rows without an LLM rank are ignored.
+def calibrate_rank_weights(df, llm_ranks, normalization="fixed"):
+    llm_ranks = pd.to_numeric(pd.Series(llm_ranks, index=df.index), errors="coerce")
+    mask = llm_ranks.notna().to_numpy()
+    if mask.sum() < len(RANK_FEATURES):
+        return dict(DEFAULT_RANK_WEIGHTS)
+
+    features = normalize_rank_features(df, normalization).to_numpy()[mask]
+    target = 1.0 - (llm_ranks.to_numpy()[mask] - 1) / 99
+    coefficients, *_ = np.linalg.lstsq(features, target, rcond=None)
+    coefficients = np.clip(coefficients, 0.0, None)
+    if coefficients.sum() <= 0:
+        return dict(DEFAULT_RANK_WEIGHTS)
+
+    coefficients = coefficients / coefficients.sum()
+    return {column: float(weight) for column, weight in zip(RANK_FEATURES, coefficients)}
+
+
+# Calibrate local weights against LLM ranks for a random sample of the batch
+def calibrate_against_llm(synthetic_data_batch, sample_size=20, seed=0, normalization="fixed"):
+    df = pd.DataFrame(synthetic_data_batch)
+    if df.empty:
+        return dict(DEFAULT_RANK_WEIGHTS)
+
+    sample = df.sample(n=min(sample_size, len(df)), random_state=seed)
+    llm_ranks = rank_batch(sample.to_dict("records"))
+    return calibrate_rank_weights(sample, sample["business_name"].map(llm_ranks), normalization)
+
+
+# Rank a batch of synthetic records locally, returning {business_name: rank}
+def local_rank_batch(synthetic_data_batch, weights=None, normalization="fixed"):
+    df = pd.DataFrame(synthetic_data_batch)
+    if df.empty:
+        return {}
+    return dict(zip(df["business_name"], local_rank(df, weights, normalization).tolist()))
@@ -0,0 +1,356 @@
+import logging
+import math
+
+import numpy as np
+import pandas as pd
+
+from assignment import assign_leads, score_matrix
+from azure_openai import chat_completion
+from enrichment import generate_synthetic_data, merge_synthetic_data, normalize_business_keys
+from lead_store import get_lead_store
+from prompts import (
+    CHARS_PER_TOKEN, ODM_CONTEXT, business_information_prompt, business_summary_prompt, estimate_tokens,
+    marketing_strategy_prompt, sales_email_prompt, salesperson_batch_prompt, salesperson_recommendation_prompt,
+    zone_prompt,
+)
+from ranking import local_rank_batch, rank_batch
+from structured_output import SalespersonPick, ZoneAnswer, request_keyed_records, request_record
+from zones import resolve_zone, resolve_zones
+
+# Business logic behind the Lead-Mgmt.py tabs, free of Streamlit so it can be
+# called, cached and profiled headless. Failures are raised (OpenAIError,
+# ValueError) or logged; the view decides how to show them.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPERTISE = "Off-Grid Solutions"
+SALES_EXPERTISE = "Off-Grid Gas Solutions"
+
+# Keys a salesperson recommendation must have
+SALESPERSON_FIELDS = ["Sales Person ID", "Name", "Experience", "Expertise", "Location"]
+
+# Salesperson recommendation prompts: candidates kept per lead (best by city and
+# expertise score) and leads assigned per LLM call
+DEFAULT_TOP_K = 5
+DEFAULT_LEADS_PER_PROMPT = 20
+TOKENS_PER_ASSIGNMENT = 20          # Completion budget per {"lead", "id"} object
+
+# Columns of the ranked Prospects and Leads grids
+GRID_COLUMNS = ["Rank", "Name", "Address", "Profit", "Popularity", "Market Share", "Credit Score", "Location Rating"]
+
+# Region names the zone prompt may answer with instead of a zone code
+REGION_NAME_ZONES = {
+    "Central North Italy": "IT-CNO",
+    "Central South Italy": "IT-CSO",
+    "North Italy": "IT-NO",
+    "Sardinia": "IT-SAR",
+    "Sicily": "IT-SIC",
+    "South Italy": "IT-SO",
+}
+
+
+# ----------------------------------------------------------------------
+# Enrichment and ranking
+# ----------------------------------------------------------------------
+
+# Stored synthetic records for `business_names` and the names that have none yet
+def split_stored_synthetic(business_names, store=None):
+    store = store or get_lead_store()
+    stored = store.load_synthetic(business_names)
+    stored_keys = set(normalize_business_keys([record["business_name"] for record in stored]))
+    missing_names = [
+        name for name, key in zip(business_names, normalize_business_keys(business_names)) if key not in stored_keys
+    ]
+    return stored, missing_names
+
+
+# Generate synthetic records for `business_names` and keep them in the store
+def generate_and_store_synthetic(business_names, store=None):
+    store = store or get_lead_store()
+    generated = generate_synthetic_data(business_names)
+    store.upsert_synthetic(generated)
+    return generated
+
+
+# Synthetic records for `business_names`, asking the LLM only about businesses not seen before
+def synthetic_data_batch(business_names, store=None):
+    stored, missing_names = split_stored_synthetic(business_names, store)
+    if not missing_names:
+        return stored
+    return stored + generate_and_store_synthetic(missing_names, store)
+
+
+# Rank a synthetic data batch, locally in one pass or with one LLM call per business.
+# `on_result(business_name, rank)` is called as each rank is known.
+def rank_synthetic_batch(synthetic_data_batch, use_llm=False, weights=None, normalization="fixed", on_result=None):
+    if use_llm:
+        return rank_batch(synthetic_data_batch, on_result=on_result)
+    ranks = local_rank_batch(synthetic_data_batch, weights, normalization)
+    if on_result is not None:
+        for business_name, rank in ranks.items():
+            on_result(business_name, rank)
+    return ranks
+
+
+# Restaurants that are not already leads or customers
+def new_prospects(restaurants_df, store=None):
+    store = store or get_lead_store()
+    existing = pd.concat([store.load_businesses("customers"), store.load_businesses("leads")])["Name"]
+    return restaurants_df[~restaurants_df["Name"].isin(existing)]
+
+
+# Ranked prospects grid, indexed by the row ids of `businesses_df`; businesses
+# without synthetic data are left out and unranked ones sort last (rank 999).
+# Returns (grid, match_report).
+def prospects_grid(businesses_df, synthetic_data_batch, ranks):
+    merged_df, match_report = merge_synthetic_data(businesses_df, synthetic_data_batch)
+    merged_df = merged_df[merged_df["business_name"].notna()]
+
+    grid = pd.DataFrame({
+        "Rank": merged_df["business_name"].map(ranks).fillna(999).astype(int),
+        "Name": merged_df["Name"],
+        "Address": merged_df["Address"],
+        "Profit": merged_df["estimated_revenue"].fillna("N/A"),
+        "Popularity": merged_df["Popularity"].fillna("N/A"),
+        "Market Share": merged_df["market_share"].fillna("N/A"),
+        "Credit Score": merged_df["credit_score"].fillna("N/A"),
+        "Location Rating": merged_df["location_rating"].fillna("N/A"),
+    }, index=merged_df.index.rename("Row ID")).sort_values(by="Rank")
+    return grid, match_report
+
+
+# Ranked leads grid; leads without a rank are left out. Returns (grid, match_report).
+def leads_grid(leads_df, synthetic_data_batch, ranks):
+    merged_df, match_report = merge_synthetic_data(leads_df, synthetic_data_batch)
+    merged_df["Rank"] = merged_df["business_name"].map(ranks)
+    merged_df = merged_df[merged_df["Rank"].notna()]
+
+    grid = pd.DataFrame({
+        "Rank": merged_df["Rank"].astype(int),
+        "Name": merged_df["Name"],
+        "Address": merged_df["Address"],
+        "Profit": merged_df["estimated_revenue"].fillna("Not Available"),
+        "Popularity": merged_df["Popularity"].fillna("Not Available"),
+        "Market Share": merged_df["market_share"].fillna("Not Available"),
+        "Credit Score": merged_df["credit_score"].fillna("Not Available"),
+        "Location Rating": merged_df["location_rating"].fillna("Not Available"),
+    }, columns=GRID_COLUMNS)
+    return grid, match_report
+
+
+# ----------------------------------------------------------------------
+# Assignment
+# ----------------------------------------------------------------------
+
+# The `top_k` salespeople scoring best for each lead, by location and expertise.
+# Returns one candidates frame per row of `leads_df`.
+def top_candidates(leads_df, sales_df, expertise_needed=DEFAULT_EXPERTISE, top_k=DEFAULT_TOP_K):
+    sales_df = sales_df.reset_index(drop=True)
+    scores, _ = score_matrix(leads_df, sales_df, expertise_needed)
+    best = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+    return [sales_df.iloc[columns] for columns in best]
+
+
+# Ask the LLM to pick a salesperson for many leads, `leads_per_prompt` at a time.
+# `ties` is a list of (lead_row, candidates_df); the roster sent with each call is
+# the union of its leads' candidates. Returns one Sales Person ID (or None) per tie.
+def recommend_salespeople(ties, expertise_needed=DEFAULT_EXPERTISE, leads_per_prompt=DEFAULT_LEADS_PER_PROMPT):
+    picks = []
+    prompt_tokens = calls = 0
+    for start in range(0, len(ties), leads_per_prompt):
+        batch = ties[start:start + leads_per_prompt]
+        leads = {
+            f"L{i}": (lead["Name"], lead.get("Address", ""), candidates_df["Sales Person ID"].tolist())
+            for i, (lead, candidates_df) in enumerate(batch, 1)
+        }
+        # Answers may come back as strings for numeric IDs
+        candidate_ids = {label: {str(candidate): candidate for candidate in lead[2]} for label, lead in leads.items()}
+
+        def build_request(labels):
+            nonlocal prompt_tokens, calls
+            roster = pd.concat([batch[int(label[1:]) - 1][1] for label in labels]).drop_duplicates("Sales Person ID")
+            prompt = salesperson_batch_prompt([leads[label] for label in labels], expertise_needed, roster, labels)
+            prompt_tokens += estimate_tokens(prompt)
+            calls += 1
+            return prompt, 100 + TOKENS_PER_ASSIGNMENT * len(labels)
+
+        def check(label, pick):
+            if pick.id not in candidate_ids[label]:
+                return f"{pick.id} is not one of the candidate IDs {list(candidate_ids[label])}"
+
+        try:
+            answers = request_keyed_records(
+                build_request, list(leads), SalespersonPick, key_of=lambda obj: obj.get("lead"),
+                call_site="salesperson_recommendation", check=check,
+            )
+        except Exception as e:
+            logger.error("Salesperson recommendation for %d leads failed: %s", len(batch), e)
+            answers = {}
+
+        picks += [candidate_ids[label][answers[label].id] if label in answers else None for label in leads]
+
+    if ties:
+        logger.info(
+            "Salesperson recommendations for %d leads: ~%d prompt tokens in %d calls",
+            len(ties), prompt_tokens, calls,
+        )
+    return picks
+
+
+# Estimated prompt tokens to have the LLM assign every lead: one full-roster
+# prose prompt per lead ("verbose") against compact top-k batch prompts ("compact")
+def salesperson_prompt_tokens(leads_df, sales_df, expertise_needed=DEFAULT_EXPERTISE, top_k=DEFAULT_TOP_K,
+                              leads_per_prompt=DEFAULT_LEADS_PER_PROMPT):
+    if leads_df.empty or sales_df.empty:
+        return {"verbose_calls": 0, "verbose_tokens": 0, "compact_calls": 0, "compact_tokens": 0}
+
+    # The verbose prompt only differs per lead by the business name, written twice
+    template_chars = len(salesperson_recommendation_prompt("", expertise_needed, sales_df))
+    names_chars = leads_df["Name"].astype(str).str.len().sum()
+    verbose_tokens = math.ceil((template_chars * len(leads_df) + 2 * names_chars) / CHARS_PER_TOKEN)
+
+    compact_tokens = 0
+    leads = leads_df.to_dict("records")
+    candidates = top_candidates(leads_df, sales_df, expertise_needed, top_k)
+    for start in range(0, len(leads), leads_per_prompt):
+        batch_candidates = candidates[start:start + leads_per_prompt]
+        roster = pd.concat(batch_candidates).drop_duplicates("Sales Person ID")
+        batch = [
+            (lead["Name"], lead.get("Address", ""), candidates_df["Sales Person ID"].tolist())
+            for lead, candidates_df in zip(leads[start:start + leads_per_prompt], batch_candidates)
+        ]
+        compact_tokens += estimate_tokens(salesperson_batch_prompt(batch, expertise_needed, roster))
+
+    return {
+        "verbose_calls": len(leads),
+        "verbose_tokens": int(verbose_tokens),
+        "compact_calls": -(-len(leads) // leads_per_prompt),
+        "compact_tokens": compact_tokens,
+    }
+
+
+# Match every lead to a salesperson and store the assignments.
+# With `use_llm_tie_break` the LLM picks among the top `top_k` salespeople that tie
+# for the best score, for all tied leads in batched calls.
+def assign_and_store(leads_df, sales_df, expertise_needed=DEFAULT_EXPERTISE, max_leads_per_salesperson=None,
+                     method="greedy", use_llm_tie_break=False, store=None, top_k=DEFAULT_TOP_K):
+    def llm_tie_break(ties):
+        return recommend_salespeople(ties, expertise_needed)
+
+    assignment_df = assign_leads(
+        leads_df,
+        sales_df,
+        expertise_needed=expertise_needed,
+        max_leads_per_salesperson=max_leads_per_salesperson,
+        method=method,
+        tie_breaker=llm_tie_break if use_llm_tie_break else None,
+        max_tie_candidates=top_k,
+    )
+    if not assignment_df.empty:
+        (store or get_lead_store()).upsert_assignments(assignment_df)
+    return assignment_df
+
+
+# ----------------------------------------------------------------------
+# Lead information and sales email
+# ----------------------------------------------------------------------
+
+def business_information(business_name, business_address):
+    prompt = business_information_prompt(business_name, business_address)
+    answer = chat_completion(prompt, max_tokens=800, temperature=0.6, timeout=40, call_site="business_information")
+    return answer.strip()
+
+
+# Short description opening a sales email; empty when it cannot be generated
+def business_summary(business_name, business_address):
+    try:
+        prompt = business_summary_prompt(business_name, business_address)
+        answer = chat_completion(prompt, max_tokens=250, temperature=0.7, timeout=30, call_site="business_summary")
+        return answer.strip()
+    except Exception as e:
+        logger.error("Business summary for %r failed: %s", business_name, e)
+        return ""
+
+
+# Sender of the sales email for a lead: its assigned salesperson, or a random one.
+# Returns (salesperson, assigned) with salesperson keys name, experience, location, expertise.
+def salesperson_for_lead(business_name, assignments_df, sales_df):
+    if not assignments_df.empty:
+        lead_assignment = assignments_df[assignments_df["Business Name"] == business_name]
+        if not lead_assignment.empty:
+            row = lead_assignment.iloc[0]
+            return {
+                "name": row["Sales Person Name"],
+                "experience": row["Experience"],
+                "location": row["Sales Person Location"],
+                "expertise": SALES_EXPERTISE,
+            }, True
+
+    row = sales_df.sample(1).iloc[0]
+    return {
+        "name": row["Name"],
+        "experience": row["Experience (Years)"],
+        "location": row["Location (City in Italy)"],
+        "expertise": SALES_EXPERTISE,
+    }, False
+
+
+def sales_email(business_name, salesperson, business_context):
+    prompt = sales_email_prompt(
+        business_name, salesperson["name"], salesperson["location"], salesperson["experience"], business_context
+    )
+    answer = chat_completion(prompt, max_tokens=700, temperature=0.7, timeout=40, call_site="sales_email")
+    return answer.strip()
+
+
+# ----------------------------------------------------------------------
+# Carbon intensity
+# ----------------------------------------------------------------------
+
+# Zone of every lead, resolved locally in one pass (no network calls)
+def lead_zones_table(leads_df):
+    lead_zones = resolve_zones(leads_df["Address"])
+    lead_zones.insert(0, "Name", leads_df["Name"].values)
+    return lead_zones
+
+
+# Electricity Maps zone of one lead: from the local index, else from the LLM.
+# Returns {"location", "zone", "source"}; zone is None when nothing maps.
+# Raises ValueError (StructuredOutputError) when the LLM never answers valid JSON.
+def lead_zone(lead_record):
+    resolved = resolve_zone(lead_record.get("Address"))
+    if resolved:
+        return resolved
+
+    answer = request_record(zone_prompt(lead_record), ZoneAnswer, "lead_zone", max_tokens=300, temperature=0.2)
+    zone = answer.zone or REGION_NAME_ZONES.get(answer.location)
+    return {"location": answer.location, "zone": zone, "source": "llm"}
+
+
+# Carbon intensity payload as a Field / Value table
+def carbon_reading_table(carbon):
+    fields = {
+        "Zone": "zone",
+        "Carbon Intensity (gCO₂/kWh)": "carbonIntensity",
+        "Datetime": "datetime",
+        "Updated At": "updatedAt",
+        "Created At": "createdAt",
+        "Emission Factor Type": "emissionFactorType",
+        "Is Estimated": "isEstimated",
+        "Estimation Method": "estimationMethod",
+        "Temporal Granularity": "temporalGranularity",
+        "_Disclaimer": "_disclaimer",
+    }
+    return pd.DataFrame({
+        "Field": list(fields),
+        "Value": [carbon.get(key, "N/A") for key in fields.values()],
+    })
+
+
+# ----------------------------------------------------------------------
+# Targeted marketing strategy
+# ----------------------------------------------------------------------
+
+def marketing_strategy(lead_data, carbon_intensity=None, odm_context=ODM_CONTEXT):
+    prompt = marketing_strategy_prompt(lead_data, carbon_intensity, odm_context)
+    return chat_completion(prompt, max_tokens=1500, temperature=0.3, timeout=45, call_site="marketing_strategy")
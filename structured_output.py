@@ -0,0 +1,386 @@
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass, fields
+from typing import ClassVar, Optional
+
+from azure_openai import chat_completion
+
+logger = logging.getLogger(__name__)
+
+# Re-asks for records missing or invalid in the first answer
+DEFAULT_MAX_REASKS = 1
+
+# AZURE_OPENAI_RESPONSE_FORMAT selects the deployment's structured-output mode:
+#   json_schema - the answer is constrained to the record schema (newer API versions)
+#   json_object - JSON mode, the answer is any single JSON object
+#   unset/off   - plain text, repaired and validated here
+RESPONSE_FORMATS = ("json_schema", "json_object")
+
+# Key holding the array when a JSON mode answer must be a single object
+RECORDS_KEY = "records"
+
+_CODE_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_PYTHON_LITERAL = re.compile(r"\b(True|False|None)\b")
+# A string literal: straight quotes with escapes, or curly quotes (closed by a
+# curly or a straight one). An unterminated literal runs to the end of the text.
+_STRING_LITERAL = re.compile(r'"(?:[^"\\]|\\.)*"?|“[^”"]*[”"]?', re.DOTALL)
+# Sign, digits, exponent, then the word after the number (a magnitude suffix or a unit)
+_NUMBER = re.compile(r"(-?)(\d[\d.,']*\d|\d)(?:[eE]([-+]?\d+))?(\s*)([A-Za-z]*)")
+_SEPARATORS = re.compile(r"[.,']")
+
+# Powers of ten of the magnitude suffixes accepted after a number ("1.2M", "800k",
+# "3 million"); words match in any case, the single letters only as listed
+NUMBER_SUFFIXES = {
+    "k": 3, "K": 3, "M": 6, "B": 9, "mn": 6, "mln": 6, "mio": 6, "bn": 9, "mld": 9,
+    "thousand": 3, "mila": 3, "million": 6, "millions": 6, "milioni": 6, "billion": 9, "billions": 9, "miliardi": 9,
+}
+
+
+# Raised when an answer still has no valid record after the re-asks.
+# A ValueError, so callers handling bad LLM JSON keep working.
+class StructuredOutputError(ValueError):
+    pass
+
+
+# ----------------------------------------------------------------------
+# Repair parsing
+# ----------------------------------------------------------------------
+
+# Trailing commas and Python literals in a stretch of text between string literals
+def _repair_outside_strings(text):
+    text = _TRAILING_COMMA.sub(r"\1", text)
+    return _PYTHON_LITERAL.sub(lambda m: {"True": "true", "False": "false", "None": "null"}[m[1]], text)
+
+
+# Undo the usual damage around JSON in a chat answer: code fences, curly
+# quotes around strings, trailing commas and Python literals. String values
+# are left as they are ("None Such Bar" stays), apart from their delimiters.
+def repair_json_text(text):
+    text = _CODE_FENCE.sub("", text or "")
+    pieces = []
+    position = 0
+    for match in _STRING_LITERAL.finditer(text):
+        pieces.append(_repair_outside_strings(text[position:match.start()]))
+        literal = match[0]
+        if literal.startswith("“"):
+            literal = '"' + literal[1:].rstrip('”"') + '"'
+        pieces.append(literal)
+        position = match.end()
+    pieces.append(_repair_outside_strings(text[position:]))
+    return "".join(pieces)
+
+
+# Yield every complete top-level JSON object found in `text`, one at a time.
+# Code fences, missing commas/brackets and a truncated tail are skipped over,
+# so a damaged response only loses the objects that are actually broken.
+def iter_json_objects(text):
+    decoder = json.JSONDecoder()
+    position = text.find("{")
+    while position != -1:
+        try:
+            obj, end = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            # Resume at the next object start after this broken one
+            position = text.find("{", position + 1)
+            continue
+
+        if isinstance(obj, dict):
+            yield obj
+        position = text.find("{", end)
+
+
+# Candidate records in an answer: the objects of a bare array, or of the
+# {"records": [...]} wrapper JSON mode answers use
+def iter_answer_objects(text):
+    for obj in iter_json_objects(repair_json_text(text)):
+        if isinstance(obj.get(RECORDS_KEY), list):
+            yield from (item for item in obj[RECORDS_KEY] if isinstance(item, dict))
+        else:
+            yield obj
+
+
+# ----------------------------------------------------------------------
+# Schemas and validation
+# ----------------------------------------------------------------------
+
+# Digits of a number written with thousands separators and a decimal point or
+# comma ("1,200,000.5", "1.200.000", "2,5", "1'200") as "1200000.5", or None when
+# the notation is ambiguous ("1,200" and "1.200" may be 1200 or 1.2) or invalid
+def _normalize_number(digits):
+    separators = _SEPARATORS.findall(digits)
+    if not separators:
+        return digits
+
+    decimal = None
+    if len(set(separators)) > 1:
+        # The last separator is the decimal one, the others group thousands
+        decimal = separators[-1]
+        if separators.count(decimal) > 1:
+            return None
+    elif len(separators) == 1 and separators[0] != "'":
+        integer, fraction = digits.split(separators[0])
+        if len(fraction) == 3 and len(integer) <= 3 and integer != "0":
+            return None
+        decimal = separators[0]
+
+    integer, _, fraction = digits.rpartition(decimal) if decimal else (digits, "", "")
+    groups = _SEPARATORS.split(integer)
+    if len(groups) > 1 and (
+        len(set(_SEPARATORS.findall(integer))) > 1 or not 1 <= len(groups[0]) <= 3
+        or any(len(group) != 3 for group in groups[1:])
+    ):
+        return None
+    return "".join(groups) + (f".{fraction}" if decimal else "")
+
+
+# Coerce a JSON value towards a schema type: a string holding exactly one
+# number, with currency, percent, thousands separators, a decimal comma or a
+# k/M/B suffix or an exponent ("€1,200,000", "2,5%", "1.2M", "1.2e6"), becomes
+# that number. Strings with several or ambiguous numbers, or letters glued to
+# the number, are left alone to fail validation.
+def _coerce(value, schema):
+    types = schema.get("type")
+    types = types if isinstance(types, list) else [types]
+    if isinstance(value, str) and ("number" in types or "integer" in types):
+        matches = _NUMBER.findall(value)
+        if len(matches) == 1:
+            sign, digits, exponent, space, word = matches[0]
+            number = _normalize_number(digits)
+            # Letters glued to a number ("3rd", "12x") or an unknown single letter
+            # after it ("3 b") leave it unparsed; a separate unit word ("5 stars") does not
+            suffix = NUMBER_SUFFIXES.get(word, NUMBER_SUFFIXES.get(word.lower()) if len(word) > 1 else None)
+            if number is not None and (suffix is not None or not word or (space and len(word) > 1)):
+                exponent = int(exponent or 0) + (suffix or 0)
+                value = float(f"{sign}{number}e{exponent}")
+    if "integer" in types and isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if types == ["string"] and isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    return value
+
+
+# Errors of `value` against the subset of JSON Schema the record schemas use
+# (type, enum, pattern, minimum, maximum, minLength). Empty when valid.
+def validate(value, schema, path="$"):
+    types = schema.get("type")
+    types = types if isinstance(types, list) else [types]
+    checks = {
+        "string": lambda v: isinstance(v, str),
+        "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+        "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+        "null": lambda v: v is None,
+        "object": lambda v: isinstance(v, dict),
+    }
+    if not any(checks[t](value) for t in types if t):
+        return [f"{path}: expected {' or '.join(types)}, got {value!r}"]
+    if value is None:
+        return []
+
+    errors = []
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} is not one of {schema['enum']}")
+    if isinstance(value, str):
+        if len(value.strip()) < schema.get("minLength", 0):
+            errors.append(f"{path}: is empty")
+        if "pattern" in schema and not re.search(schema["pattern"], value):
+            errors.append(f"{path}: {value!r} does not match {schema['pattern']}")
+    elif isinstance(value, (int, float)):
+        if "minimum" in schema and value < schema["minimum"]:
+            errors.append(f"{path}: {value} is below {schema['minimum']}")
+        if "maximum" in schema and value > schema["maximum"]:
+            errors.append(f"{path}: {value} is above {schema['maximum']}")
+    elif isinstance(value, dict):
+        for name in schema.get("required", []):
+            if name not in value:
+                errors.append(f"{path}.{name}: is missing")
+        for name, property_schema in schema.get("properties", {}).items():
+            if name in value:
+                errors += validate(value[name], property_schema, f"{path}.{name}")
+    return errors
+
+
+class StructuredRecord:
+    """
+    Base of the typed records parsed out of LLM answers.
+
+    Subclasses are dataclasses with a JSON Schema in SCHEMA. `parse` coerces
+    and validates one answer object and returns (record, errors): the record
+    is None whenever the object fails the schema.
+    """
+
+    SCHEMA: ClassVar[dict] = {}
+
+    @classmethod
+    def parse(cls, obj):
+        properties = cls.SCHEMA.get("properties", {})
+        values = {name: _coerce(value, properties.get(name, {})) for name, value in obj.items()}
+        errors = validate(values, cls.SCHEMA)
+        if errors:
+            return None, errors
+        return cls(**{f.name: values.get(f.name) for f in fields(cls)}), []
+
+    def to_dict(self):
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+@dataclass
+class SyntheticRecord(StructuredRecord):
+    business_name: str
+    estimated_revenue: float
+    market_share: float
+    credit_score: float
+    location_rating: float
+
+    SCHEMA: ClassVar[dict] = {
+        "type": "object",
+        "properties": {
+            "business_name": {"type": "string", "minLength": 1},
+            "estimated_revenue": {"type": "number", "minimum": 0},
+            "market_share": {"type": "number", "minimum": 0, "maximum": 100},
+            "credit_score": {"type": "number", "minimum": 0, "maximum": 100},
+            "location_rating": {"type": "number", "minimum": 0, "maximum": 5},
+        },
+        "required": ["business_name", "estimated_revenue", "market_share", "credit_score", "location_rating"],
+    }
+
+
+@dataclass
+class SalespersonPick(StructuredRecord):
+    lead: str
+    id: str
+
+    SCHEMA: ClassVar[dict] = {
+        "type": "object",
+        "properties": {
+            "lead": {"type": "string", "pattern": r"^L\d+$"},
+            "id": {"type": "string", "minLength": 1},
+        },
+        "required": ["lead", "id"],
+    }
+
+
+@dataclass
+class ZoneAnswer(StructuredRecord):
+    location: Optional[str]
+    zone: Optional[str]
+
+    SCHEMA: ClassVar[dict] = {
+        "type": "object",
+        "properties": {
+            "location": {"type": ["string", "null"]},
+            "zone": {"type": ["string", "null"], "pattern": r"^[A-Z]{2}(-[A-Z0-9]+)*$"},
+        },
+        "required": ["location", "zone"],
+    }
+
+
+# ----------------------------------------------------------------------
+# Requests
+# ----------------------------------------------------------------------
+
+# response_format for a request of `record_type` records (`many` wraps them
+# in an object under RECORDS_KEY), or None when structured output is off
+def response_format(record_type, many=False):
+    mode = os.getenv("AZURE_OPENAI_RESPONSE_FORMAT", "").strip().lower()
+    if mode not in RESPONSE_FORMATS:
+        return None
+    if mode == "json_object":
+        return {"type": "json_object"}
+
+    schema = record_type.SCHEMA
+    if many:
+        schema = {
+            "type": "object",
+            "properties": {RECORDS_KEY: {"type": "array", "items": schema}},
+            "required": [RECORDS_KEY],
+        }
+    return {"type": "json_schema", "json_schema": {"name": record_type.__name__, "schema": schema}}
+
+
+def _with_format_note(prompt, many, fmt):
+    if fmt is not None and many:
+        return prompt + f'\n    Return the array wrapped in a JSON object: {{"{RECORDS_KEY}": [...]}}\n'
+    return prompt
+
+
+# Ask for one record per key and re-ask only for the keys whose record is
+# missing or fails validation. `build_request(keys)` returns (prompt, max_tokens)
+# for a subset of keys, `key_of(obj)` the key an answer object belongs to and
+# `check(key, record)` any extra error for it (or None).
+# Returns {key: record} for the keys that got a valid record; the rest are logged.
+def request_keyed_records(build_request, keys, record_type, key_of, call_site, temperature=0.5, timeout=30,
+                          check=None, max_reasks=DEFAULT_MAX_REASKS):
+    fmt = response_format(record_type, many=True)
+    results = {}
+    errors = {}
+    pending = list(keys)
+
+    for attempt in range(max_reasks + 1):
+        prompt, max_tokens = build_request(pending)
+        if attempt:
+            prompt += "\n    Some earlier answers were invalid:\n" + "\n".join(
+                f"    - {key}: {'; '.join(errors[key])}" for key in pending if key in errors
+            ) + "\n"
+        try:
+            answer = chat_completion(
+                _with_format_note(prompt, True, fmt), max_tokens=max_tokens, temperature=temperature,
+                timeout=timeout, call_site=call_site, response_format=fmt,
+            )
+        except Exception:
+            if not attempt:
+                raise
+            logger.exception("Re-ask for %d %s records failed", len(pending), call_site)
+            break
+
+        wanted = set(pending)
+        for obj in iter_answer_objects(answer):
+            key = key_of(obj)
+            if key not in wanted or key in results:
+                continue
+            record, record_errors = record_type.parse(obj)
+            if record is not None and check is not None:
+                extra = check(key, record)
+                record_errors = [extra] if extra else []
+            if record is not None and not record_errors:
+                results[key] = record
+            else:
+                errors[key] = record_errors
+
+        pending = [key for key in pending if key not in results]
+        if not pending:
+            break
+        logger.info("%s: %d of %d records missing or invalid after attempt %d",
+                    call_site, len(pending), len(keys), attempt + 1)
+
+    if pending:
+        logger.warning("%s: no valid record for %d keys: %s", call_site, len(pending), pending[:10])
+    return results
+
+
+# Ask for a single record, re-asking with the validation errors when the
+# answer has none valid. Raises StructuredOutputError when it never does.
+def request_record(prompt, record_type, call_site, max_tokens, temperature=0.5, timeout=30,
+                   max_reasks=DEFAULT_MAX_REASKS):
+    fmt = response_format(record_type)
+    errors = []
+    answer = ""
+    for attempt in range(max_reasks + 1):
+        request_prompt = prompt
+        if attempt:
+            problems = "; ".join(errors) or "no JSON object"
+            request_prompt += f"\n    Your previous answer was invalid ({problems}): {answer}\n"
+        answer = chat_completion(
+            request_prompt, max_tokens=max_tokens, temperature=temperature, timeout=timeout, call_site=call_site,
+            response_format=fmt,
+        ).strip()
+
+        errors = []
+        for obj in iter_answer_objects(answer):
+            record, record_errors = record_type.parse(obj)
+            if record is not None:
+                return record
+            errors += record_errors
+    raise StructuredOutputError(f"No valid {record_type.__name__} in answer: {answer}")
@@ -0,0 +1,291 @@
+import argparse
+import json
+import math
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from italy_geo import PROVINCES
+
+# Local stand-in for the external APIs the app calls, for offline runs.
+# Point the app at it with e.g.
+#   ELECTRICITYMAPS_BASE_URL=http://127.0.0.1:8765/v3
+#   GOOGLE_PLACES_BASE_URL=http://127.0.0.1:8765/maps/api/place
+#   AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8765
+
+# Fake Places Text Search: results per page, pages per query, and how long a
+# next_page_token takes to become valid (like the real API, ~2 seconds)
+PLACES_PAGE_SIZE = 20
+PLACES_MAX_PAGES = 3
+PLACES_TOKEN_DELAY = 1.0
+PLACES_PER_PROVINCE = 40        # Fake restaurants scattered around each province capital
+
+# Seconds every Azure OpenAI and Electricity Maps answer is delayed by, by default
+DEFAULT_LATENCY = 0.0
+
+# Rough characters per token, for the fake usage block
+CHARS_PER_TOKEN = 4
+
+BUSINESS_NAME_PATTERN = re.compile(r"^\s*Business Name: (.+?)\s*$", re.MULTILINE)
+SALESPERSON_PATTERN = re.compile(
+    r"Sales Person ID: ([^,]+), Name: ([^,]+), Experience: (\d+) years, Expertise: ([^,]+), Location: (.+)"
+)
+# Lead rows of the batch salesperson prompt: L<n>|name|address|candidate IDs
+LEAD_CANDIDATES_PATTERN = re.compile(r"^\s*(L\d+)\|.*\|([^|\n]*)$", re.MULTILINE)
+
+
+# Deterministic carbon intensity for a zone and hour
+def stub_carbon_intensity(zone, hour):
+    return 150 + zlib.crc32(f"{zone}:{hour}".encode()) % 350
+
+
+# Deterministic Places results for one page of a query
+def stub_places(query, page):
+    seed = zlib.crc32(query.encode())
+    results = []
+    for i in range(page * PLACES_PAGE_SIZE, (page + 1) * PLACES_PAGE_SIZE):
+        place_id = f"stub-{seed:08x}-{i}"
+        results.append({
+            "place_id": place_id,
+            "name": f"{query.replace(' restaurant', '')} {i + 1}",
+            "formatted_address": f"Via Stub {i + 1}, {10000 + (seed + i) % 90000:05d} Roma RM, Italia",
+            "user_ratings_total": zlib.crc32(place_id.encode()) % 2000,
+            "geometry": {"location": {"lat": 41.9, "lng": 12.5}},
+        })
+    return results
+
+
+# Deterministic answer to a chat prompt, shaped like what the app's parser
+# for that prompt expects
+def stub_chat_content(prompt):
+    if '"estimated_revenue"' in prompt:
+        records = []
+        for name in BUSINESS_NAME_PATTERN.findall(prompt):
+            h = zlib.crc32(name.encode())
+            records.append({
+                "business_name": name,
+                "estimated_revenue": 50000 + h % 5000000,
+                "market_share": round(h % 1000 / 100, 2),
+                "credit_score": h % 101,
+                "location_rating": round(h % 51 / 10, 1),
+            })
+        return json.dumps(records, indent=2)
+
+    if "rank between 1 and 100" in prompt:
+        return str(1 + zlib.crc32(prompt.encode()) % 100)
+
+    if "CANDIDATE IDS" in prompt:
+        return json.dumps([
+            {"lead": lead, "id": candidates.split(",")[0]} for lead, candidates in LEAD_CANDIDATES_PATTERN.findall(prompt)
+        ])
+
+    if '"Sales Person ID"' in prompt:
+        match = SALESPERSON_PATTERN.search(prompt)
+        if match:
+            return json.dumps(dict(zip(["Sales Person ID", "Name", "Experience", "Expertise", "Location"], match.groups())))
+        return "{}"
+
+    if "Electricity Maps zone code" in prompt:
+        return json.dumps({"location": "Central South Italy", "zone": "IT-CSO"})
+
+    sentence = "Stub answer for benchmarking, standing in for generated Markdown text."
+    return "\n\n".join(f"### Section {i + 1}\n{sentence}" for i in range(1 + zlib.crc32(prompt.encode()) % 8))
+
+
+_stub_world = None
+
+
+# Fixed fake restaurants around every province capital, denser in larger cities' regions
+def stub_world():
+    global _stub_world
+    if _stub_world is None:
+        world = []
+        for code, (capital, _, lat, lon) in PROVINCES.items():
+            for i in range(PLACES_PER_PROVINCE):
+                h = zlib.crc32(f"{code}:{i}".encode())
+                world.append({
+                    "place_id": f"stub-{code}-{i}",
+                    "name": f"Trattoria {capital} {i + 1}",
+                    "formatted_address": f"Via Stub {i + 1}, {10000 + h % 90000:05d} {capital} {code}, Italia",
+                    "user_ratings_total": h % 2000,
+                    "geometry": {"location": {
+                        "lat": round(lat + ((h & 0xFFFF) / 0xFFFF - 0.5) * 0.3, 6),
+                        "lng": round(lon + ((h >> 16) / 0xFFFF - 0.5) * 0.3, 6),
+                    }},
+                })
+        _stub_world = world  # Published whole, as handler threads may read it concurrently
+    return _stub_world
+
+
+# Fake restaurants within `radius` metres of (lat, lon), nearest first
+def stub_places_near(lat, lon, radius):
+    nearby = []
+    for place in stub_world():
+        p = place["geometry"]["location"]
+        dlat, dlon = math.radians(p["lat"] - lat), math.radians(p["lng"] - lon)
+        a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat)) * math.cos(math.radians(p["lat"])) * math.sin(dlon / 2) ** 2
+        distance = 6371000.0 * 2 * math.asin(math.sqrt(a))
+        if distance <= radius:
+            nearby.append((distance, place))
+    nearby.sort(key=lambda item: item[0])
+    return [place for _, place in nearby[:PLACES_MAX_PAGES * PLACES_PAGE_SIZE]]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status_code, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        if url.path == "/_stats":
+            self._send_json(200, self.server.stats())
+            return
+
+        self.server.count("requests")
+        if url.path.endswith("/carbon-intensity/latest"):
+            self.server.count("carbon_requests")
+            time.sleep(self.server.latency)
+            zone = parse_qs(url.query).get("zone", [""])[0]
+            now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+            self._send_json(200, {
+                "zone": zone,
+                "carbonIntensity": stub_carbon_intensity(zone, now.isoformat()),
+                "datetime": now.isoformat().replace("+00:00", "Z"),
+                "updatedAt": now.isoformat().replace("+00:00", "Z"),
+                "createdAt": now.isoformat().replace("+00:00", "Z"),
+                "emissionFactorType": "lifecycle",
+                "isEstimated": True,
+                "estimationMethod": "STUB",
+                "temporalGranularity": "hourly",
+            })
+            return
+
+        if url.path.endswith("/textsearch/json"):
+            self.server.count("places_requests")
+            self._send_json(200, self._places_page(parse_qs(url.query)))
+            return
+
+        self._send_json(404, {"error": f"no stub for {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self.server.count("requests")
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if url.path.endswith("/chat/completions"):
+            time.sleep(self.server.latency)
+            prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+            content = stub_chat_content(prompt)
+            usage = {
+                "prompt_tokens": len(prompt) // CHARS_PER_TOKEN,
+                "completion_tokens": len(content) // CHARS_PER_TOKEN,
+            }
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            self.server.count("chat_requests")
+            self.server.count("prompt_tokens", usage["prompt_tokens"])
+            self.server.count("completion_tokens", usage["completion_tokens"])
+            self._send_json(200, {
+                "id": f"stub-{zlib.crc32(prompt.encode()):08x}",
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self._send_json(404, {"error": f"no stub for {url.path}"})
+
+    # One page of the fake Text Search, honouring next_page_token readiness.
+    # With location and radius the results come from the fixed fake world.
+    def _places_page(self, params):
+        token = params.get("pagetoken", [""])[0]
+        if token:
+            entry = self.server.page_tokens.get(token)
+            if entry is None or time.monotonic() < entry["ready_at"]:
+                return {"status": "INVALID_REQUEST", "results": []}
+            search, page = entry["search"], entry["page"]
+        else:
+            search, page = (
+                params.get("query", [""])[0], params.get("location", [""])[0], params.get("radius", [""])[0],
+            ), 0
+
+        query, location, radius = search
+        if location and radius:
+            lat, lon = (float(v) for v in location.split(","))
+            places = stub_places_near(lat, lon, float(radius))
+            results = places[page * PLACES_PAGE_SIZE:(page + 1) * PLACES_PAGE_SIZE]
+            has_more = len(places) > (page + 1) * PLACES_PAGE_SIZE
+        else:
+            results = stub_places(query, page)
+            has_more = page + 1 < PLACES_MAX_PAGES
+
+        body = {"status": "OK" if results else "ZERO_RESULTS", "results": results}
+        if has_more:
+            token = f"{zlib.crc32(repr(search).encode()):08x}-{page + 1}"
+            self.server.page_tokens[token] = {
+                "search": search, "page": page + 1, "ready_at": time.monotonic() + PLACES_TOKEN_DELAY,
+            }
+            body["next_page_token"] = token
+        return body
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=DEFAULT_LATENCY):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.page_tokens = {}
+        self.counters = {}
+        self._counters_lock = threading.Lock()
+
+    # Add to one of the request/token counters served at /_stats
+    def count(self, name, amount=1):
+        with self._counters_lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def stats(self):
+        with self._counters_lock:
+            return dict(self.counters)
+
+    @property
+    def request_count(self):
+        return self.stats().get("requests", 0)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+# Start a stub server on a background thread (port 0 picks a free port)
+def start_stub_server(host="127.0.0.1", port=0, latency=DEFAULT_LATENCY):
+    server = StubServer((host, port), latency=latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the local API stub server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY,
+                        help="Seconds to delay every Azure OpenAI and Electricity Maps answer")
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port), latency=args.latency)
+    print(f"Stub server listening on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,163 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from italy_geo import PROVINCES
+from zones import POSTAL_PREFIX_PROVINCES
+
+# List of Italian cities salespeople are based in
+ITALIAN_CITIES = [
+    "Rome", "Milan", "Naples", "Turin", "Palermo", "Genoa", "Bologna", "Florence", "Venice", "Verona",
+    "Messina", "Padua", "Trieste", "Bari", "Catania", "Brescia", "Reggio Calabria", "Modena", "Cagliari", "Parma"
+]
+
+# List of expertise in off-grid energy
+EXPERTISE_LIST = [
+    "Solar Power", "Wind Energy", "Battery Storage", "Off-Grid Solutions", "Renewable Energy Solutions", "Energy Efficiency"
+]
+
+FIRST_NAMES = [
+    "Marco", "Giulia", "Luca", "Francesca", "Alessandro", "Chiara", "Andrea", "Sara", "Matteo", "Elena",
+    "Davide", "Valentina", "Simone", "Martina", "Federico", "Laura", "Paolo", "Anna", "Stefano", "Silvia",
+    "Andrew", "Amy", "John", "Emily", "Michael", "Sarah", "David", "Laura", "James", "Jessica",
+]
+LAST_NAMES = [
+    "Rossi", "Russo", "Ferrari", "Esposito", "Bianchi", "Romano", "Colombo", "Ricci", "Marino", "Greco",
+    "Bruno", "Gallo", "Conti", "De Luca", "Mancini", "Costa", "Giordano", "Rizzo", "Lombardi", "Moretti",
+    "Scott", "Mitchell", "Smith", "Johnson", "Brown", "Taylor", "Wilson", "Clark", "Lewis", "Walker",
+]
+
+RESTAURANT_PREFIXES = ["Ristorante", "Trattoria", "Pizzeria", "Osteria", "Bar", "Caffè", "Enoteca", "Taverna"]
+RESTAURANT_WORDS = [
+    "Da Mario", "La Pergola", "Il Gabbiano", "Al Vecchio Forno", "Del Porto", "La Lanterna", "Il Girasole",
+    "Da Nonna Rosa", "Bella Napoli", "Il Cortile", "La Botte", "Al Castello", "Dei Cacciatori", "Il Mulino",
+    "La Rustica", "Del Sole", "Da Gino", "La Piazzetta", "Il Faro", "Sapori Antichi",
+]
+STREET_NAMES = [
+    "Via Roma", "Via Garibaldi", "Corso Vittorio Emanuele", "Via Mazzini", "Via Cavour", "Piazza del Duomo",
+    "Via Dante", "Via Verdi", "Via XX Settembre", "Via Nazionale", "Viale Europa", "Via Marconi",
+]
+
+# Province code -> first two digits of its postal code
+PROVINCE_POSTAL_PREFIXES = {code: prefix for prefix, code in POSTAL_PREFIX_PROVINCES.items()}
+
+DEFAULT_CHUNK_SIZE = 100000
+LEAD_FRACTION = 0.05             # Share of restaurants that are also leads
+CUSTOMER_FRACTION = 0.2          # Share of leads that are also customers
+
+# Fixture file names, matching the CSVs the app imports
+FIXTURE_FILES = {
+    "restaurants": "restaurants_italy.csv",
+    "leads": "leads.csv",
+    "customers": "customers.csv",
+    "salespeople": "synthetic_sales_data.csv",
+}
+
+
+# Zero-padded decimal strings of `numbers`, vectorized
+def _padded(numbers, width):
+    return pd.Series(numbers).astype(str).str.zfill(width)
+
+
+# Salespeople with IDs SP-<start>..SP-<start + n - 1>, unique by construction.
+# Names come from Faker when `use_faker` is set and it is installed.
+def generate_salespeople(n, seed=0, start=0, use_faker=False):
+    rng = np.random.default_rng(seed)
+    ids = "SP-" + _padded(np.arange(start, start + n), 7)
+
+    names = None
+    if use_faker:
+        try:
+            from faker import Faker
+        except ImportError:
+            Faker = None
+        if Faker is not None:
+            fake = Faker()
+            fake.seed_instance(seed)
+            names = pd.Series([fake.name() for _ in range(n)])
+    if names is None:
+        names = (
+            pd.Series(np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), n)]) + " "
+            + pd.Series(np.array(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), n)])
+        )
+
+    return pd.DataFrame({
+        "Sales Person ID": ids,
+        "Name": names,
+        "Experience (Years)": rng.integers(1, 21, n),
+        "Expertise in Off-Grid Energy": np.array(EXPERTISE_LIST)[rng.integers(0, len(EXPERTISE_LIST), n)],
+        "Location (City in Italy)": np.array(ITALIAN_CITIES)[rng.integers(0, len(ITALIAN_CITIES), n)],
+    })
+
+
+# Restaurants with Places-style Italian addresses. Row `start + i` is named
+# "<prefix> <words> <start + i>", so names are unique across chunks.
+def generate_restaurants(n, seed=0, start=0):
+    rng = np.random.default_rng(seed)
+    codes = np.array([code for code in PROVINCES if code in PROVINCE_POSTAL_PREFIXES])
+    province = codes[rng.integers(0, len(codes), n)]
+    capitals = pd.Series(province).map(lambda code: PROVINCES[code][0])
+    postal_codes = pd.Series(province).map(PROVINCE_POSTAL_PREFIXES) + _padded(rng.integers(0, 1000, n), 3)
+
+    names = (
+        pd.Series(np.array(RESTAURANT_PREFIXES)[rng.integers(0, len(RESTAURANT_PREFIXES), n)]) + " "
+        + pd.Series(np.array(RESTAURANT_WORDS)[rng.integers(0, len(RESTAURANT_WORDS), n)]) + " "
+        + pd.Series(np.arange(start, start + n)).astype(str)
+    )
+    addresses = (
+        pd.Series(np.array(STREET_NAMES)[rng.integers(0, len(STREET_NAMES), n)]) + ", "
+        + pd.Series(rng.integers(1, 300, n)).astype(str) + ", "
+        + postal_codes + " " + capitals + " " + pd.Series(province) + ", Italia"
+    )
+
+    return pd.DataFrame({
+        "Name": names,
+        "Address": addresses,
+        "Type": "Restaurant",
+        "Popularity": rng.gamma(1.2, 400, n).round(),
+        "Profit": np.nan,
+    })
+
+
+# Restaurants in chunks of `chunk_size`, each with its leads and customers
+# drawn from that chunk. Every chunk has its own seed derived from `seed`,
+# so a given seed and chunk size always produce the same rows.
+def iter_fixture_chunks(rows, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, lead_fraction=LEAD_FRACTION):
+    seeds = np.random.SeedSequence(seed).spawn((rows + chunk_size - 1) // chunk_size)
+    for index, start in enumerate(range(0, rows, chunk_size)):
+        rng = np.random.default_rng(seeds[index])
+        restaurants = generate_restaurants(min(chunk_size, rows - start), seed=rng, start=start)
+
+        is_lead = rng.random(len(restaurants)) < lead_fraction
+        leads = restaurants[is_lead].assign(Status="Lead")
+        is_customer = rng.random(len(leads)) < CUSTOMER_FRACTION
+        customers = leads[is_customer].drop(columns="Profit").assign(Status="Customer")
+
+        yield {"restaurants": restaurants, "leads": leads, "customers": customers}
+
+
+# Write restaurants, leads, customers and salespeople fixture CSVs into
+# `directory`, appending chunk by chunk so memory stays bounded.
+# Returns the row count written per file.
+def write_fixtures(directory, rows, salespeople=100, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, use_faker=False,
+                   lead_fraction=LEAD_FRACTION):
+    os.makedirs(directory, exist_ok=True)
+    paths = {kind: os.path.join(directory, name) for kind, name in FIXTURE_FILES.items()}
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)
+
+    counts = {kind: 0 for kind in FIXTURE_FILES}
+    for chunk in iter_fixture_chunks(rows, seed=seed, chunk_size=chunk_size, lead_fraction=lead_fraction):
+        for kind, df in chunk.items():
+            df.to_csv(paths[kind], mode="a", header=not os.path.exists(paths[kind]), index=False)
+            counts[kind] += len(df)
+
+    # Salespeople use a seed of their own so their count does not change the restaurants
+    for start in range(0, salespeople, chunk_size):
+        df = generate_salespeople(min(chunk_size, salespeople - start), seed=(seed << 32) + start, start=start, use_faker=use_faker)
+        df.to_csv(paths["salespeople"], mode="a", header=start == 0, index=False)
+        counts["salespeople"] += len(df)
+
+    return counts
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+# The app modules live flat in the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import carbon  # noqa: E402
+import http_client  # noqa: E402
+import llm_cache  # noqa: E402
+import metrics  # noqa: E402
+import places_cache  # noqa: E402
+
+
+# Every test runs in its own directory with its own on-disk stores and fresh
+# shared singletons, so nothing leaks between tests or into the working tree
+@pytest.fixture(autouse=True)
+def isolated_stores(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite3"))
+    monkeypatch.setenv("METRICS_PATH", str(tmp_path / "metrics.sqlite3"))
+    monkeypatch.setenv("PLACES_CACHE_PATH", str(tmp_path / "places_cache.sqlite3"))
+    monkeypatch.setenv("CARBON_INTENSITY_STORE_PATH", str(tmp_path / "carbon_intensity.sqlite3"))
+    for name in ("LLM_CACHE_BYPASS", "PLACES_CACHE_MODE", "AZURE_OPENAI_RESPONSE_FORMAT", "METRICS_PROMETHEUS_PORT"):
+        monkeypatch.delenv(name, raising=False)
+
+    monkeypatch.setattr(carbon, "_store", None)
+    monkeypatch.setattr(http_client, "_http_client", None)
+    monkeypatch.setattr(llm_cache, "_completion_cache", None)
+    monkeypatch.setattr(metrics, "_metrics", None)
+    monkeypatch.setattr(places_cache, "_places_cache", None)
+    return tmp_path
@@ -0,0 +1,67 @@
+import time
+
+import pandas as pd
+import pytest
+
+import carbon
+import stub_server
+from http_client import HttpClient, MockTransport, set_http_client
+from zones import ZONES
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = stub_server.start_stub_server()
+    monkeypatch.setenv("ELECTRICITYMAPS_BASE_URL", f"{server.base_url}/v3")
+    yield server
+    server.shutdown()
+
+
+def carbon_requests(server):
+    return server.stats().get("carbon_requests", 0)
+
+
+def test_prefetch_fetches_every_zone_once_per_hour(server):
+    readings = carbon.prefetch_zones()
+
+    assert set(readings) == set(ZONES)
+    assert all(reading["carbonIntensity"] > 0 for reading in readings.values())
+    assert carbon_requests(server) == len(ZONES)
+
+    # The same hour is served from the store
+    assert carbon.prefetch_zones() == readings
+    assert carbon_requests(server) == len(ZONES)
+
+
+def test_a_new_hour_bucket_fetches_again(server):
+    carbon.get_carbon_intensity("IT-NO")
+    carbon.get_carbon_intensity("IT-NO", timestamp=time.time() + 3600)
+
+    assert carbon_requests(server) == 2
+    assert len(carbon.get_carbon_store().history("IT-NO")) == 2
+
+
+def test_leads_are_joined_to_the_reading_of_their_zone(server):
+    leads_df = pd.DataFrame({
+        "Name": ["Trattoria", "Pizzeria", "Diner"],
+        "Address": [
+            "Via Roma 1, 20121 Milano MI, Italia", "Via Toledo 5, 80134 Napoli NA, Italia", "Rome, GA 30161, USA",
+        ],
+    })
+
+    df = carbon.leads_carbon_intensity(leads_df)
+
+    assert df["Zone"].fillna("unresolved").tolist() == ["IT-NO", "IT-CSO", "unresolved"]
+    assert df["Carbon Intensity (gCO₂/kWh)"].notna().tolist() == [True, True, False]
+    # Only the zones of the leads are fetched
+    assert carbon_requests(server) == 2
+
+
+def test_a_failed_zone_maps_to_none(monkeypatch):
+    transport = MockTransport()
+    transport.add("GET", "https://carbon.test/v3/carbon-intensity/latest", status_code=401, json_body={"error": "auth"})
+    set_http_client(HttpClient(max_retries=0, transport=transport))
+    monkeypatch.setenv("ELECTRICITYMAPS_BASE_URL", "https://carbon.test/v3")
+
+    assert carbon.prefetch_zones(["IT-NO", "IT-SAR"]) == {"IT-NO": None, "IT-SAR": None}
+    assert len(transport.requests) == 2
@@ -0,0 +1,120 @@
+import json
+import re
+
+import pytest
+
+import enrichment
+from http_client import HttpClient, MockTransport, set_http_client
+
+ENDPOINT = "https://azure.test"
+NAME_LINE = re.compile(r"^\s*Business Name: (.+)$", re.MULTILINE)
+
+
+class FakeAzureOpenAI:
+    """
+    Chat completions answered by MockTransport. `answer(names, prompt)` gets the
+    business names of each prompt and returns the message content; every prompt
+    is kept in `prompts`.
+    """
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.prompts = []
+        self.transport = MockTransport()
+        self.transport.add("POST", f"{ENDPOINT}/openai/deployments/", handler=self._handle)
+
+    def _handle(self, request):
+        prompt = json.loads(request.body)["messages"][0]["content"]
+        self.prompts.append(prompt)
+        names = NAME_LINE.findall(prompt)
+        content = self.answer(names, prompt)
+        return 200, {"choices": [{"message": {"content": content}}], "usage": {"prompt_tokens": 1}}, {}
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", ENDPOINT)
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT_NAME", "test-deployment")
+    monkeypatch.setenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
+
+    def install(answer):
+        fake = FakeAzureOpenAI(answer)
+        set_http_client(HttpClient(max_retries=0, transport=fake.transport))
+        return fake
+
+    return install
+
+
+def record(name, **overrides):
+    return {
+        "business_name": name, "estimated_revenue": 1200000, "market_share": 2.5, "credit_score": 80,
+        "location_rating": 4.2, **overrides,
+    }
+
+
+def test_only_missing_and_invalid_records_are_asked_again(fake_llm):
+    def answer(names, prompt):
+        if "Some earlier answers were invalid" not in prompt:
+            # Bar Due is out of range and Bar Tre is missing
+            return json.dumps([record("Bar Uno"), record("Bar Due", market_share=250)])
+        return json.dumps([record(name) for name in names])
+
+    fake = fake_llm(answer)
+
+    records = enrichment.generate_synthetic_data_chunk(["Bar Uno", "Bar Due", "Bar Tre"])
+
+    assert sorted(r["business_name"] for r in records) == ["Bar Due", "Bar Tre", "Bar Uno"]
+    assert len(fake.prompts) == 2
+    reask = fake.prompts[1]
+    assert NAME_LINE.findall(reask) == ["Bar Due", "Bar Tre"]
+    errors = reask.split("Some earlier answers were invalid")[1]
+    assert "bar due" in errors and "market_share" in errors
+
+
+def test_records_still_invalid_after_the_reask_are_dropped(fake_llm):
+    fake = fake_llm(lambda names, prompt: json.dumps(
+        [record(name, credit_score="excellent") if name == "Bar Due" else record(name) for name in names]
+    ))
+
+    records = enrichment.generate_synthetic_data_chunk(["Bar Uno", "Bar Due"])
+
+    assert [r["business_name"] for r in records] == ["Bar Uno"]
+    assert len(fake.prompts) == 2
+
+
+def test_damaged_answers_are_repaired_and_coerced(fake_llm):
+    answer = """```json
+    [{"business_name": "None Such Bar", "estimated_revenue": "€1.200.000", "market_share": "2,5%",
+      "credit_score": 80, "location_rating": 4.5,},
+     {"business_name": "Caffè Roma", "estimated_revenue": "1.2M", "market_share": 3, "credit_score": 70,
+      "location_rating": 4, "notes": None},]
+    ```"""
+    fake = fake_llm(lambda names, prompt: answer)
+
+    records = {r["business_name"]: r for r in enrichment.generate_synthetic_data_chunk(["None Such Bar", "Caffè Roma"])}
+
+    assert len(fake.prompts) == 1
+    assert (records["None Such Bar"]["estimated_revenue"], records["None Such Bar"]["market_share"]) == (1200000, 2.5)
+    assert records["Caffè Roma"]["estimated_revenue"] == 1200000
+
+
+def test_spellings_of_one_name_are_asked_once_and_all_filled(fake_llm):
+    fake = fake_llm(lambda names, prompt: json.dumps([record(name) for name in names]))
+
+    records = enrichment.generate_synthetic_data_chunk(["Caffè Roma", "Caffe  Roma", "Bar Uno"])
+
+    assert NAME_LINE.findall(fake.prompts[0]) == ["Caffè Roma", "Bar Uno"]
+    assert sorted(r["business_name"] for r in records) == ["Bar Uno", "Caffe  Roma", "Caffè Roma"]
+
+
+def test_a_failed_chunk_only_loses_its_own_rows(fake_llm):
+    def answer(names, prompt):
+        if "Bar 3" in names:
+            raise RuntimeError("boom")
+        return json.dumps([record(name) for name in names])
+
+    fake_llm(answer)
+
+    records = enrichment.generate_synthetic_data([f"Bar {i}" for i in range(6)], chunk_size=2, max_workers=3)
+
+    assert [r["business_name"] for r in records] == ["Bar 0", "Bar 1", "Bar 4", "Bar 5"]
@@ -0,0 +1,141 @@
+import pytest
+import requests
+
+import http_client
+from http_client import HttpClient, MockTransport
+
+URL = "https://api.test/v1/thing"
+
+
+# Seconds the client slept between attempts, without actually sleeping
+@pytest.fixture
+def sleeps(monkeypatch):
+    calls = []
+    monkeypatch.setattr(http_client.time, "sleep", calls.append)
+    return calls
+
+
+# A transport answering GET URL with `answers` in turn (status, body, headers), repeating the last one
+def scripted_transport(*answers):
+    answers = list(answers)
+    transport = MockTransport()
+    transport.add("GET", URL, handler=lambda request: answers.pop(0) if len(answers) > 1 else answers[0])
+    return transport
+
+
+# Transport whose connection fails `failures` times before answering 200
+class FlakyTransport(MockTransport):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+        self.add("GET", URL, json_body={"ok": True})
+
+    def send(self, request, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            self.requests.append(request)
+            raise requests.ConnectionError("connection reset")
+        return super().send(request, **kwargs)
+
+
+def test_429_is_retried_after_the_retry_after_delay(sleeps):
+    transport = scripted_transport((429, {"error": "throttled"}, {"Retry-After": "2"}), (200, {"ok": True}, {}))
+    client = HttpClient(transport=transport)
+
+    response = client.get("default", URL)
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert response.attempts == 2
+    assert len(transport.requests) == 2
+    assert sleeps == [2.0]
+    assert client.log[-1].attempts == 2
+
+
+def test_retry_after_is_capped_by_the_backoff_cap(sleeps):
+    transport = scripted_transport((429, {}, {"Retry-After": "120"}), (200, {}, {}))
+    client = HttpClient(backoff_cap=5.0, transport=transport)
+
+    assert client.get("default", URL).status_code == 200
+    assert sleeps == [5.0]
+
+
+def test_backoff_doubles_per_attempt_and_gives_up_after_max_retries(sleeps, monkeypatch):
+    # Full jitter draws from [0, base * 2**attempt]; take the upper bound to see the schedule
+    monkeypatch.setattr(http_client.random, "uniform", lambda low, high: high)
+    transport = scripted_transport((503, {"error": "unavailable"}, {}))
+    client = HttpClient(max_retries=3, backoff_base=0.5, backoff_cap=1.5, transport=transport)
+
+    response = client.get("default", URL)
+
+    assert response.status_code == 503
+    assert response.attempts == 4
+    assert len(transport.requests) == 4
+    assert sleeps == [0.5, 1.0, 1.5]
+    assert client.summary()["default"]["errors"] == 1
+
+
+def test_jittered_backoff_stays_within_its_bound(sleeps):
+    transport = scripted_transport((502, {}, {}))
+    client = HttpClient(max_retries=5, backoff_base=0.25, backoff_cap=30.0, transport=transport)
+
+    client.get("default", URL)
+
+    assert len(sleeps) == 5
+    assert all(0 <= delay <= 0.25 * 2 ** attempt for attempt, delay in enumerate(sleeps))
+
+
+@pytest.mark.parametrize("status_code", [400, 401, 403, 404])
+def test_non_retryable_errors_are_returned_at_once(sleeps, status_code):
+    transport = scripted_transport((status_code, {"error": "no"}, {}))
+    client = HttpClient(transport=transport)
+
+    response = client.get("default", URL)
+
+    assert response.status_code == status_code
+    assert response.attempts == 1
+    assert len(transport.requests) == 1
+    assert sleeps == []
+
+
+def test_connection_errors_are_retried(sleeps):
+    transport = FlakyTransport(failures=2)
+    client = HttpClient(max_retries=3, transport=transport)
+
+    response = client.get("default", URL)
+
+    assert response.status_code == 200
+    assert response.attempts == 3
+    assert len(sleeps) == 2
+
+
+def test_connection_errors_raise_once_retries_run_out(sleeps):
+    transport = FlakyTransport(failures=10)
+    client = HttpClient(max_retries=2, transport=transport)
+
+    with pytest.raises(requests.ConnectionError):
+        client.get("google_places", URL)
+
+    assert len(transport.requests) == 3
+    assert len(sleeps) == 2
+    record = client.log[-1]
+    assert (record.endpoint, record.status_code, record.attempts) == ("google_places", 0, 3)
+    assert "connection reset" in record.error
+
+
+def test_token_usage_is_logged_per_endpoint(sleeps):
+    transport = MockTransport()
+    transport.add("POST", URL, json_body={"usage": {"prompt_tokens": 12, "completion_tokens": 3}})
+    client = HttpClient(transport=transport)
+
+    client.post("azure_openai", URL, json={})
+    client.post("azure_openai", URL, json={})
+
+    totals = client.summary()["azure_openai"]
+    assert (totals["requests"], totals["prompt_tokens"], totals["completion_tokens"]) == (2, 24, 6)
+
+
+def test_unrouted_requests_get_a_404_from_the_mock_transport(sleeps):
+    client = HttpClient(transport=MockTransport())
+
+    assert client.get("default", "https://elsewhere.test/").status_code == 404
@@ -0,0 +1,161 @@
+import pytest
+
+import places_harvester
+import prospects
+import stub_server
+from places_harvester import TOKEN_MAX_RETRIES, HarvestCheckpoint, harvest
+
+
+class FakePlaces:
+    """
+    Scripted Places Text Search, called as fetch_page(query, page_token).
+
+    `pages[query]` lists the pages of a query: a number of results, a status
+    string (e.g. "OVER_QUERY_LIMIT") or None for no response. Every page but
+    the last carries a next_page_token, which answers INVALID_REQUEST for its
+    first `token_delay` uses, like a token that is not ready yet.
+    """
+
+    def __init__(self, pages, token_delay=0):
+        self.pages = pages
+        self.token_delay = token_delay
+        self.token_uses = {}
+        self.calls = []
+
+    def __call__(self, query, page_token=None):
+        self.calls.append((query, page_token))
+        page = 0
+        if page_token:
+            self.token_uses[page_token] = self.token_uses.get(page_token, 0) + 1
+            if self.token_uses[page_token] <= self.token_delay:
+                return {"status": "INVALID_REQUEST", "results": []}
+            page = int(page_token.rsplit("#", 1)[1])
+
+        answer = self.pages[query][page]
+        if answer is None or isinstance(answer, str):
+            return answer and {"status": answer, "results": []}
+        if answer == 0:
+            return {"status": "ZERO_RESULTS", "results": []}
+
+        data = {
+            "status": "OK",
+            "results": [
+                {"name": f"{query} {page}-{i}", "formatted_address": f"Via {i}, 00100 Roma RM, Italia",
+                 "place_id": f"{query}-{page}-{i}"}
+                for i in range(answer)
+            ],
+        }
+        if page + 1 < len(self.pages[query]):
+            data["next_page_token"] = f"{query}#{page + 1}"
+        return data
+
+
+@pytest.fixture(autouse=True)
+def no_token_waits(monkeypatch):
+    monkeypatch.setattr(places_harvester, "TOKEN_READY_DELAY", 0)
+    monkeypatch.setattr(places_harvester, "TOKEN_RETRY_DELAY", 0)
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    return str(tmp_path / "harvest_checkpoint.jsonl")
+
+
+# Harvest into a list instead of the prospects CSV; returns (summary, rows)
+def run(queries, fetch_page, checkpoint_path):
+    rows = []
+
+    def sink(new_rows):
+        rows.extend(new_rows)
+        return new_rows
+
+    summary = harvest(queries, qps=1000, workers=4, checkpoint_path=checkpoint_path, fetch_page=fetch_page, sink=sink)
+    return summary, rows
+
+
+def test_pages_are_followed_until_there_is_no_next_page_token(checkpoint_path):
+    places = FakePlaces({"pizzeria": [20, 20, 5]})
+
+    summary, rows = run(["pizzeria"], places, checkpoint_path)
+
+    assert places.calls == [("pizzeria", None), ("pizzeria", "pizzeria#1"), ("pizzeria", "pizzeria#2")]
+    assert (summary["failed"], summary["pages"], summary["places"]) == (0, 3, 45)
+    assert len({row["place_id"] for row in rows}) == 45
+
+
+def test_zero_results_ends_a_query_normally(checkpoint_path):
+    summary, rows = run(["nowhere"], FakePlaces({"nowhere": [0]}), checkpoint_path)
+
+    assert (summary["failed"], summary["pages"], rows) == (0, 1, [])
+
+
+def test_a_token_that_is_not_ready_yet_is_retried(checkpoint_path):
+    places = FakePlaces({"osteria": [20, 20, 3]}, token_delay=2)
+
+    summary, rows = run(["osteria"], places, checkpoint_path)
+
+    assert summary["failed"] == 0
+    assert len(rows) == 43
+    assert places.token_uses == {"osteria#1": 3, "osteria#2": 3}
+
+
+def test_a_token_that_never_becomes_ready_fails_the_query(checkpoint_path):
+    places = FakePlaces({"trattoria": [20, 20]}, token_delay=TOKEN_MAX_RETRIES + 1)
+
+    summary, rows = run(["trattoria"], places, checkpoint_path)
+
+    assert summary["failed"] == 1
+    assert places.token_uses == {"trattoria#1": TOKEN_MAX_RETRIES + 1}
+    # The first page is kept, but the query is not checkpointed as done
+    assert len(rows) == 20
+    assert not HarvestCheckpoint(checkpoint_path).is_done("trattoria")
+
+
+@pytest.mark.parametrize("failure", ["OVER_QUERY_LIMIT", "REQUEST_DENIED", "INVALID_REQUEST", None])
+def test_a_failed_page_fails_its_query_and_keeps_the_checkpoint(checkpoint_path, failure):
+    places = FakePlaces({"good": [20, 4], "bad": [20, failure]})
+
+    summary, rows = run(["good", "bad"], places, checkpoint_path)
+
+    assert summary["failed"] == 1
+    assert summary["places"] == 44
+    checkpoint = HarvestCheckpoint(checkpoint_path)
+    assert checkpoint.is_done("good")
+    assert not checkpoint.is_done("bad")
+
+
+def test_an_interrupted_crawl_resumes_with_the_failed_queries_only(checkpoint_path):
+    first = FakePlaces({"a": [3], "b": [2, "OVER_QUERY_LIMIT"], "c": [1]})
+    summary, _ = run(["a", "b", "c"], first, checkpoint_path)
+    assert summary["failed"] == 1
+
+    second = FakePlaces({"a": [3], "b": [2, 2], "c": [1]})
+    summary, rows = run(["a", "b", "c"], second, checkpoint_path)
+
+    assert {query for query, _ in second.calls} == {"b"}
+    assert (summary["queries"], summary["skipped"], summary["failed"], len(rows)) == (1, 2, 0, 4)
+    # A crawl that completes leaves no checkpoint behind
+    assert HarvestCheckpoint(checkpoint_path).completed == {}
+
+
+def test_harvest_against_the_stub_places_server(checkpoint_path, monkeypatch):
+    server = stub_server.start_stub_server()
+    try:
+        monkeypatch.setattr(prospects, "PLACES_BASE_URL", f"{server.base_url}/maps/api/place")
+        # Tokens become valid shortly after they are issued; the harvester must wait them out
+        monkeypatch.setattr(stub_server, "PLACES_TOKEN_DELAY", 0.2)
+        monkeypatch.setattr(places_harvester, "TOKEN_RETRY_DELAY", 0.1)
+        monkeypatch.setattr(places_harvester, "TOKEN_MAX_RETRIES", 10)
+
+        summary, rows = run(["Pizzeria Roma", "Osteria del Mare"], prospects.fetch_restaurants_from_google,
+                            checkpoint_path)
+    finally:
+        server.shutdown()
+
+    # Searches around a point list the stub's fixed world, the same places for both queries
+    per_query = stub_server.PLACES_PAGE_SIZE * stub_server.PLACES_MAX_PAGES
+    assert (summary["failed"], summary["pages"]) == (0, 2 * stub_server.PLACES_MAX_PAGES)
+    assert summary["places"] == 2 * per_query
+    assert len({row["place_id"] for row in rows}) == per_query
+    # Some page requests came too early and were retried
+    assert server.stats()["places_requests"] > summary["pages"]
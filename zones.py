@@ -0,0 +1,142 @@
+import csv
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+from italy_geo import ITALY_PATTERN, PROVINCES, ADDRESS_PATTERN, is_foreign_address, normalize_place_name
+
+# Electricity Maps bidding zones for Italy, by region
+REGION_ZONES = {
+    "Piemonte": "IT-NO",
+    "Valle d'Aosta": "IT-NO",
+    "Lombardia": "IT-NO",
+    "Trentino-Alto Adige": "IT-NO",
+    "Veneto": "IT-NO",
+    "Friuli-Venezia Giulia": "IT-NO",
+    "Liguria": "IT-NO",
+    "Emilia-Romagna": "IT-NO",
+    "Toscana": "IT-CNO",
+    "Umbria": "IT-CNO",
+    "Marche": "IT-CNO",
+    "Lazio": "IT-CSO",
+    "Abruzzo": "IT-CSO",
+    "Campania": "IT-CSO",
+    "Molise": "IT-SO",
+    "Puglia": "IT-SO",
+    "Basilicata": "IT-SO",
+    "Calabria": "IT-SO",
+    "Sicilia": "IT-SIC",
+    "Sardegna": "IT-SAR",
+}
+
+ZONES = ["IT-NO", "IT-CNO", "IT-CSO", "IT-SO", "IT-SIC", "IT-SAR"]
+
+# Province code -> zone
+PROVINCE_ZONES = {code: REGION_ZONES[region] for code, (_, region, _, _) in PROVINCES.items()}
+
+# First two digits of the CAP (postal code) -> province it belongs to
+POSTAL_PREFIX_PROVINCES = {
+    "00": "RM", "01": "VT", "02": "RI", "03": "FR", "04": "LT", "05": "TR", "06": "PG", "07": "SS",
+    "08": "NU", "09": "CA", "10": "TO", "11": "AO", "12": "CN", "13": "VC", "14": "AT", "15": "AL",
+    "16": "GE", "17": "SV", "18": "IM", "19": "SP", "20": "MI", "21": "VA", "22": "CO", "23": "SO",
+    "24": "BG", "25": "BS", "26": "CR", "27": "PV", "28": "NO", "29": "PC", "30": "VE", "31": "TV",
+    "32": "BL", "33": "UD", "34": "TS", "35": "PD", "36": "VI", "37": "VR", "38": "TN", "39": "BZ",
+    "40": "BO", "41": "MO", "42": "RE", "43": "PR", "44": "FE", "45": "RO", "46": "MN", "47": "FC",
+    "48": "RA", "50": "FI", "51": "PT", "52": "AR", "53": "SI", "54": "MS", "55": "LU", "56": "PI",
+    "57": "LI", "58": "GR", "59": "PO", "60": "AN", "61": "PU", "62": "MC", "63": "AP", "64": "TE",
+    "65": "PE", "66": "CH", "67": "AQ", "70": "BA", "71": "FG", "72": "BR", "73": "LE", "74": "TA",
+    "75": "MT", "76": "BT", "80": "NA", "81": "CE", "82": "BN", "83": "AV", "84": "SA", "85": "PZ",
+    "86": "CB", "87": "CS", "88": "CZ", "89": "RC", "90": "PA", "91": "TP", "92": "AG", "93": "CL",
+    "94": "EN", "95": "CT", "96": "SR", "97": "RG", "98": "ME",
+}
+POSTAL_PREFIX_ZONES = {prefix: PROVINCE_ZONES[code] for prefix, code in POSTAL_PREFIX_PROVINCES.items()}
+
+# Comuni outside the province capitals that show up in our prospect lists.
+# Extend at runtime with load_comuni_csv() for full ISTAT coverage.
+EXTRA_COMUNI = {
+    "Casalgrande": "RE", "Fiumicino": "RM", "Tivoli": "RM", "Frascati": "RM", "Ostia": "RM",
+    "Sesto San Giovanni": "MI", "Rho": "MI", "Sanremo": "IM", "Portofino": "GE", "Rapallo": "GE",
+    "Cortina d'Ampezzo": "BL", "Jesolo": "VE", "Mestre": "VE", "Bassano del Grappa": "VI",
+    "Viareggio": "LU", "San Gimignano": "SI", "Montepulciano": "SI", "Assisi": "PG", "Cesena": "FC",
+    "Riccione": "RN", "Imola": "BO", "Carpi": "MO", "Sassuolo": "MO", "Pompei": "NA", "Sorrento": "NA",
+    "Capri": "NA", "Ischia": "NA", "Pozzuoli": "NA", "Amalfi": "SA", "Positano": "SA",
+    "Andria": "BT", "Trani": "BT", "Monopoli": "BA", "Polignano a Mare": "BA", "Gallipoli": "LE",
+    "Tropea": "VV", "Taormina": "ME", "Cefalù": "PA", "Marsala": "TP", "Noto": "SR", "Modica": "RG",
+    "Olbia": "SS", "Alghero": "SS", "Porto Cervo": "SS", "Iglesias": "SU",
+}
+
+# Region names (Italian and English) that may appear in free text
+REGION_NAMES = {
+    **{normalize_place_name(region): zone for region, zone in REGION_ZONES.items()},
+    "sicily": "IT-SIC", "sardinia": "IT-SAR", "lombardy": "IT-NO", "piedmont": "IT-NO",
+    "tuscany": "IT-CNO", "apulia": "IT-SO",
+}
+
+# Normalized comune name -> province code
+COMUNE_PROVINCES = {
+    **{normalize_place_name(capital): code for code, (capital, _, _, _) in PROVINCES.items()},
+    **{normalize_place_name(name): code for name, code in EXTRA_COMUNI.items()},
+}
+
+PROVINCE_TOKEN = re.compile(r"\b([A-Z]{2})\b")
+POSTAL_CODE = re.compile(r"\b(\d{5})\b")
+
+
+# Add comuni from a CSV with "comune" and "province" columns (e.g. an ISTAT export)
+def load_comuni_csv(path, name_column="comune", province_column="province"):
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            code = row[province_column].strip().upper()
+            if code in PROVINCES:
+                COMUNE_PROVINCES[normalize_place_name(row[name_column])] = code
+    resolve_zone.cache_clear()
+
+
+# Resolve an address to its Electricity Maps zone without any network call.
+# Tries, in order: "CAP Comune PR" block, province code, postal prefix,
+# comune name, region name. Returns {"zone", "location", "source"} or None,
+# also for addresses explicitly outside Italy ("Naples, FL 34102, USA"), which
+# would otherwise match an Italian comune by name.
+@lru_cache(maxsize=65536)
+def resolve_zone(address):
+    if not isinstance(address, str) or not address.strip() or is_foreign_address(address):
+        return None
+
+    match = ADDRESS_PATTERN.search(address)
+    if match and match.group(3) in PROVINCE_ZONES:
+        return {"zone": PROVINCE_ZONES[match.group(3)], "location": match.group(2).strip(), "source": "province"}
+
+    parts = [part.strip() for part in address.split(",")]
+    # A bare province code or postal code only counts in an Italian address
+    # ("Los Angeles, CA 90001, USA" must not resolve to CA = Cagliari)
+    in_italy = ITALY_PATTERN.search(address) is not None
+
+    if in_italy:
+        for part in reversed(parts):
+            for token in PROVINCE_TOKEN.findall(part):
+                if token in PROVINCE_ZONES and len(part.split()) <= 4:
+                    return {"zone": PROVINCE_ZONES[token], "location": PROVINCES[token][0], "source": "province"}
+
+    for postal_code in POSTAL_CODE.findall(address):
+        zone = POSTAL_PREFIX_ZONES.get(postal_code[:2])
+        if zone and in_italy:
+            return {"zone": zone, "location": PROVINCES[POSTAL_PREFIX_PROVINCES[postal_code[:2]]][0], "source": "postal_code"}
+
+    for part in reversed(parts):
+        name = normalize_place_name(re.sub(r"\b\d+\b|\b[A-Z]{2}\b", "", part))
+        if name in COMUNE_PROVINCES:
+            return {"zone": PROVINCE_ZONES[COMUNE_PROVINCES[name]], "location": part, "source": "comune"}
+        if name in REGION_NAMES:
+            return {"zone": REGION_NAMES[name], "location": part, "source": "region"}
+
+    return None
+
+
+# Resolve every address at once; unresolved rows have zone None
+def resolve_zones(addresses):
+    rows = []
+    for address in addresses:
+        resolved = resolve_zone(address) or {"zone": None, "location": None, "source": None}
+        rows.append({"Address": address, "Zone": resolved["zone"], "Location": resolved["location"], "Source": resolved["source"]})
+    return pd.DataFrame(rows, columns=["Address", "Zone", "Location", "Source"])